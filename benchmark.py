@@ -0,0 +1,287 @@
+import pandas as pd
+import re
+import random
+import sys
+import time
+import extractors
+import scrape_pdf
+import scrape_rss_webpage
+
+
+
+
+# Regex microbenchmark of the field extractors (see extractors.py) on the full texts of fulltext_df.csv:
+#   python benchmark.py [fulltext_df.csv] [number of notices]
+# 1. every pattern as the extractors ran it before, with the pattern string (re looks it up in its cache at each call), against the compiled
+#    pattern; the existence checks (*_marker) ran re.findall, which scans the whole text, where search stops at the first match;
+# 2. the district patterns compiled cold (re.purge) at each notice, as a rebuilt pattern costs, against once per district;
+# 3. the literals of the section markers looked up in the normalized view of the text (extractors.TextView), and the cost of building the
+#    view and the section map (extractors.SectionMap);
+# 4. the time per notice of extractors.extract(pdf_text, district), all the fields of the district;
+# 5. the extraction plan of the notices of each district run row by row into a DataFrame against scrape_pdf.run_extraction_plan_column over
+#    the column of their texts;
+# 6. scrape_pdf.get_pdf_impact against its former version (impact_dataframe: backtracking sentence and piece patterns, a DataFrame per
+#    sentence), on the character of work of the notices and on long ones (the characters of work of each district joined);
+# 7. a check that extractors.has agrees with the marker patterns on variants of the texts (double spaces, line breaks, spaced-out capitals,
+#    mixed case), which the literals alone would not: the variants whose marker only the literals find are counted.
+
+
+
+
+def load_texts(path = "fulltext_df.csv", n = None):
+    """
+    (district, pdf_full_text) of the notices; the district is read from the permit application number in the text
+    """
+
+    fulltext_df = pd.read_csv(path, usecols = ["pdf_full_text"])
+    texts = []
+    for pdf_text in fulltext_df.pdf_full_text.dropna():
+        if pdf_text.startswith("ERROR"):
+            continue
+        district = re.search(r'(MVN|SAM|SAJ|SWG)-?\d{4}', pdf_text.replace(" ", ""))
+        if district is not None:
+            texts.append((district.group(1).lower(), pdf_text))
+    return texts[:n] if n else texts
+
+
+
+
+def timed(func, repeat = 3):
+    """
+    Best wall time of func() over repeat runs
+    """
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+
+
+def bench_patterns(texts, repeat = 3):
+    """
+    Per pattern: seconds over all texts with the pattern string (re.findall for the existence checks, else re.search) vs the compiled pattern's search
+    """
+
+    results = []
+    for district in sorted(set(district for district, _ in texts)):
+        district_texts = [text for d, text in texts if d == district]
+        for name, pattern in extractors.patterns("pdf", district).items():
+            if isinstance(pattern, extractors.Marker):
+                pattern = pattern.pattern
+            if name.endswith("_marker"):
+                string = timed(lambda: [len(re.findall(pattern.pattern, text)) != 0 for text in district_texts], repeat)
+            else:
+                string = timed(lambda: [re.search(pattern.pattern, text) for text in district_texts], repeat)
+            compiled = timed(lambda: [pattern.search(text) for text in district_texts], repeat)
+            results.append({"district": district, "pattern": name, "string_s": string, "compiled_s": compiled})
+    return pd.DataFrame(results)
+
+
+
+
+def bench_compile(texts, repeat = 3):
+    """
+    Seconds over all texts compiling the district patterns cold at each notice vs once per district
+    """
+
+    def cold():
+        for district, _ in texts:
+            # Declaring patterns drops the compiled ones of the source
+            re.purge()
+            extractors.add_patterns("pdf", {}, district = district)
+            extractors.patterns("pdf", district)
+
+    def warm():
+        for district, _ in texts:
+            extractors.patterns("pdf", district)
+
+    return {"compile_each_notice_s": timed(cold, repeat), "compile_once_s": timed(warm, repeat)}
+
+
+
+
+def bench_view(texts, repeat = 3):
+    """
+    Seconds per notice building the normalized view of the text, looking up all the literal section markers of its district in it, and
+    locating the section headers of its district
+    """
+
+    markers = {district: [marker for marker in extractors.patterns("pdf", district).values() if isinstance(marker, extractors.Marker)]
+               for district in set(district for district, _ in texts)}
+    views = [(district, extractors.TextView(text)) for district, text in texts]
+    build = timed(lambda: [extractors.TextView(text) for _, text in texts], repeat)
+    lookup = timed(lambda: [[any(literal in view.folded for literal in marker.literals) for marker in markers[district]] for district, view in views], repeat)
+    segment = timed(lambda: [extractors.SectionMap(view, extractors.patterns("pdf", district).segmenter) for district, view in views], repeat)
+    return {"view_s": build / len(texts), "markers_s": lookup / len(texts), "sections_s": segment / len(texts)}
+
+
+
+
+def bench_extract(texts, repeat = 3):
+    """
+    Seconds per notice of extractors.extract, over all the fields of each source
+    """
+
+    return {source: timed(lambda: [extractors.extract(text, district, source) for district, text in texts], repeat) / len(texts)
+            for source in ["pdf", "web"]}
+
+
+
+
+def bench_column(texts, repeat = 3):
+    """
+    Seconds per notice running the pdf extraction plan on the notices of each district row by row into a DataFrame vs over the column of
+    their texts (scrape_pdf.run_extraction_plan_column, as main_extractor.reextract_archived does)
+    """
+
+    columns = {district: pd.Series([text for d, text in texts if d == district]) for district in set(district for district, _ in texts)}
+    rows = timed(lambda: [pd.DataFrame([scrape_pdf.run_extraction_plan(text, district) for text in column]) for district, column in columns.items()], repeat)
+    column = timed(lambda: [scrape_pdf.run_extraction_plan_column(column, district) for district, column in columns.items()], repeat)
+    return {"rows_s": rows / len(texts), "column_s": column / len(texts)}
+
+
+
+
+def impact_dataframe(pdf_character):
+    """
+    The former scrape_pdf.get_pdf_impact, for comparison
+    """
+
+    impact_output = []
+    for char_sent in re.findall(r'.*?\D\.', pdf_character):
+        acre_output = ft2_output = lf_output = []
+        if "acre" in char_sent:
+            acre_list = re.findall(r'(.*?\d*,?\d*\s?\.?\s?\d*-?\s?acres?.+?\D(,|\.|\sand)[A-Za-z\s]*)', char_sent)
+            acre_output = [scrape_pdf.acre_type_term(x[0]) for x in acre_list]
+        if any(w in char_sent for w in ["square", "ft2"]):
+            ft2_list = re.findall(r'(.*?\d*,?\d*\s?\.?\s?\d*-?\s?(square)?-?\s?f[eo]*t2?.+?\D(,|\.|\sand)[A-Za-z\s]*)', char_sent)
+            ft2_output = [scrape_pdf.ft2_type_term(x[0]) for x in ft2_list]
+        if "linear" in char_sent:
+            lf_list = re.findall(r'(.*?\d*,?\d*\s?\.?\s?\d*-?\s?linear\sfe?e?t.+?\D(,|\.|\sand)[A-Za-z\s]*)', char_sent)
+            lf_output = [scrape_pdf.lf_type_term(x[0]) for x in lf_list]
+        if len(acre_output + ft2_output + lf_output) != 0:
+            impact_df = pd.DataFrame(acre_output + ft2_output + lf_output)
+            if any(n == 0 for n in impact_df["impact_duration_missing"]):
+                for r in range(len(impact_df)):
+                    if impact_df.loc[r, "impact_duration_missing"] == 2:
+                        impact_df.loc[r, "impact_duration"] = impact_df[impact_df["impact_duration_missing"] == 0].reset_index().loc[0, "impact_duration"]
+            if any(n != "same as previous/later one" for n in impact_df["impact_condition"]):
+                for r in range(len(impact_df)):
+                    if impact_df.loc[r, "impact_condition"] == "same as previous/later one":
+                        impact_df.loc[r, "impact_condition"] = impact_df[impact_df["impact_condition"] != "same as previous/later one"].reset_index().loc[0, "impact_condition"]
+            else:
+                for r in range(len(impact_df)):
+                    impact_df.loc[r, "impact_condition"] = "unknown"
+            impact_output = impact_output + impact_df.drop("impact_duration_missing", axis = 1).to_dict("records")
+    return impact_output
+
+
+
+
+def bench_impact(texts, repeat = 3):
+    """
+    Seconds per character of work of get_pdf_impact vs impact_dataframe, on the characters of work of the notices and on the characters of
+    work of each district joined; and whether both give the same impacts
+    """
+
+    characters = [extractors.run("pdf", "character", text, district) for district, text in texts]
+    characters = {district: [character for (d, _), character in zip(texts, characters) if d == district and character != "unknown" and "ERROR" not in character]
+                  for district in set(district for district, _ in texts)}
+    results = {}
+    for name, sections in [("notice", [c for district_characters in characters.values() for c in district_characters]),
+                           ("long", [" ".join(district_characters) for district_characters in characters.values()])]:
+        results[name] = {"n": len(sections), "chars": sum(len(section) for section in sections) / max(len(sections), 1),
+                         "dataframe_s": timed(lambda: [impact_dataframe(section) for section in sections], repeat) / max(len(sections), 1),
+                         "records_s": timed(lambda: [scrape_pdf.get_pdf_impact(section) for section in sections], repeat) / max(len(sections), 1),
+                         "same": all(impact_dataframe(section) == scrape_pdf.get_pdf_impact(section) for section in sections)}
+    return results
+
+
+
+
+def spacing_variants(text, seed = 0):
+    """
+    Variants of a text with its whitespace and case changed as in PDF texts: {name: text}
+    """
+
+    rng = random.Random(seed)
+    return {"double spaces": text.replace(" ", "  "),
+            "line breaks": "".join("\n" if char == " " and rng.random() < 0.3 else char for char in text),
+            "spaced capitals": re.sub(r'(?<=[A-Z])(?=[A-Z])', " ", text),
+            "spaced words": re.sub(r'(?<=[a-z])(?=[a-z])', lambda match: " " if rng.random() < 0.2 else "", text),
+            "mixed case": "".join(char.swapcase() if rng.random() < 0.2 else char for char in text)}
+
+
+
+
+def check_markers(texts):
+    """
+    Per variant of the texts: the marker lookups checked, those where extractors.has and the marker pattern disagree (expected 0),
+    and those where the literals are in the view but the pattern does not match
+    """
+
+    results = {}
+    for district, text in texts:
+        for source in ["pdf", "web"]:
+            markers = [marker for marker in extractors.patterns(source, district).values() if isinstance(marker, extractors.Marker)]
+            for name, variant in spacing_variants(text).items():
+                counts = results.setdefault(name, {"checked": 0, "mismatches": 0, "literals_only": 0})
+                folded = extractors.view(variant).folded
+                for marker in markers:
+                    expected = marker.pattern.search(variant) is not None
+                    counts["checked"] += 1
+                    counts["mismatches"] += extractors.has(variant, marker) != expected
+                    counts["literals_only"] += not expected and any(literal in folded for literal in marker.literals)
+    return results
+
+
+
+
+if __name__ == "__main__":
+    texts = load_texts(sys.argv[1] if len(sys.argv) > 1 else "fulltext_df.csv", int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print(f"{len(texts)} notices: " + ", ".join(f"{d} {n}" for d, n in pd.Series([d for d, _ in texts]).value_counts().items()))
+
+    patterns_df = bench_patterns(texts)
+    patterns_df["speedup"] = patterns_df.string_s / patterns_df.compiled_s
+    totals = patterns_df.groupby("district")[["string_s", "compiled_s"]].sum()
+    totals["speedup"] = totals.string_s / totals.compiled_s
+    print("\n1. Pattern strings vs compiled patterns (seconds over the notices of the district)")
+    print(totals.round(4).to_string())
+    print("\nPatterns with the largest gain")
+    print(patterns_df.sort_values("speedup", ascending = False).head(10).round(4).to_string(index = False))
+
+    compile_times = bench_compile(texts)
+    print("\n2. Compiling the district patterns")
+    print(f"   cold at each notice: {compile_times['compile_each_notice_s'] / len(texts) * 1000:.3f} ms per notice; "
+          f"once per district: {compile_times['compile_once_s'] / len(texts) * 1000:.4f} ms per notice")
+
+    view_times = bench_view(texts)
+    print("\n3. Normalized view")
+    print(f"   building the view: {view_times['view_s'] * 1000:.3f} ms per notice; all literal markers: {view_times['markers_s'] * 1000:.4f} ms per notice; "
+          f"section map: {view_times['sections_s'] * 1000:.4f} ms per notice")
+
+    extract_times = bench_extract(texts)
+    print("\n4. extractors.extract, all fields")
+    for source, seconds in extract_times.items():
+        print(f"   {source}: {seconds * 1000:.3f} ms per notice")
+
+    column_times = bench_column(texts)
+    print("\n5. Row by row vs scrape_pdf.run_extraction_plan_column, pdf extraction plan")
+    print(f"   row by row: {column_times['rows_s'] * 1000:.3f} ms per notice; column: {column_times['column_s'] * 1000:.3f} ms per notice")
+
+    impact_times = bench_impact(texts)
+    print("\n6. get_pdf_impact vs the former per-sentence DataFrame version")
+    for name, times in impact_times.items():
+        print(f"   {name} ({times['n']} of {times['chars']:.0f} characters): DataFrame {times['dataframe_s'] * 1000:.3f} ms, "
+              f"records {times['records_s'] * 1000:.3f} ms per character of work, same impacts: {times['same']}")
+
+    marker_checks = check_markers(texts)
+    print("\n7. extractors.has against the marker patterns, on variants of the texts")
+    for name, counts in marker_checks.items():
+        print(f"   {name}: {counts['checked']} lookups, {counts['mismatches']} mismatches, {counts['literals_only']} found by the literals alone")
+    if any(counts["mismatches"] for counts in marker_checks.values()):
+        sys.exit("extractors.has disagrees with the marker patterns")
@@ -0,0 +1,139 @@
+import os
+import pickle
+import sqlite3
+import threading
+from datetime import datetime
+
+
+
+
+# Per-notice checkpoints in a local SQLite file: one row per (stage, notice) with the stage output.
+# Stages: "web", "pdf", "summary", "llm_wetland", "llm_project", "embedding", "geocode", and "notice_id" (the noticeID given to the notice)
+# A rerun after a crash reads the finished outputs back instead of redoing the work.
+
+_settings = {"path": "checkpoint.sqlite"}
+
+_local = threading.local()
+
+
+
+
+def configure(path = None):
+    """
+    Set the SQLite file of the checkpoint store; None disables checkpointing
+    """
+
+    _settings["path"] = path
+    _local.__dict__.clear()
+
+
+
+
+def _connection():
+    """
+    One SQLite connection per thread and process
+    """
+
+    if _settings["path"] is None:
+        return None
+
+    if getattr(_local, "pid", None) != os.getpid() or getattr(_local, "path", None) != _settings["path"]:
+        directory = os.path.dirname(_settings["path"])
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(_settings["path"], timeout = 30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""CREATE TABLE IF NOT EXISTS checkpoints (
+                                  stage TEXT NOT NULL,
+                                  key TEXT NOT NULL,
+                                  output BLOB,
+                                  finished_at TEXT,
+                                  PRIMARY KEY (stage, key))""")
+        connection.commit()
+        _local.connection = connection
+        _local.pid = os.getpid()
+        _local.path = _settings["path"]
+
+    return _local.connection
+
+
+
+
+def get(stage, key):
+    """
+    Return (True, output) if the stage finished for this notice, otherwise (False, None)
+    """
+
+    connection = _connection()
+    if connection is None:
+        return False, None
+
+    row = connection.execute("SELECT output FROM checkpoints WHERE stage = ? AND key = ?", (stage, str(key))).fetchone()
+    if row is None:
+        return False, None
+    return True, pickle.loads(row[0])
+
+
+
+
+def put(stage, key, output):
+    """
+    Record that the stage finished for this notice, with its output
+    """
+
+    connection = _connection()
+    if connection is None:
+        return
+
+    connection.execute("INSERT OR REPLACE INTO checkpoints (stage, key, output, finished_at) VALUES (?, ?, ?, ?)",
+                       (stage, str(key), pickle.dumps(output), datetime.now().isoformat(timespec = "seconds")))
+    connection.commit()
+
+
+
+
+def cached(stage, key, func, is_valid = None):
+    """
+    Return the checkpointed output of the stage for this notice, or run func() and checkpoint its output.
+    is_valid: optional check on the output; outputs failing it (e.g. error messages) are not checkpointed, so a rerun tries again
+    """
+
+    found, output = get(stage, key)
+    if found:
+        return output
+
+    output = func()
+    if is_valid is None or is_valid(output):
+        put(stage, key, output)
+    return output
+
+
+
+
+def count(stage = None):
+    """
+    Number of checkpointed notices, for one stage or all stages
+    """
+
+    connection = _connection()
+    if connection is None:
+        return 0
+
+    if stage is None:
+        return connection.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+    return connection.execute("SELECT COUNT(*) FROM checkpoints WHERE stage = ?", (stage,)).fetchone()[0]
+
+
+
+
+def clear():
+    """
+    Remove all checkpoints, e.g. after the run has been uploaded
+    """
+
+    connection = _connection()
+    if connection is None:
+        return
+
+    connection.execute("DELETE FROM checkpoints")
+    connection.commit()
@@ -0,0 +1,172 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+
+
+
+
+# Embeddings of embed_final_df (text-embedding-ada-002 vectors), kept out of the table as binary matrices:
+#   dashboard-data/embeddings/embeddings-<run id>.npy     one float32 (or float16) matrix per upload, one row per notice
+# The embed_final_df parts keep, instead of the "embeddings" column, the matrix (embedding_matrix) and row (embedding_row)
+# of each notice; notices without an embedding have no matrix and row -1. The matrices are plain .npy files, so they load
+# without parsing and can be memory-mapped:
+#   notice_ids, vectors = embedding_store.load(bucket, index)              index: embed_final_df read with INDEX_COLUMNS
+#   vector = embedding_store.vector(bucket, index, "Notice_NO_123")         range requests of the header and the row
+# The legacy CSV (table_store.export_csv) gets the "embeddings" column back from the matrices, see attach_vectors.
+
+TABLE = "embed_final_df"
+PREFIX = "dashboard-data/embeddings"
+VECTOR_COLUMN = "embeddings"
+INDEX_COLUMNS = ["noticeID", "embedding_matrix", "embedding_row"]
+
+_settings = {"dtype": "float32"}
+
+
+
+
+def configure(dtype = "float32"):
+    """
+    Type of the matrices written from now on: "float32", or "float16" for half the size
+    """
+
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    _settings["dtype"] = dtype
+
+
+
+
+def _vector(value):
+    """
+    An embedding as a list of floats, or None: failed embeddings are "Error: ..." strings,
+    and the legacy CSV holds the lists as text
+    """
+
+    if isinstance(value, str):
+        if not value.startswith("["):
+            return None
+        value = json.loads(value)
+    if isinstance(value, (list, tuple, np.ndarray)) and len(value) > 0:
+        return value
+    return None
+
+
+
+
+def write_matrix(bucket, tbl, name):
+    """
+    Write the embeddings of an embed_final_df table as one matrix; return the table with the "embeddings" column
+    replaced by the index columns (embedding_matrix, embedding_row)
+    """
+
+    vectors = [_vector(value) for value in tbl[VECTOR_COLUMN]] if VECTOR_COLUMN in tbl.columns else [None] * len(tbl)
+    valid = [vector for vector in vectors if vector is not None]
+    key = f"{PREFIX}/embeddings-{name}.npy"
+
+    rows = np.full(len(tbl), -1, dtype = np.int64)
+    if len(valid) > 0:
+        matrix = np.asarray(valid, dtype = _settings["dtype"])
+        rows[[i for i, vector in enumerate(vectors) if vector is not None]] = np.arange(len(valid))
+        buffer = io.BytesIO()
+        np.save(buffer, matrix, allow_pickle = False)
+        bucket.put(key, buffer.getvalue(), content_type = "application/octet-stream")
+        print(f"{TABLE}: {matrix.shape[0]} x {matrix.shape[1]} {matrix.dtype} embeddings written to {key} ({matrix.nbytes} bytes)")
+
+    index = tbl.drop(columns = [VECTOR_COLUMN], errors = "ignore")
+    index["embedding_matrix"] = pd.Series([key if row >= 0 else None for row in rows], index = index.index, dtype = object)
+    index["embedding_row"] = pd.Series(rows, index = index.index)
+    return index
+
+
+
+
+def _header(bucket, key):
+    """
+    (shape, dtype, data offset) of a matrix, from its first bytes
+    """
+
+    content = io.BytesIO(bucket.get_range(key, 0, 4096))
+    version = np.lib.format.read_magic(content)
+    read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+    shape, _, dtype = read_header(content)
+    return shape, dtype, content.tell()
+
+
+
+
+def vector(bucket, index, notice_id):
+    """
+    Embedding of one notice (numpy array), with one range request after the header; None if it has none
+    """
+
+    rows = index[(index["noticeID"] == notice_id) & (index["embedding_row"] >= 0)]
+    if len(rows) == 0:
+        return None
+    key, row = rows["embedding_matrix"].iloc[-1], int(rows["embedding_row"].iloc[-1])
+    shape, dtype, offset = _header(bucket, key)
+    size = shape[1] * dtype.itemsize
+    return np.frombuffer(bucket.get_range(key, offset + row * size, size), dtype = dtype)
+
+
+
+
+def matrix(bucket, key, mmap = True):
+    """
+    One matrix; memory-mapped when the bucket is a local directory (see storage.LocalStorage.local_path)
+    """
+
+    if mmap and hasattr(bucket, "local_path"):
+        return np.load(bucket.local_path(key), mmap_mode = "r", allow_pickle = False)
+    return np.load(io.BytesIO(bucket.get(key)), allow_pickle = False)
+
+
+
+
+def _vector_text(vector):
+    """
+    An embedding as the text of a list, like the CSVs held it
+    """
+
+    return "[" + ", ".join(str(value) for value in vector) + "]"
+
+
+
+
+def attach_vectors(bucket, index):
+    """
+    The embed_final_df table as it was before the matrices: the index columns replaced by the "embeddings" column
+    (for the legacy CSV). Notices without an embedding (failed calls) have an empty value.
+    """
+
+    index = index.reset_index(drop = True)
+    values = [None] * len(index)
+    if "embedding_row" in index.columns:
+        positions = np.flatnonzero((index["embedding_row"] >= 0).to_numpy())
+        _, vectors = load(bucket, index)
+        for position, vector in zip(positions, vectors):
+            values[position] = _vector_text(vector)
+
+    tbl = index.drop(columns = ["embedding_matrix", "embedding_row", VECTOR_COLUMN], errors = "ignore")
+    position = list(tbl.columns).index("embed_tokens") + 1 if "embed_tokens" in tbl.columns else len(tbl.columns)
+    tbl.insert(position, VECTOR_COLUMN, pd.Series(values, dtype = object))
+    return tbl
+
+
+
+
+def load(bucket, index, dtype = np.float32):
+    """
+    (noticeIDs, matrix) of the notices of the index that have an embedding, in the order of the index
+    """
+
+    index = index[index["embedding_row"] >= 0].reset_index(drop = True)
+    vectors = np.zeros((0, 0), dtype = dtype)
+
+    for key, entries in index.groupby("embedding_matrix", sort = False):
+        block = matrix(bucket, key)[entries["embedding_row"].to_numpy()]
+        if vectors.shape[0] == 0:
+            vectors = np.empty((len(index), block.shape[1]), dtype = dtype)
+        vectors[entries.index.to_numpy()] = block
+
+    return list(index["noticeID"]), vectors
@@ -0,0 +1,363 @@
+import re
+import functools
+import numpy as np
+import pandas as pd
+
+
+
+
+# Registry of the field extractors of the notice texts, by source ("pdf": scrape_pdf, "web": scrape_rss_webpage) and district.
+# The modules declare their regex patterns once, shared or per district, and register one function per field and district:
+#   extractors.add_patterns("pdf", {"location": r'L\s?O\s?C...'}, district = "swg")
+#   @extractors.register("pdf", "location", districts = ["sam", "saj", "swg"])
+#   def location(text, p):                      # p: the compiled patterns of the district, e.g. p.location.search(text)
+#       ...
+#   extractors.extract(pdf_text, "swg")         # {"location": ..., "character": ..., ...}: every field of the district
+# Patterns are compiled on first use of a district and reused by every call afterwards.
+# Section markers can be declared with literals next to their pattern, extractors.Marker(r'L\s?[Oo]...', "location"): extractors.has(text,
+# p.location_marker) then looks the literals up in the normalized view of the text (see TextView) and runs the pattern only when one is
+# there. Any match of the pattern contains one of the literals (whitespace and case aside), so has gives the same answer as the pattern.
+# Section headers (extractors.add_sections) are all located once per document in the view (see SectionMap), so that a field pattern
+# starts searching at its own section instead of trying every position of the text before it:
+#   extractors.sections(pdf_text, p).search(p.location, "location")
+# A whole column of texts of one district (e.g. the archived full texts) is extracted with map_column, once per distinct text, into a
+# DataFrame (see scrape_pdf.run_extraction_plan_column, used by main_extractor.reextract_archived).
+
+_sources = {}
+_compiled = {}
+
+
+
+
+class Marker:
+    """
+    A section marker: its pattern, and lowercase literals of which any match of the pattern contains one once whitespace and case are ignored
+    """
+
+    def __init__(self, pattern, *literals):
+        self.pattern = pattern
+        self.literals = tuple(_fold("".join(literal.split())) for literal in literals)
+
+    def compile(self):
+        return Marker(re.compile(self.pattern), *self.literals)
+
+
+
+
+def _compile(pattern):
+    if isinstance(pattern, Marker):
+        return pattern.compile()
+    return re.compile(pattern)
+
+
+
+
+class Patterns(dict):
+    """
+    Compiled patterns of one district, also readable as attributes: p.location
+    """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+
+
+def _source(source):
+    return _sources.setdefault(source, {"patterns": {None: {}}, "sections": {None: {}}, "fields": {}})
+
+
+
+
+def add_patterns(source, patterns, district = None):
+    """
+    Declare regex patterns (name: pattern string) of a source, shared by all districts (district None) or for one district
+    """
+
+    _source(source)["patterns"].setdefault(district, {}).update(patterns)
+    for key in [key for key in _compiled if key[0] == source]:
+        del _compiled[key]
+
+
+
+
+def add_sections(source, sections, district = None):
+    """
+    Declare the section headers of a source (section: tuple of header literals), shared by all districts (district None) or for one district
+    """
+
+    _source(source)["sections"].setdefault(district, {}).update(sections)
+    for key in [key for key in _compiled if key[0] == source]:
+        del _compiled[key]
+
+
+
+
+def patterns(source, district = None):
+    """
+    The compiled patterns of a district: the shared ones plus its own, compiled once, with the segmenter of its sections (p.segmenter)
+    """
+
+    key = (source, district)
+    if key not in _compiled:
+        merged = {}
+        for kind in ["patterns", "sections"]:
+            declared = _source(source)[kind]
+            merged[kind] = dict(declared[None])
+            if district is not None:
+                merged[kind].update(declared.get(district, {}))
+        compiled = Patterns((name, _compile(pattern)) for name, pattern in merged["patterns"].items())
+        compiled.segmenter = Segmenter(merged["sections"])
+        _compiled[key] = compiled
+    return _compiled[key]
+
+
+
+
+# Code points of the whitespace characters (str.isspace, as str.split and \s)
+_WHITESPACE = np.array([code for code in range(0x3001) if chr(code).isspace()], dtype = np.uint32)
+
+
+
+
+def _fold(text):
+    # Case-fold one character per character so that the folded view keeps the positions (casefold turns a few characters, e.g. "ß", into two)
+    folded = text.casefold()
+    if len(folded) != len(text):
+        folded = "".join(char.casefold() if len(char.casefold()) == 1 else char for char in text)
+    return folded
+
+
+
+
+class TextView:
+    """
+    Normalized view of a text: its whitespace removed (compact) and also case-folded (folded), with the positions mapped back to the text
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.compact = "".join(text.split())
+        self.folded = _fold(self.compact)
+        # Position in the text of each character of the view: the characters which are not whitespace, by code point
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype = np.uint32)
+        self._positions = np.flatnonzero(~np.isin(codes, _WHITESPACE))
+
+    def position(self, index):
+        """
+        Position in the text of a position in the view (the end of the text for the end of the view)
+        """
+
+        if index >= len(self.compact):
+            return len(self.text)
+        return int(self._positions[index])
+
+    def original(self, start, end):
+        """
+        The slice of the text spanning the positions [start, end) of the view
+        """
+
+        if start >= end:
+            return ""
+        return self.text[self.position(start):self.position(end - 1) + 1]
+
+
+
+
+@functools.lru_cache(maxsize = 16)
+def view(text):
+    """
+    The normalized view of a text, built once per document for all its fields
+    """
+
+    return TextView(text)
+
+
+
+
+def has(text, marker):
+    """
+    Whether a text has a section marker (a compiled Marker or pattern): the marker pattern is only searched when the view of the text
+    has one of its literals, which all its matches contain
+    """
+
+    if isinstance(marker, Marker):
+        folded = view(text).folded
+        if not any(literal in folded for literal in marker.literals):
+            return False
+        marker = marker.pattern
+    return marker.search(text) is not None
+
+
+
+
+class Segmenter:
+    """
+    The section headers of a district: their literals, whitespace removed and case-folded, and the sections each of them starts
+    """
+
+    def __init__(self, sections):
+        self.literals = {}
+        for section, headers in sections.items():
+            for header in headers:
+                self.literals.setdefault(_fold("".join(header.split())), []).append(section)
+
+
+
+
+class SectionMap:
+    """
+    The section headers of a text: the first position of each section in the case-folded view, found in one sweep over the header literals
+    """
+
+    def __init__(self, text_view, segmenter):
+        self.view = text_view
+        self.segmenter = segmenter
+        self.first = {}
+        for literal, sections in segmenter.literals.items():
+            position = text_view.folded.find(literal)
+            if position != -1:
+                for section in sections:
+                    self.first[section] = min(self.first.get(section, position), position)
+
+    def start(self, section, lead = 0):
+        """
+        Position in the text of the first header of a section, moved back by lead non-whitespace characters (for optional words before the
+        header, e.g. "PROJECT" before "DESCRIPTION"); None when the text has no such header
+        """
+
+        if section not in self.first:
+            return None
+        return self.view.position(max(self.first[section] - lead, 0))
+
+    def search(self, pattern, section, lead = 0):
+        """
+        pattern.search from the first header of a section, or None when the text has no such header. A pattern starting with one of the
+        headers of the section (whitespace and case aside) cannot match before it, so this is the match pattern.search would find in the text.
+        """
+
+        start = self.start(section, lead)
+        if start is None:
+            return None
+        return pattern.search(self.view.text, start)
+
+    def text(self, section):
+        """
+        The text of a section: from its first header to the next header of another section
+        """
+
+        if section not in self.first:
+            return ""
+        start = self.first[section]
+        end = len(self.view.compact)
+        for literal, sections in self.segmenter.literals.items():
+            if section not in sections:
+                position = self.view.folded.find(literal, start + 1)
+                if position != -1:
+                    end = min(end, position)
+        return self.view.original(start, end)
+
+    def map(self):
+        """
+        {section: text} of every section found
+        """
+
+        return {section: self.text(section) for section in self.first}
+
+
+
+
+@functools.lru_cache(maxsize = 16)
+def _section_map(text, segmenter):
+    return SectionMap(view(text), segmenter)
+
+
+
+
+def sections(text, p):
+    """
+    The section map of a text, with the section headers of the district of the compiled patterns p; built once per document
+    """
+
+    return _section_map(text, p.segmenter)
+
+
+
+
+def register(source, field, districts = None):
+    """
+    Decorator registering the extractor of a field, for some districts (None: the default for all districts)
+    """
+
+    def decorator(func):
+        extractors = _source(source)["fields"].setdefault(field, {})
+        for district in (districts if districts is not None else [None]):
+            extractors[district] = func
+        return func
+
+    return decorator
+
+
+
+
+def fields(source):
+    """
+    The fields registered for a source, in order of registration
+    """
+
+    return list(_source(source)["fields"].keys())
+
+
+
+
+def extractor(source, field, district):
+    """
+    The extractor of a field for a district (its own, or the default)
+    """
+
+    extractors = _source(source)["fields"][field]
+    if district in extractors:
+        return extractors[district]
+    return extractors[None]
+
+
+
+
+def run(source, field, text, district):
+    """
+    Extract one field from a text
+    """
+
+    return extractor(source, field, district)(text, patterns(source, district))
+
+
+
+
+def extract(text, district, source = "pdf", fields_to_extract = None):
+    """
+    Extract the fields of a text of a district (all fields registered for the source, or the fields given): {field: value}
+    """
+
+    p = patterns(source, district)
+    return {field: extractor(source, field, district)(text, p) for field in (fields_to_extract or fields(source))}
+
+
+
+
+def map_column(texts, extract_text, columns):
+    """
+    Run extract_text (text -> one value per column) once per distinct text of a column: a DataFrame indexed as texts; the missing
+    (non-string) texts get missing values
+    """
+
+    texts = pd.Series(texts)
+    codes, uniques = pd.factorize(texts)
+    rows = [extract_text(text) if isinstance(text, str) else [None] * len(columns) for text in uniques]
+    # The row of the missing texts (code -1) goes last
+    rows.append([None] * len(columns))
+    codes = np.where(codes == -1, len(rows) - 1, codes)
+    return pd.DataFrame({column: pd.Series([row[i] for row in rows], dtype = object).take(codes).to_numpy()
+                         for i, column in enumerate(columns)}, index = texts.index)
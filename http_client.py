@@ -0,0 +1,151 @@
+import os
+import time
+import asyncio
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+
+
+# Shared HTTP client: one pooled session per process for every outbound call (USACE websites, PDFs, FCC, OpenAI)
+
+_settings = {"connect_timeout": 10,
+             "read_timeout": 60,
+             "pool_size": 10,
+             "max_retries": 2,
+             "user_agent": "wetlands-tracker/1.0 (+https://github.com/AtlasPublicPolicy/wetlands-tracker)"}
+
+_session = None
+_session_pid = None
+_lock = threading.Lock()
+
+
+
+
+def configure(connect_timeout = None, read_timeout = None, pool_size = None, max_retries = None, user_agent = None):
+    """
+    Set the connection settings of the shared HTTP client; parameters left as None keep the current value.
+    The pooled session is rebuilt on the next request.
+    """
+
+    global _session
+
+    new_settings = {"connect_timeout": connect_timeout,
+                    "read_timeout": read_timeout,
+                    "pool_size": pool_size,
+                    "max_retries": max_retries,
+                    "user_agent": user_agent}
+
+    with _lock:
+        _settings.update({key: value for key, value in new_settings.items() if value is not None})
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+
+
+def settings():
+    """
+    Return a copy of the current settings, e.g. to configure the client again in a worker process
+    """
+
+    return dict(_settings)
+
+
+
+
+def get_session():
+    """
+    Return the pooled session of this process
+    """
+
+    global _session, _session_pid
+
+    # Sockets cannot be shared with forked worker processes: build a new session per process id
+    if _session is None or _session_pid != os.getpid():
+        with _lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+
+                # Keep-alive pool per host; retry only on connection problems and server errors
+                retries = Retry(total = _settings["max_retries"],
+                                backoff_factor = 0.5,
+                                status_forcelist = [502, 503, 504],
+                                allowed_methods = ["GET", "HEAD"])
+                adapter = HTTPAdapter(pool_connections = _settings["pool_size"],
+                                      pool_maxsize = _settings["pool_size"],
+                                      max_retries = retries)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+
+                session.headers.update({"User-Agent": _settings["user_agent"],
+                                        "Accept-Encoding": "gzip, deflate"})
+
+                _session = session
+                _session_pid = os.getpid()
+
+    return _session
+
+
+
+
+def get(url, **kwargs):
+    """
+    GET request through the shared session with the configured (connect, read) timeouts
+    """
+
+    kwargs.setdefault("timeout", (_settings["connect_timeout"], _settings["read_timeout"]))
+    return get_session().get(url, **kwargs)
+
+
+
+
+def post(url, **kwargs):
+    """
+    POST request through the shared session with the configured (connect, read) timeouts
+    """
+
+    kwargs.setdefault("timeout", (_settings["connect_timeout"], _settings["read_timeout"]))
+    return get_session().post(url, **kwargs)
+
+
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by threads and asyncio tasks: on average `rate` requests per second, with bursts up to `burst`
+    """
+
+    def __init__(self, rate, burst = 1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """
+        Take one token and return how long (seconds) the caller has to wait before using it
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -63,7 +63,7 @@ from openai import OpenAI
 
 import tiktoken
 import json
-import requests
+import http_client
 
 # from langchain import OpenAI
 # from langchain.chat_models import ChatOpenAI
@@ -205,7 +205,7 @@ def chat_completion_request(GPT_MODEL, messages, API_KEY, functions=None, functi
     if function_call is not None:
         json_data.update({"function_call": function_call})
     try:
-        response = requests.post(
+        response = http_client.post(
             "https://api.openai.com/v1/chat/completions",
             headers=headers,
             json=json_data,
@@ -31,6 +31,13 @@ import glob
 import pandas as pd
 from dotenv import load_dotenv
 import main_extractor
+import http_client
+import pdf_store
+import checkpoint
+import table_store
+import snapshot
+import embedding_store
+import storage
 # import redivis
 from error_report import error_report
 import boto3
@@ -98,6 +105,58 @@ class configuration:
         ## 12) Set GPT model
         self.GPT_MODEL_SET = "gpt-4o-mini"
 
+        ## 13) HTTP client shared by the scrapers and LLM calls: connect/read timeouts (seconds), keep-alive connections per host, and User-Agent
+        self.http_connect_timeout = 10
+        self.http_read_timeout = 60
+        self.http_pool_size = 10
+        self.http_user_agent = "wetlands-tracker/1.0 (+https://github.com/AtlasPublicPolicy/wetlands-tracker)"
+
+        ## 14) Local PDF store: every notice PDF is downloaded once and reused by PDF reading, OCR and the AWS archive; least recently used PDFs are removed above the size cap (MB); a PDF kept longer than the revalidation period (hours) is checked again with the website, in case it was revised at the same url
+        self.pdf_cache_dir = "pdf_cache/"
+        self.pdf_cache_max_mb = 2048
+        self.pdf_cache_revalidate_hours = 24
+
+        ## 15) Scrape notice webpages in parallel: total workers, and the maximum at the same time per district website (swg: Galveston, mvn: New Orleans, saj: Jacksonville, sam: Mobile)
+        self.web_workers = 8
+        self.host_limits = {"swg": 2, "mvn": 2, "saj": 2, "sam": 2}
+
+        ## 16) Extract notice PDFs in parallel processes: number of processes (1 = no multiprocessing), and seconds allowed per notice (None = no limit; a notice over the limit has its process terminated and replaced)
+        self.pdf_workers = os.cpu_count() or 1
+        self.pdf_timeout = 300
+
+        ## 17) First-time scraping: crawl the listing pages of the district websites concurrently; requests per second across all districts and requests in flight
+        self.crawl_rate = 5
+        self.crawl_concurrency = 8
+
+        ## 18) Update scraping: where the RSS feeds and their ETag/Last-Modified validators are kept between runs, so an unchanged feed is not downloaded again
+        self.rss_cache_dir = "rss_cache/"
+
+        ## 19) Streaming scraping pipeline: PDFs downloaded at the same time, maximum notices waiting between two stages, and notices per micro-batch
+        self.pdf_fetch_workers = 4
+        self.queue_size = 32
+        self.batch_size = 20
+
+        ## 20) Checkpoints: SQLite file recording each finished stage per notice (web, PDF, summary, LLM, embedding, geocode), so an interrupted run resumes where it stopped; None disables checkpointing
+        self.checkpoint_path = "checkpoint.sqlite"
+
+        ## 21) Tables are stored in the bucket as append-only Parquet parts (dashboard-data/parquet/); 1, also regenerate the legacy CSVs (dashboard-data/<table>.csv) after each upload, which reads every part of every uploaded table; 0, Parquet only (regenerate them when needed with: python main.py export_csv [table ...])
+        self.regenerate_csv = 0
+
+        ## 22) Tables / objects uploaded to the bucket at the same time
+        self.upload_workers = 8
+
+        ## 23) Archive notice PDFs to AWS in parallel: notices at the same time, and notices started per second; PDFs already archived with the same content are skipped
+        self.archive_workers = 8
+        self.archive_rate = 10
+
+        ## 24) Storage of the tables and notice PDFs: "s3", the AWS S3 bucket storage_bucket; or "local", the directory storage_dir (runs offline, no AWS keys needed)
+        self.storage = "s3"
+        self.storage_bucket = "usace-notices"
+        self.storage_dir = "bucket/"
+
+        ## 25) Embeddings of embed_final_df are stored as binary matrices (dashboard-data/embeddings/*.npy): "float32", or "float16" for half the size
+        self.embedding_dtype = "float32"
+
 
 ###############################
 # district URLS included:
@@ -109,6 +168,43 @@ class configuration:
 # IMPLEMENTATION
 ###########################
 
+def connect_storage(config):
+    """
+    The AWS S3 bucket, or the local storage directory, of the configuration
+    """
+
+    if config.storage == "local":
+        return storage.LocalStorage(config.storage_dir)
+    aws_client = boto3.client('s3',
+                               aws_access_key_id = config.aws_access_key_id,
+                               aws_secret_access_key = config.aws_secret_access_key)
+    return storage.S3Storage(aws_client, config.storage_bucket)
+
+
+
+
+def export_csv(config, tbl_names = None):
+    """
+    Regenerate the legacy CSVs of some tables (None: all) from their Parquet parts, without scraping
+    """
+
+    main_extractor.export_csvs(connect_storage(config), tbl_names, config.upload_workers)
+
+
+
+
+def reextract(config, district = "all"):
+    """
+    Re-extract the pdf fields of the archived notices from their full texts, without scraping; written to reextracted_pdf_fields.csv
+    """
+
+    fields_df = main_extractor.reextract_archived(connect_storage(config), district)
+    fields_df.to_csv("reextracted_pdf_fields.csv", index = False)
+    print(f"{len(fields_df)} notices re-extracted to reextracted_pdf_fields.csv")
+
+
+
+
 def main(config):
     
     # Start info/error logging
@@ -124,22 +220,47 @@ def main(config):
         # os.makedirs(config.directory)
     
     try:
+        ## Set up the shared HTTP client
+        http_client.configure(connect_timeout = config.http_connect_timeout,
+                              read_timeout = config.http_read_timeout,
+                              pool_size = config.http_pool_size,
+                              user_agent = config.http_user_agent)
+
+        ## Set up the local PDF store
+        pdf_store.configure(directory = config.pdf_cache_dir,
+                            max_bytes = config.pdf_cache_max_mb * 1024 ** 2,
+                            revalidate_seconds = config.pdf_cache_revalidate_hours * 3600)
+
+        ## Set up the per-notice checkpoints
+        checkpoint.configure(config.checkpoint_path)
+
+        ## Set up the type of the embedding matrices
+        embedding_store.configure(config.embedding_dtype)
+
         ## Connect to Redivis DB:
         # os.environ['REDIVIS_API_TOKEN'] = config.REDIVIS_API_KEY
         
-        ## Connect to AWS S3 bucket
-        aws_client = boto3.client('s3',
-                                   aws_access_key_id = config.aws_access_key_id,
-                                   aws_secret_access_key = config.aws_secret_access_key)
+        ## Connect to AWS S3 bucket (or the local storage directory)
+        bucket = connect_storage(config)
 
         ## scrape all historical notices or check latest notices for selected days; For those have not been in AWS bucket, scrape webpage and pdf
-        df_base = main_extractor.restart_or_update(aws_client,
+        df_base = main_extractor.restart_or_update(bucket,
                                                    config.update, 
                                                    config.n_days, 
                                                    config.max_notices,
                                                    logging,
                                                    config.district,
-                                                   config.tesseract_path
+                                                   config.tesseract_path,
+                                                   config.web_workers,
+                                                   config.host_limits,
+                                                   config.pdf_workers,
+                                                   config.pdf_timeout,
+                                                   config.crawl_rate,
+                                                   config.crawl_concurrency,
+                                                   config.rss_cache_dir,
+                                                   config.pdf_fetch_workers,
+                                                   config.queue_size,
+                                                   config.batch_size
                                                   )
 
         # EXPORT RAW_DF AT THIS STAGE 
@@ -148,15 +269,25 @@ def main(config):
         
         ## Pre-clean
         df = main_extractor.data_schema_preprocess(df_base, 
-                                                   aws_client,
+                                                   bucket,
                                                    config.GPT_MODEL_SET
                                                   )
 
+        ## Snapshot of the existing tables read later in the run, downloaded once and in the background
+        snapshot.begin(bucket, ["location_df", "geocoded_df"])
+
+        ## Max rowID of each table, read once from the table manifest
+        row_offsets = table_store.row_offsets(bucket, ["manager_df", "character_df", "mitigation_df", "location_df",
+                                                           "fulltext_df", "wetland_final_df", "embed_final_df"])
+
         ## Clean/Validation
 
         ### A. main, manager, character of work, mitigation, location, and aws links
         main_tbls = main_extractor.data_schema(df, 
-                                               aws_client)
+                                               bucket,
+                                               row_offsets,
+                                               config.archive_workers,
+                                               config.archive_rate)
 
         ### B. Azure summarization
         if config.skipPaid == 0:
@@ -164,9 +295,10 @@ def main(config):
                                                                                 config.price_cap, 
                                                                                 config.AZURE_ENDPOINT, 
                                                                                 config.AZURE_API_KEY, 
-                                                                                aws_client,
+                                                                                bucket,
                                                                                 config.n_sentences,
-                                                                                logging)
+                                                                                logging,
+                                                                                row_offsets)
             main_tbls.update(fulltext_and_summary_tbl)
         else:
             print("Skipping Azure summaries")
@@ -176,8 +308,9 @@ def main(config):
             impact_tbl = main_extractor.data_schema_impact(df, 
                                                            config.GPT_MODEL_SET,
                                                            config.OPENAI_API_KEY,
-                                                           aws_client,
-                                                           logging)
+                                                           bucket,
+                                                           logging,
+                                                           row_offsets)
             main_tbls.update({"wetland_final_df":impact_tbl["wetland_final_df"]})
         else:
             print("Skipping wetland impacts")
@@ -197,14 +330,15 @@ def main(config):
             embeding_tbl = main_extractor.data_schema_embeding(df, 
                                                                config.GPT_MODEL_SET,
                                                                config.OPENAI_API_KEY,
-                                                               aws_client,
-                                                               logging)
+                                                               bucket,
+                                                               logging,
+                                                               row_offsets)
             main_tbls.update(embeding_tbl)
         else:
             print("Skipping embedings")
 
         ### F. Geocoding
-        geocode_tbl = main_extractor.geocode(aws_client, main_tbls['location_df'])
+        geocode_tbl = main_extractor.geocode(bucket, main_tbls['location_df'])
         if len(geocode_tbl) > 0:
             main_tbls.update({"geocoded_df": geocode_tbl})
         else:
@@ -217,7 +351,11 @@ def main(config):
         # main_extractor.upload_redivis(config.tbl_to_upload, config.redivis_dataset, config.directory, config.overwrite_redivis)
         
         ## Upload to AWS S3 bucket
-        main_extractor.upload_aws(main_tbls, config.tbl_to_upload, aws_client)
+        snapshot.end()
+        main_extractor.upload_aws(main_tbls, config.tbl_to_upload, bucket, config.regenerate_csv, row_offsets, config.upload_workers)
+
+        ## The run is uploaded: the next run starts from fresh checkpoints
+        checkpoint.clear()
         
         ## Error report
         markdown_content = error_report(df_base, validation_df)
@@ -231,5 +369,12 @@ def main(config):
 
 if __name__ == "__main__":
     config = configuration()
-    main(config)
+    # python main.py export_csv [table ...]: only regenerate the legacy CSVs
+    # python main.py reextract [district]: only re-extract the pdf fields of the archived notices
+    if len(sys.argv) > 1 and sys.argv[1] == "export_csv":
+        export_csv(config, sys.argv[2:] or None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "reextract":
+        reextract(config, sys.argv[2] if len(sys.argv) > 2 else "all")
+    else:
+        main(config)
 
@@ -1,4 +1,4 @@
-import requests
+import http_client
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
@@ -6,6 +6,15 @@ import io
 import re
 import scrape_rss_webpage
 import scrape_pdf
+import pipeline
+import checkpoint
+import notice_index
+import manifest
+import table_store
+import text_store
+import snapshot
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import ast
 import os
 import tiktoken
@@ -35,20 +44,28 @@ import boto3
 
 # Run the process that exports to the temp dir
 
-def restart_or_update(aws_client, update, n_days, max_notices, logging, district = "all", tesseract_path = None): # redivis_dataset
+def restart_or_update(bucket, update, n_days, max_notices, logging, district = "all", tesseract_path = None, web_workers = 8, host_limits = None, pdf_workers = 1, pdf_timeout = None, crawl_rate = 5, crawl_concurrency = 8, rss_cache_dir = "rss_cache/", pdf_fetch_workers = 4, queue_size = 32, batch_size = 20): # redivis_dataset
     """
     Generate the main scraping results
     
     update: 1, update; 0, first-time-scraping; default as 1
     n_days: numeric; notices published in the past n days; default as 100
     district: "New Orleans", "Galveston", "Jacksonville", or "Mobile"; default as "all"
+    web_workers: number of notice webpages scraped at the same time; default as 8
+    host_limits: maximum webpages scraped at the same time per district host, e.g. {"swg": 2, "mvn": 2, "saj": 2, "sam": 2}
+    pdf_workers: number of processes extracting PDFs; default as 1 (no multiprocessing)
+    pdf_timeout: seconds allowed to extract one notice PDF; default as None (no limit)
+    crawl_rate / crawl_concurrency: requests per second and requests in flight when crawling the district websites (update = 0)
+    rss_cache_dir: where the RSS feeds and their ETag/Last-Modified validators are kept between runs (update = 1)
+    pdf_fetch_workers: number of notice PDFs downloaded at the same time
+    queue_size / batch_size: maximum notices waiting between two scraping stages / notices per micro-batch
     """
     
     # (1) A list of notice webpage links and titles
     
     # First-time scraping: scrape the USACE website to get a list of notice webpage links
     if update == 0:
-        weblist = scrape_rss_webpage.get_weblist(district)
+        weblist = scrape_rss_webpage.get_weblist(district, crawl_rate, crawl_concurrency)
         print(f"{len(weblist)} public notices captured")
     
     # Update scraping: scrape the RSS feed to get new notice webpage links
@@ -60,15 +77,10 @@ def restart_or_update(aws_client, update, n_days, max_notices, logging, district
         # scraped_notices = redivis_dataset.table("main_notices").to_pandas_dataframe(variables = ["noticeID", "usaceWebUrl", "datePublished"],
                                                                                     # progress=False)
         
-        # ## Set up the reference to AWS S3
-        response = aws_client.get_object(Bucket = "usace-notices",
-                                         Key = "dashboard-data/main_df.csv")
-
-        content = response['Body'].read()
-        scraped_notices = pd.read_csv(io.BytesIO(content))
+        # ## Set up the reference to AWS S3: the known-notice index (url hashes of main_df) instead of the whole main_df.csv
+        scraped_notices_index = notice_index.load(bucket)
         
-        print(f"The number of notices found on the existing main table is {len(scraped_notices)}")
-        scraped_notices_list = scraped_notices["usaceWebUrl"].to_list()
+        print(f"The number of notices found on the existing main table is {len(scraped_notices_index)}")
             
         ## option 2-download csv from redivis to dir
 
@@ -82,11 +94,11 @@ def restart_or_update(aws_client, update, n_days, max_notices, logging, district
         # scraped_notices=pd.read_csv(r'tempdir/main_notices.csv')
 
         # B. Scrape the RSS feed to get the most recent notices
-        weblist_ndays = scrape_rss_webpage.update_weblist_from_rss(district, n_days)
+        weblist_ndays = scrape_rss_webpage.update_weblist_from_rss(district, n_days, rss_cache_dir)
         print(f"The number of notices retreived in date range: {len(weblist_ndays)}.")
 
         # C. Subset the most recent notices to only those that are not in database already
-        weblist = weblist_ndays[~weblist_ndays["usaceWebUrl"].isin(scraped_notices_list)]
+        weblist = weblist_ndays[~notice_index.contains(scraped_notices_index, weblist_ndays["usaceWebUrl"])]
         #PRINT NEW NOTICES
         print(f'Notices published in date range not found in S3 bucket = {len(weblist)}')
         
@@ -102,35 +114,52 @@ def restart_or_update(aws_client, update, n_days, max_notices, logging, district
         print("Exiting program, no new notices")
         sys.exit()
 
-    # (2) Scrape the webpage for each public notice to get more detailed information
-    
-    webpage = pd.DataFrame([scrape_rss_webpage.web_extraction(x, update) for x in weblist["usaceWebUrl"]])
-    
-    # Merge with weblist table
-    webpage = weblist.reset_index(drop = True).join(webpage)
-    
-    # sort by date
-    webpage = webpage.sort_values(by='datePublished', ascending=False)
-
-    # subset to max_notices - number of newest notices
-    # webpage = webpage.head(max_notices)
-    webpage = webpage[:max_notices]
-    print('Notices to process =', webpage.shape[0])
-
-    # (3) Scrape the PDF of each notice
-    
-    # Scrape the pdf for each public notice
-    pdf = pd.DataFrame([scrape_pdf.pdf_extraction(webpage.loc[x, "PdfUrl"], webpage.loc[x, "web_text"], webpage.loc[x, "web_title"], tesseract_path) for x in webpage.index])
+    # sort by date and subset to max_notices - number of newest notices
+    # (the RSS feeds of the districts are each sorted by date, but one after the other: sort by the publication date of the feed items)
+    if "datePublished" in weblist.columns:
+        weblist = weblist.sort_values(by='datePublished', ascending=False)
+    if "rssPubDate" in weblist.columns:
+        weblist = weblist.sort_values(by='rssPubDate', ascending=False, kind='stable').drop(columns=['rssPubDate'])
+    weblist = weblist[:max_notices]
+    print('Notices to process =', weblist.shape[0])
+
+    # (2) Scrape the webpage and then the PDF of each public notice in a streaming pipeline:
+    # webpages, PDF downloads and PDF extraction overlap, and rows come back in micro-batches.
+    # The table stages (data_schema and after) need the whole df_base, so the batches are kept in memory:
+    # memory grows with the number of notices of the run, which max_notices bounds
+    
+    n_scraped = 0
+    df_batches = []
+    for df_batch in pipeline.stream_notices(weblist,
+                                            update,
+                                            tesseract_path,
+                                            web_workers = web_workers,
+                                            host_limits = host_limits,
+                                            pdf_fetch_workers = pdf_fetch_workers,
+                                            pdf_workers = pdf_workers,
+                                            pdf_timeout = pdf_timeout,
+                                            queue_size = queue_size,
+                                            batch_size = batch_size):
+        df_batches.append(df_batch)
+        n_scraped += len(df_batch)
+        print(f"{n_scraped} of {len(weblist)} notices scraped")
+
+    if n_scraped == 0:
+        print("Exiting program, no notices could be scraped")
+        sys.exit()
 
-    # # Merge with weblist and webpage table
-    df_base = webpage.reset_index(drop = True).join(pdf)
+    # Restore the order of weblist, then sort by date
+    df_base = pd.concat(df_batches, ignore_index = True).sort_values(by = 'position')
+    del df_batches
+    df_base = df_base.drop(columns = ['position']).sort_values(by = 'datePublished', ascending = False, kind = 'stable')
+    df_base = df_base.reset_index(drop = True)
     
     return df_base
 
 
 
 
-def data_schema_preprocess(df_base, aws_client, GPT_MODEL): # redivis_dataset
+def data_schema_preprocess(df_base, bucket, GPT_MODEL): # redivis_dataset
     """
     Proprocess the raw scraping data: remove all unknowns and generate noticeID
     """
@@ -138,8 +167,9 @@ def data_schema_preprocess(df_base, aws_client, GPT_MODEL): # redivis_dataset
     ## A.  Replace all ERRORs
     df = df_base.map(lambda x: "unknown" if "ERROR" in str(x) else x)
 
-    ## B. Replace all NAs
-    df.fillna('unknown', inplace=True)
+    ## B. Replace all NAs (but a missing attachment link, which stays None: see scrape_pdf.archive_pdf)
+    fill_columns = [column for column in df.columns if column != "AttachmentUrl"]
+    df[fill_columns] = df[fill_columns].fillna('unknown')
 
     ## C. Create the primary key column noticeID
     
@@ -147,16 +177,16 @@ def data_schema_preprocess(df_base, aws_client, GPT_MODEL): # redivis_dataset
     # scraped_notices = redivis_dataset.table("main_notices").to_pandas_dataframe(variables = ["noticeID", "usaceWebUrl", "datePublished"],
                                                                                 # progress=False)    
         
-    ### get all the noticeID in AWS S3 main_df
-    response = aws_client.get_object(Bucket = "usace-notices",
-                                     Key = "dashboard-data/main_df.csv")
-
-    content = response['Body'].read()
-    scraped_notices = pd.read_csv(io.BytesIO(content))
-
-    ### find the most latest noticeID
-    noticeID_start_on = max([int(re.sub(r'Notice_NO_', "", id_num)) for id_num in scraped_notices["noticeID"]]) + 1
-    df['noticeID'] = 'Notice_NO_' + (df.index + noticeID_start_on).astype(str)
+    ### notices of an earlier run that was not uploaded keep the noticeID it gave them (their PDFs are archived under it);
+    ### the others get a range of noticeIDs reserved in the AWS S3 manifest (safe with concurrent runs), checkpointed by notice url
+    notice_ids = [checkpoint.get("notice_id", url)[1] for url in df["usaceWebUrl"]]
+    new_positions = [position for position, notice_id in enumerate(notice_ids) if notice_id is None]
+    if len(new_positions) > 0:
+        noticeID_start_on = manifest.reserve_notice_ids(bucket, len(new_positions))
+        for offset, position in enumerate(new_positions):
+            notice_ids[position] = 'Notice_NO_' + str(noticeID_start_on + offset)
+            checkpoint.put("notice_id", df["usaceWebUrl"].iloc[position], notice_ids[position])
+    df['noticeID'] = notice_ids
 
     #E D. Generate column of token counts
     #encoding = tiktoken.encoding_for_model(GPT_MODEL)
@@ -168,7 +198,7 @@ def data_schema_preprocess(df_base, aws_client, GPT_MODEL): # redivis_dataset
     ## E. Drop if all errors or unknowns
     
     # List of columns to exclude from the check
-    exclude_columns = ['error', 'noticeID', 'tokens']
+    exclude_columns = ['error', 'noticeID', 'tokens', 'AttachmentUrl']
 
     # List of columns to include in the check
     check_columns = [col for col in df.columns if col not in exclude_columns]
@@ -184,8 +214,15 @@ def data_schema_preprocess(df_base, aws_client, GPT_MODEL): # redivis_dataset
 #Global variable for the 3 Azure/OpenAI functions
 batch_size = 10
 
-def data_schema_summarization(df, price_cap, AZURE_ENDPOINT, AZURE_API_KEY, aws_client, n_sentences, logging): #redivis_dataset
+def text_key(text):
+    """
+    Checkpoint key of an LLM/embedding call: the hash of its input text, so reruns can reuse finished calls
+    """
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+def data_schema_summarization(df, price_cap, AZURE_ENDPOINT, AZURE_API_KEY, bucket, n_sentences, logging, row_offsets = None): #redivis_dataset
     """
+    row_offsets: max rowID of each table read from the table manifest at the start of the run (see table_store.row_offsets)
     # Pricing - https://azure.microsoft.com/en-us/pricing/details/cognitive-services/language-service/
     # $2 for 1000 text records - 1000 character units
     # ==> $2 for 1,000,000 characters
@@ -201,10 +238,10 @@ def data_schema_summarization(df, price_cap, AZURE_ENDPOINT, AZURE_API_KEY, aws_
     # fulltext_df_redivis = redivis_dataset.table("fulltext").to_pandas_dataframe(variables = ["rowID"], progress=False)
     # fulltext_df['rowID'] = fulltext_df.reset_index().index + fulltext_df_redivis.shape[0] + 1
     
-    # Create rowID (AWS ver)
-    response = aws_client.get_object(Bucket = "usace-notices", Key = "dashboard-data/fulltext_df.csv")
-    content = response['Body'].read()
-    fulltext_existing_row = len(pd.read_csv(io.BytesIO(content)))
+    # Create rowID (AWS ver): from the max rowID in the table manifest
+    if row_offsets is None:
+        row_offsets = table_store.row_offsets(bucket, ["fulltext_df"])
+    fulltext_existing_row = row_offsets["fulltext_df"]
     fulltext_df['rowID'] = fulltext_df.reset_index().index + fulltext_existing_row + 1
     
     # Initialize an empty DataFrame to hold the summaries
@@ -230,10 +267,12 @@ def data_schema_summarization(df, price_cap, AZURE_ENDPOINT, AZURE_API_KEY, aws_
             #                                                         endpoint=AZURE_ENDPOINT, 
             #                                                         key=AZURE_API_KEY, 
             #                                                         sentenceCount=n_sentences) for x in batch['pdf_trimmed']]
-            batch['short_summary'] = batch['pdf_trimmed'].apply(lambda x: getDocumentAbstractiveSummary(x, 
-                                                                                                        endpoint=AZURE_ENDPOINT, 
-                                                                                                        key=AZURE_API_KEY, 
-                                                                                                        sentenceCount=n_sentences))
+            batch['short_summary'] = batch['pdf_trimmed'].apply(lambda x: checkpoint.cached("summary", f"{text_key(x)}#{n_sentences}",
+                                                                                            lambda: getDocumentAbstractiveSummary(x, 
+                                                                                                                                  endpoint=AZURE_ENDPOINT, 
+                                                                                                                                  key=AZURE_API_KEY, 
+                                                                                                                                  sentenceCount=n_sentences),
+                                                                                            is_valid=lambda summary: not str(summary).startswith("Uh oh. Error")))
 
             # Concatenate the processed batch to the final DataFrame
             summary_df = pd.concat([summary_df, batch], ignore_index=True)
@@ -269,9 +308,10 @@ def data_schema_summarization(df, price_cap, AZURE_ENDPOINT, AZURE_API_KEY, aws_
     
     
         
-def data_schema_impact(df, GPT_MODEL_SET, OPENAI_API_KEY, aws_client, logging): #redivis_dataset
+def data_schema_impact(df, GPT_MODEL_SET, OPENAI_API_KEY, bucket, logging, row_offsets = None): #redivis_dataset
     """
     Apply LLM to extract the information about the impacts on wetlands
+    row_offsets: max rowID of each table read from the table manifest at the start of the run (see table_store.row_offsets)
     """
     print('Starting OpenAI extraction...')
     
@@ -296,9 +336,10 @@ def data_schema_impact(df, GPT_MODEL_SET, OPENAI_API_KEY, aws_client, logging):
             print(f'Processing batch {i}')
 
             # LLM - wetland impact
-            batch['wetland_llm_dict'] = batch['pdf_character'].apply(lambda x: openAIfunc_wetland(x, 
-                                                                                                  API_KEY=OPENAI_API_KEY, 
-                                                                                                  GPT_MODEL=GPT_MODEL_SET))
+            batch['wetland_llm_dict'] = batch['pdf_character'].apply(lambda x: checkpoint.cached("llm_wetland", f"{text_key(x)}#{GPT_MODEL_SET}",
+                                                                                                 lambda: openAIfunc_wetland(x, 
+                                                                                                                            API_KEY=OPENAI_API_KEY, 
+                                                                                                                            GPT_MODEL=GPT_MODEL_SET)))
 
             # Append the processed batch to the list
             processed_batches.append(batch)
@@ -391,10 +432,10 @@ def data_schema_impact(df, GPT_MODEL_SET, OPENAI_API_KEY, aws_client, logging):
     # wetland_impact_df_redivis = redivis_dataset.table("wetland_impact").to_pandas_dataframe(variables = ["rowID"], progress=False)
     # wetland_final_df['rowID'] = wetland_final_df.reset_index().index + wetland_impact_df_redivis.shape[0] + 1
     
-    # Create rowID (AWS ver)
-    response = aws_client.get_object(Bucket = "usace-notices", Key = "dashboard-data/wetland_final_df.csv")
-    content = response['Body'].read()
-    wetland_existing_row = len(pd.read_csv(io.BytesIO(content)))
+    # Create rowID (AWS ver): from the max rowID in the table manifest
+    if row_offsets is None:
+        row_offsets = table_store.row_offsets(bucket, ["wetland_final_df"])
+    wetland_existing_row = row_offsets["wetland_final_df"]
     wetland_final_df['rowID'] = wetland_final_df.reset_index().index + wetland_existing_row + 1
 
     del wetland_df
@@ -405,9 +446,10 @@ def data_schema_impact(df, GPT_MODEL_SET, OPENAI_API_KEY, aws_client, logging):
 
 
 
-def data_schema_embeding(df, GPT_MODEL_SET, OPENAI_API_KEY, aws_client, logging): #redivis_dataset
+def data_schema_embeding(df, GPT_MODEL_SET, OPENAI_API_KEY, bucket, logging, row_offsets = None): #redivis_dataset
     """
     Generate the project type and embedding table 
+    row_offsets: max rowID of each table read from the table manifest at the start of the run (see table_store.row_offsets)
     """
     print('Starting OpenAI embedding...')
     
@@ -431,13 +473,17 @@ def data_schema_embeding(df, GPT_MODEL_SET, OPENAI_API_KEY, aws_client, logging)
             print(f'Processing batch {i}')
 
             # Apply the openai_embed function and convert its output to DataFrame columns
-            embed_columns = batch['pdf_character'].apply(lambda x: openai_embed(x, API_KEY=OPENAI_API_KEY)).apply(pd.Series)
+            # Failed embeddings come back as an "Error: ..." string and are not checkpointed
+            embed_columns = batch['pdf_character'].apply(lambda x: checkpoint.cached("embedding", text_key(x),
+                                                                                     lambda: openai_embed(x, API_KEY=OPENAI_API_KEY),
+                                                                                     is_valid=lambda output: not isinstance(output[1], str))).apply(pd.Series)
             embed_columns.columns = ['embed_tokens', 'embeddings']  # Assuming the output is two columns
 
             # Apply the openAIfunc_project function
-            project_llm_dict_series = batch['pdf_character'].apply(lambda x: openAIfunc_project(x, 
-                                                                                                API_KEY=OPENAI_API_KEY, 
-                                                                                                GPT_MODEL=GPT_MODEL_SET))
+            project_llm_dict_series = batch['pdf_character'].apply(lambda x: checkpoint.cached("llm_project", f"{text_key(x)}#{GPT_MODEL_SET}",
+                                                                                               lambda: openAIfunc_project(x, 
+                                                                                                                          API_KEY=OPENAI_API_KEY, 
+                                                                                                                          GPT_MODEL=GPT_MODEL_SET)))
 
             # Concatenate the new columns to the batch
             batch = pd.concat([batch, project_llm_dict_series.apply(pd.Series), embed_columns], axis=1)
@@ -463,10 +509,10 @@ def data_schema_embeding(df, GPT_MODEL_SET, OPENAI_API_KEY, aws_client, logging)
     # embed_df_redivis = redivis_dataset.table("embed_project_type").to_pandas_dataframe(variables = ["rowID"], progress=False)
     # embed_final_df['rowID'] = embed_final_df.index + embed_df_redivis.shape[0] + 1
     
-    # Create rowID (AWS ver)
-    response = aws_client.get_object(Bucket = "usace-notices", Key = "dashboard-data/embed_final_df.csv")
-    content = response['Body'].read()
-    embed_existing_row = len(pd.read_csv(io.BytesIO(content)))
+    # Create rowID (AWS ver): from the max rowID in the table manifest
+    if row_offsets is None:
+        row_offsets = table_store.row_offsets(bucket, ["embed_final_df"])
+    embed_existing_row = row_offsets["embed_final_df"]
     embed_final_df['rowID'] = embed_final_df.reset_index().index + embed_existing_row + 1
 
     del embed_df
@@ -525,8 +571,10 @@ def clean_special_characters(df, columns, ascii_threshold=127):
 
 
 
-def data_schema(df, aws_client): # redivis_dataset
+def data_schema(df, bucket, row_offsets = None, archive_workers = 8, archive_rate = 10): # redivis_dataset
     """
+    row_offsets: max rowID of each table read from the table manifest at the start of the run (see table_store.row_offsets)
+    archive_workers / archive_rate: notice PDFs archived to AWS at the same time / started per second
     Process the base dataframe to several tables stored in Redivis database
     """
     print('Splitting tables by schema...')    
@@ -536,10 +584,16 @@ def data_schema(df, aws_client): # redivis_dataset
     # (1) Store PDFs to AWS
     
     # Place pdf to AWS S3 bucket and generate a table with notice id and aws link
-    aws_df = pd.DataFrame([scrape_pdf.pdf_to_aws(aws_client,
-                                                 df.loc[index, "usaceWebUrl"],
-                                                 df.loc[index, "PdfUrl"], 
-                                                 df.loc[index, "noticeID"]) for index in df.index])
+    # (Galveston attachments: the links captured with the webpages; looked up again only when the column is missing)
+    if "AttachmentUrl" in df.columns:
+        notices = list(zip(df["usaceWebUrl"], df["PdfUrl"], df["noticeID"], df["AttachmentUrl"]))
+    else:
+        notices = list(zip(df["usaceWebUrl"], df["PdfUrl"], df["noticeID"]))
+    aws_records, archive_report = scrape_pdf.pdf_to_aws_many(bucket,
+                                                             notices,
+                                                             archive_workers,
+                                                             archive_rate)
+    aws_df = pd.DataFrame(aws_records)
     
     # (2) Main table
     
@@ -601,10 +655,10 @@ def data_schema(df, aws_client): # redivis_dataset
     # manager_df_redivis = redivis_dataset.table("manager").to_pandas_dataframe(variables = ["rowID"], progress=False)
     # manager_df['rowID'] = manager_df.reset_index().index + manager_df_redivis.shape[0] + 1
     
-    # Create rowID (AWS ver)
-    response = aws_client.get_object(Bucket = "usace-notices", Key = "dashboard-data/manager_df.csv")
-    content = response['Body'].read()
-    manager_existing_row = len(pd.read_csv(io.BytesIO(content)))
+    # Create rowID (AWS ver): from the max rowID in the table manifest
+    if row_offsets is None:
+        row_offsets = table_store.row_offsets(bucket, ["manager_df", "character_df", "mitigation_df", "location_df"])
+    manager_existing_row = row_offsets["manager_df"]
     manager_df['rowID'] = manager_df.reset_index().index + manager_existing_row + 1
     
     
@@ -625,10 +679,8 @@ def data_schema(df, aws_client): # redivis_dataset
     # character_df_redivis = redivis_dataset.table("character").to_pandas_dataframe(variables = ["rowID"], progress=False)
     # character_df['rowID'] = character_df.reset_index().index + character_df_redivis.shape[0] + 1
     
-    # Create rowID (AWS ver)
-    response = aws_client.get_object(Bucket = "usace-notices", Key = "dashboard-data/character_df.csv")
-    content = response['Body'].read()
-    character_existing_row = len(pd.read_csv(io.BytesIO(content)))
+    # Create rowID (AWS ver): from the max rowID in the table manifest
+    character_existing_row = row_offsets["character_df"]
     character_df['rowID'] = character_df.reset_index().index + character_existing_row + 1
     
     
@@ -649,10 +701,8 @@ def data_schema(df, aws_client): # redivis_dataset
     # mitigation_df_redivis = redivis_dataset.table("mitigation").to_pandas_dataframe(variables = ["rowID"], progress=False)
     # mitigation_df['rowID'] = mitigation_df.reset_index().index + mitigation_df_redivis.shape[0] + 1
     
-    # Create rowID (AWS ver)
-    response = aws_client.get_object(Bucket = "usace-notices", Key = "dashboard-data/mitigation_df.csv")
-    content = response['Body'].read()
-    mitigation_existing_row = len(pd.read_csv(io.BytesIO(content)))
+    # Create rowID (AWS ver): from the max rowID in the table manifest
+    mitigation_existing_row = row_offsets["mitigation_df"]
     mitigation_df['rowID'] = mitigation_df.reset_index().index + mitigation_existing_row + 1
 
 
@@ -675,10 +725,8 @@ def data_schema(df, aws_client): # redivis_dataset
     # location_df_redivis = redivis_dataset.table("location").to_pandas_dataframe(variables = ["rowID"], progress=False)
     # location_df['rowID'] = location_df.reset_index().index + location_df_redivis.shape[0] + 1
     
-    # Create rowID (AWS ver)
-    response = aws_client.get_object(Bucket = "usace-notices", Key = "dashboard-data/location_df.csv")
-    content = response['Body'].read()
-    location_existing_row = len(pd.read_csv(io.BytesIO(content)))
+    # Create rowID (AWS ver): from the max rowID in the table manifest
+    location_existing_row = row_offsets["location_df"]
     location_df['rowID'] = location_df.reset_index().index + location_existing_row + 1
 
     location_df['type'] = location_df['type'].str.split('_').str[-1]
@@ -705,7 +753,7 @@ def data_schema(df, aws_client): # redivis_dataset
             # "validation_df":validation_df
     }
 
-def geocode(aws_client, new_locations): #dataset
+def geocode(bucket, new_locations): #dataset
     """
     This function looks for lat/longs that have yet to be geocoded (not just for new new notices but all notices). 
     It then geocodes them and returns it as a dataframe.
@@ -720,20 +768,15 @@ def geocode(aws_client, new_locations): #dataset
     # allDf = table.to_pandas_dataframe(progress=False)
     # allDf = pd.concat([allDf, new_locations], axis=0)
     
-    #Load needed tables (AWS)
+    #Load needed tables (AWS): from the snapshot of the run, only the columns used here
+    if not snapshot.active():
+        snapshot.begin(bucket)
+    
     ## Geocoded Locations
-    response = aws_client.get_object(Bucket = "usace-notices",
-                                     Key = "dashboard-data/geocoded_df.csv")
-
-    content = response['Body'].read()
-    geocodedDf = pd.read_csv(io.BytesIO(content))
+    geocodedDf = snapshot.table("geocoded_df", columns = ["noticeID"])
     
     ## All Locations
-    response = aws_client.get_object(Bucket = "usace-notices",
-                                     Key = "dashboard-data/location_df.csv")
-
-    content = response['Body'].read()
-    allDf = pd.read_csv(io.BytesIO(content))
+    allDf = snapshot.table("location_df", columns = ["noticeID", "type", "detail"])
     allDf = pd.concat([allDf, new_locations], ignore_index=True)
     
 
@@ -785,6 +828,14 @@ def geocode(aws_client, new_locations): #dataset
 
     #Geocode function
     def geocodeCensus(lat, long, censusYear=2020):
+        """
+        Checkpointed geocodeCensusRequest: only successful (code 200) lookups are kept
+        """
+        return checkpoint.cached("geocode", f"{lat},{long},{censusYear}",
+                                 lambda: geocodeCensusRequest(lat, long, censusYear),
+                                 is_valid=lambda output: output[0] == 200)
+
+    def geocodeCensusRequest(lat, long, censusYear=2020):
         """
         This function takes a location and returns a list with geocoded location data and data appends from Geocod.io.
         """
@@ -801,7 +852,7 @@ def geocode(aws_client, new_locations): #dataset
         url = "https://geo.fcc.gov/api/census/area?"
         latLon = "lat="+str(lat)+"&lon="+str(long)
         censusYear = f"&censusYear={censusYear}"+"&format=json"
-        response = requests.get(url=url+latLon+censusYear)
+        response = http_client.get(url=url+latLon+censusYear)
         
         if response.status_code == 200:
             try:
@@ -946,11 +997,14 @@ def upload_redivis(tbl_to_upload, redivis_dataset, directory, overwrite_redivis
             
             
             
-def upload_aws(main_tbls, tbl_to_upload, aws_client):
+def upload_aws(main_tbls, tbl_to_upload, bucket, regenerate_csv = 0, row_offsets = None, upload_workers = 8):
     """
-    Upload tables to AWS S3 bucket;
+    Upload tables to AWS S3 bucket: the new rows are appended as Parquet parts (see table_store.py);
     main_tbls: a dictionary of dataframes
     tbl_to_upload: "all", "none", or a list such as ["main_df", "manager_df", "location_df", "character_df", "mitigation_df", "fulltext_df", "summary_df", "wetland_final_df", "embed_final_df", "validation_df", "aws_df", "geocoded_df"]
+    regenerate_csv: 1, also regenerate the legacy CSVs (dashboard-data/<table>.csv) of the uploaded tables from all their parts (see export_csvs); 0, Parquet only
+    row_offsets: the max rowIDs the rowIDs of this run were generated from; the upload is refused if another run added rows since
+    upload_workers: number of tables / objects uploaded at the same time
     """
     
     # Get a list of uploading files
@@ -966,30 +1020,75 @@ def upload_aws(main_tbls, tbl_to_upload, aws_client):
         tbl_dict = {tbl_name: main_tbls[tbl_name] for tbl_name in list(main_tbls.keys()) if tbl_name in tbl_to_upload}
         print('Starting upload selected tables to the bucket...')
     
-    for tbl_name, tbl in tbl_dict.items():
-        
-        # Pull existing data in AWS
+    # Partition (district, publish month) of the notices of this run
+    partitions = table_store.notice_partitions(main_tbls.get("main_df"))
+    run_id = table_store.new_run_id()
+    
+    # Write the new rows of every table as Parquet parts: no download of the existing tables
+    staged = table_store.stage(bucket, tbl_dict, partitions, run_id, upload_workers)
+    
+    # Publish all tables at once in the manifest (row counts, max rowIDs, schemas)
+    table_store.commit(bucket, staged, row_offsets)
+    
+    for tbl_name, parts in staged.items():
+        print(f"{tbl_name} was successfully uploaded ({len(parts)} parts)")
+
+    # Keep the known-notice index in step with main_df; the parts it misses are caught up by the next notice_index.load
+    # (the legacy part, moved from main_df.csv, is read there once rather than assumed to match the index)
+    if "main_df" in staged:
         try:
-            response = aws_client.get_object(Bucket = "usace-notices",
-                                             Key = f"dashboard-data/{tbl_name}.csv")
-        
-            content = response['Body'].read()
-            existing_df = pd.read_csv(io.BytesIO(content))
-        except:
-            existing_df = pd.DataFrame()
-            
-        # Append data
-        upload_df = pd.concat([existing_df, tbl], ignore_index=True)
-        
-        # Convert DataFrame to bytes
-        csv_buffer = io.BytesIO()
-        upload_df.to_csv(csv_buffer, index=False)
-        upload_bytes = csv_buffer.getvalue()
-        
-        aws_client.put_object(
-            Body = upload_bytes, 
-            Bucket = "usace-notices", 
-            Key = f'dashboard-data/{tbl_name}.csv', 
-            ACL = "public-read")
-        
-        print(f"{tbl_name} was successfully uploaded")
\ No newline at end of file
+            notice_index.add(bucket, tbl_dict["main_df"]["usaceWebUrl"].dropna(),
+                             [part for part in staged["main_df"] if part["district"] != "legacy"])
+            print("notice index was successfully updated")
+        except notice_index.IndexConflict as e:
+            print(f"notice index was not updated ({e}); the next update run adds the new notices")
+    
+    # Legacy CSVs for the dashboard: opt-in, as they are rewritten from all the parts of each table
+    if regenerate_csv == 1:
+        export_csvs(bucket, list(staged.keys()), upload_workers)
+
+
+
+
+def export_csvs(bucket, tbl_names = None, workers = 8):
+    """
+    Regenerate the legacy CSVs (dashboard-data/<table>.csv, gzip, streamed) from the Parquet parts, tables in parallel.
+    Reads every part of each table, so it costs as much as the whole history: run it when the dashboard needs the CSVs,
+    not at every upload (python main.py export_csv [table ...]).
+    tbl_names: the tables to export; None, every table of the manifest
+    """
+
+    if tbl_names is None:
+        tbl_names = sorted(manifest.read(bucket)[0].get("tables", {}).keys())
+    with ThreadPoolExecutor(max_workers = workers) as pool:
+        list(pool.map(lambda tbl_name: table_store.export_csv(bucket, tbl_name), tbl_names))
+
+
+
+
+def reextract_archived(bucket, district = "all"):
+    """
+    Re-extract the pdf fields of the archived notices from their full texts (fulltext_df), e.g. after the extraction patterns changed,
+    one column of texts per district (scrape_pdf.run_extraction_plan_column): a DataFrame of noticeID, district and the pdf fields.
+    The archived texts had their special characters removed (clean_special_characters), so a few fields may differ from the scraping.
+    district: one district (swg, mvn, saj, sam), or "all"
+    """
+
+    notices = table_store.read_table(bucket, "main_df", columns = ["noticeID", "usaceWebUrl"]).drop_duplicates(subset = "noticeID")
+    notices["district"] = notices["usaceWebUrl"].astype(str).str.extract(r'www\.(.*?)\.usace', expand = False)
+    if district != "all":
+        notices = notices[notices["district"] == district]
+
+    index = table_store.read_table(bucket, text_store.TABLE, columns = text_store.INDEX_COLUMNS + text_store.TEXT_COLUMNS)
+    texts = text_store.attach_texts(bucket, index[index["noticeID"].isin(notices["noticeID"])])
+    texts = texts.merge(notices[["noticeID", "district"]], on = "noticeID")
+
+    frames = []
+    for name, group in texts.groupby("district"):
+        print(f"Re-extracting {len(group)} {name} notices")
+        fields = scrape_pdf.run_extraction_plan_column(group["pdf_full_text"], name)
+        frames.append(pd.concat([group[["noticeID", "district"]], fields.drop(columns = ["pdf_trimmed"])], axis = 1))
+
+    if len(frames) == 0:
+        return pd.DataFrame(columns = ["noticeID", "district"])
+    return pd.concat(frames, ignore_index = True)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import io
+import json
+import time
+import random
+import pandas as pd
+import storage
+
+
+
+
+# Manifest of the dashboard tables: one small JSON object in the bucket, updated with conditional writes.
+# Every update is a compare-and-swap on the ETag of the object (a put with if_match / if_none_match, see storage.py),
+# so concurrent runs never overwrite each other's changes: the loser re-reads the manifest and tries again.
+#   {"counters": {"noticeID": <next free number>},
+#    "tables": {<table>: {"parts": [...]}}}          (see table_store.py)
+
+MANIFEST_KEY = "dashboard-data/manifest.json"
+
+
+
+
+class ManifestConflict(Exception):
+    """
+    The manifest was changed by another run between our read and our write
+    """
+
+
+
+
+def read(bucket):
+    """
+    Return (manifest, etag); ({}, None) when the manifest does not exist yet
+    """
+
+    try:
+        content, etag = bucket.get_with_etag(MANIFEST_KEY)
+    except storage.NotFound:
+        return {}, None
+
+    return json.loads(content), etag
+
+
+
+
+def write(bucket, manifest, etag):
+    """
+    Write the manifest only if it is still at version etag (None: only if it does not exist); return the new etag.
+    Raises ManifestConflict if another run got there first.
+    """
+
+    try:
+        return bucket.put(MANIFEST_KEY,
+                          json.dumps(manifest, indent = 1, sort_keys = True).encode("utf-8"),
+                          content_type = "application/json",
+                          if_match = etag,
+                          if_none_match = etag is None)
+    except storage.PreconditionFailed:
+        raise ManifestConflict(f"{MANIFEST_KEY} changed since version {etag}")
+
+
+
+
+def update(bucket, change, max_attempts = 10):
+    """
+    Read-modify-write of the manifest: change(manifest) edits the manifest in place and may return a value,
+    which is returned once the write has succeeded. Retried with backoff on conflicts.
+    """
+
+    for attempt in range(max_attempts):
+        manifest, etag = read(bucket)
+        result = change(manifest)
+        try:
+            write(bucket, manifest, etag)
+            return result
+        except ManifestConflict:
+            time.sleep(random.uniform(0, 0.2 * 2 ** attempt))
+
+    raise ManifestConflict(f"Could not update {MANIFEST_KEY} after {max_attempts} attempts")
+
+
+
+
+def max_notice_number(bucket):
+    """
+    Largest Notice_NO_* in main_df.csv; only used to start the noticeID counter the first time
+    """
+
+    try:
+        content = bucket.get("dashboard-data/main_df.csv")
+    except storage.NotFound:
+        return 0
+
+    notice_ids = pd.read_csv(io.BytesIO(content), usecols = ["noticeID"])["noticeID"]
+    numbers = notice_ids.astype(str).str.extract(r'Notice_NO_(\d+)', expand = False).dropna().astype(int)
+    return int(numbers.max()) if len(numbers) > 0 else 0
+
+
+
+
+def reserve_notice_ids(bucket, n):
+    """
+    Atomically reserve n consecutive noticeID numbers and return the first one.
+    Numbers reserved by a run that fails before uploading are not reused.
+    """
+
+    # Start the counter from main_df.csv the first time (outside of the compare-and-swap loop)
+    manifest, _ = read(bucket)
+    start_on = None
+    if "noticeID" not in manifest.get("counters", {}):
+        start_on = max_notice_number(bucket) + 1
+
+    def change(manifest):
+        counters = manifest.setdefault("counters", {})
+        first = counters.get("noticeID", start_on)
+        if first is None:
+            # The manifest was recreated without the counter since our first read
+            first = max_notice_number(bucket) + 1
+        counters["noticeID"] = first + n
+        return first
+
+    return update(bucket, change)
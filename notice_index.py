@@ -0,0 +1,179 @@
+import io
+import time
+import random
+import hashlib
+import numpy as np
+import pandas as pd
+import storage
+import table_store
+
+
+
+
+# Known-notice index: sorted 64-bit hashes of the usaceWebUrl of every notice in main_df, published next to the tables.
+# Update scraping downloads this small object (8 bytes per notice) instead of the whole main_df.csv to find new notices.
+# It also lists the main_df parts its hashes were taken from, so parts committed without their urls being added
+# (a run that failed between the manifest commit and the index update) are caught up on the next load.
+# Updates are conditional writes on the ETag, retried like the manifest updates, so concurrent runs do not lose urls.
+# The format version is part of the key, so a change of hash or layout starts a new index.
+
+INDEX_KEY = "dashboard-data/notice_index.v2.npz"
+
+
+
+
+class IndexConflict(Exception):
+    pass
+
+
+
+
+def url_hash(url):
+    """
+    64-bit hash of a notice url
+    """
+
+    return int.from_bytes(hashlib.blake2b(str(url).strip().encode("utf-8"), digest_size = 8).digest(), "little")
+
+
+
+
+def build(urls):
+    """
+    Sorted, unique array (uint64) of the url hashes
+    """
+
+    return np.unique(np.fromiter((url_hash(url) for url in urls), dtype = np.uint64))
+
+
+
+
+def contains(index, urls):
+    """
+    Boolean array: which urls are in the index (binary search in the sorted hashes)
+    """
+
+    hashes = np.fromiter((url_hash(url) for url in urls), dtype = np.uint64)
+    if len(index) == 0:
+        return np.zeros(len(hashes), dtype = bool)
+    positions = np.minimum(np.searchsorted(index, hashes), len(index) - 1)
+    return index[positions] == hashes
+
+
+
+
+def read(bucket):
+    """
+    Return (hashes, keys of the indexed main_df parts, etag); (None, [], None) when the index does not exist yet
+    """
+
+    try:
+        content, etag = bucket.get_with_etag(INDEX_KEY)
+    except storage.NotFound:
+        return None, [], None
+
+    with np.load(io.BytesIO(content), allow_pickle = False) as arrays:
+        return arrays["hashes"], list(arrays["parts"]), etag
+
+
+
+
+def write(bucket, index, parts, etag):
+    """
+    Write the index only if it is still at version etag (None: only if it does not exist); raises storage.PreconditionFailed otherwise
+    """
+
+    buffer = io.BytesIO()
+    np.savez(buffer, hashes = np.asarray(index, dtype = np.uint64), parts = np.array(sorted(parts), dtype = str))
+    return bucket.put(INDEX_KEY, buffer.getvalue(), if_match = etag, if_none_match = etag is None)
+
+
+
+
+def part_urls(bucket, parts):
+    """
+    Notice urls of some main_df parts
+    """
+
+    urls = [pd.read_parquet(io.BytesIO(bucket.get(part["key"])), columns = ["usaceWebUrl"])["usaceWebUrl"] for part in parts]
+    if len(urls) == 0:
+        return pd.Series([], dtype = object)
+    return pd.concat(urls, ignore_index = True).dropna()
+
+
+
+
+def bootstrap(bucket):
+    """
+    Hashes and indexed parts built from the urls of main_df (its Parquet parts, or main_df.csv before the first Parquet upload);
+    used when the index does not exist yet
+    """
+
+    parts = table_store.list_parts(bucket, "main_df")
+    if len(parts) > 0:
+        urls = part_urls(bucket, parts)
+    else:
+        content = bucket.get("dashboard-data/main_df.csv")
+        urls = pd.read_csv(io.BytesIO(content), usecols = ["usaceWebUrl"])["usaceWebUrl"].dropna()
+    index = build(urls)
+    print(f"Built the known-notice index from main_df ({len(index)} notices)")
+    return index, [part["key"] for part in parts]
+
+
+
+
+def update(bucket, urls, parts, max_attempts = 10):
+    """
+    Read-modify-write of the index: add the hashes of urls and the keys of the main_df parts they come from.
+    Retried with backoff on conflicts; return the new index.
+    """
+
+    hashes = build(urls)
+    for attempt in range(max_attempts):
+        index, indexed, etag = read(bucket)
+        if index is None:
+            index, indexed = bootstrap(bucket)
+        index = np.union1d(index, hashes).astype(np.uint64)
+        try:
+            write(bucket, index, set(indexed) | set(parts), etag)
+            return index
+        except storage.PreconditionFailed:
+            time.sleep(random.uniform(0, 0.2 * 2 ** attempt))
+
+    raise IndexConflict(f"Could not update {INDEX_KEY} after {max_attempts} attempts")
+
+
+
+
+def load(bucket):
+    """
+    Download the index (built from main_df when it does not exist yet), with the urls of the main_df parts
+    listed in the manifest but not in the index added
+    """
+
+    index, indexed, _ = read(bucket)
+    if index is None:
+        return update(bucket, [], [])
+
+    indexed = set(indexed)
+    missing = [part for part in table_store.list_parts(bucket, "main_df") if part["key"] not in indexed]
+    if len(missing) == 0:
+        return index
+
+    urls = part_urls(bucket, missing)
+    print(f"Adding {len(urls)} notices of {len(missing)} main_df parts missing from the known-notice index")
+    try:
+        return update(bucket, urls, [part["key"] for part in missing])
+    except IndexConflict:
+        # Published by a later run; this run still skips the notices already in main_df
+        return np.union1d(index, build(urls)).astype(np.uint64)
+
+
+
+
+def add(bucket, urls, parts):
+    """
+    Add the urls of newly uploaded notices, and the main_df parts that hold them, to the published index
+    """
+
+    return update(bucket, urls, [part["key"] for part in parts])
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import http_client
+
+
+
+
+# Content-addressed PDF store: each notice PDF is downloaded once and kept on local disk
+#   objects/<sha256>.pdf  PDF bytes, named by content hash (identical files are stored once)
+#   urls/<sha1 of url>    the content hash the url resolved to, with the ETag/Last-Modified validators of the response and when it was checked
+# A url checked more than revalidate_seconds ago is revalidated with a conditional GET, so a PDF revised at the same url is downloaded again
+
+_settings = {"directory": "pdf_cache/",
+             "max_bytes": 2 * 1024 ** 3,
+             "revalidate_seconds": 24 * 3600}
+
+_evict_lock = threading.Lock()
+
+
+
+
+def configure(directory = None, max_bytes = None, revalidate_seconds = None):
+    """
+    Set the cache directory, the maximum size (bytes) of the disk tier, and the seconds after which a url is revalidated
+    """
+
+    if directory is not None:
+        _settings["directory"] = directory
+    if max_bytes is not None:
+        _settings["max_bytes"] = max_bytes
+    if revalidate_seconds is not None:
+        _settings["revalidate_seconds"] = revalidate_seconds
+
+
+
+
+def settings():
+    """
+    Return a copy of the current settings
+    """
+
+    return dict(_settings)
+
+
+
+
+def _url_ref_path(url):
+    return os.path.join(_settings["directory"], "urls", hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+
+def _object_path(content_hash):
+    return os.path.join(_settings["directory"], "objects", content_hash + ".pdf")
+
+
+def _write_atomic(path, data):
+    """
+    Write to a temp file and rename it into place, so other threads/processes never see partial files
+    """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+
+
+def _read_ref(url):
+    """
+    The ref of a url: {"hash", "etag", "last_modified", "checked"}, or None; refs of older versions hold the bare hash (never checked)
+    """
+
+    try:
+        with open(_url_ref_path(url), "r") as f:
+            content = f.read().strip()
+    except OSError:
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return {"hash": content, "etag": None, "last_modified": None, "checked": 0}
+
+
+
+
+def _write_ref(url, content_hash, response, previous = None):
+    # A 304 response may leave out the validators: keep the previous ones
+    previous = previous or {}
+    ref = {"hash": content_hash,
+           "etag": response.headers.get("ETag") or previous.get("etag"),
+           "last_modified": response.headers.get("Last-Modified") or previous.get("last_modified"),
+           "checked": time.time()}
+    _write_atomic(_url_ref_path(url), json.dumps(ref).encode("utf-8"))
+
+
+
+
+def _fresh(ref):
+    return time.time() - ref["checked"] < _settings["revalidate_seconds"]
+
+
+
+
+def lookup(url, fresh_only = False):
+    """
+    Return the local path of the cached PDF of a url, or None if it has not been downloaded (or, with fresh_only, is due for revalidation)
+    """
+
+    ref = _read_ref(url)
+    if ref is None or (fresh_only and not _fresh(ref)):
+        return None
+
+    object_path = _object_path(ref["hash"])
+    if not os.path.exists(object_path):
+        # The object was evicted
+        return None
+
+    # Mark as recently used for the LRU eviction
+    try:
+        os.utime(object_path)
+    except OSError:
+        return None
+    return object_path
+
+
+
+
+def get_pdf_path(url):
+    """
+    Return the local path of the PDF of a url; download it on a cache miss, and revalidate it (conditional GET) when it was checked more
+    than revalidate_seconds ago.
+    Raises for dead links (HTTP errors), which are not cached.
+    """
+
+    object_path = lookup(url, fresh_only = True)
+    if object_path is not None:
+        return object_path
+
+    # Stale: ask the server whether the cached PDF is still current
+    ref = _read_ref(url)
+    object_path = lookup(url)
+    headers = {}
+    if object_path is not None:
+        if ref.get("etag"):
+            headers["If-None-Match"] = ref["etag"]
+        if ref.get("last_modified"):
+            headers["If-Modified-Since"] = ref["last_modified"]
+
+    response = http_client.get(url, headers = headers)
+    if response.status_code == 304 and object_path is not None:
+        _write_ref(url, ref["hash"], response, ref)
+        return object_path
+    response.raise_for_status()
+    content = response.content
+
+    content_hash = hashlib.sha256(content).hexdigest()
+    object_path = _object_path(content_hash)
+    if not os.path.exists(object_path):
+        _write_atomic(object_path, content)
+    _write_ref(url, content_hash, response)
+
+    evict(keep = object_path)
+
+    return object_path
+
+
+
+
+def get_pdf(url):
+    """
+    Return the PDF bytes of a url; download it on a cache miss
+    """
+
+    # The PDF can be evicted (by another thread or process) between the lookup and the read: then it is a cache miss
+    for attempt in range(3):
+        try:
+            with open(get_pdf_path(url), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+
+
+
+
+def evict(keep = None):
+    """
+    Remove the least recently used PDFs until the disk tier fits in max_bytes
+    """
+
+    objects_dir = os.path.join(_settings["directory"], "objects")
+
+    with _evict_lock:
+        try:
+            entries = [entry for entry in os.scandir(objects_dir) if entry.name.endswith(".pdf")]
+        except OSError:
+            return
+
+        files = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if total_bytes <= _settings["max_bytes"]:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except OSError:
+                pass
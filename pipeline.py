@@ -0,0 +1,174 @@
+import re
+import queue
+import logging
+import threading
+import pandas as pd
+import pdf_store
+import checkpoint
+import scrape_rss_webpage
+import scrape_pdf
+
+
+
+
+# Streaming pipeline from the notice list to df_base:
+#   notice urls -> (web fetch) -> (PDF fetch) -> (PDF extraction) -> micro-batches of df_base rows
+# The stages are connected by bounded queues, so network and CPU work overlap and only a bounded number of
+# notices is in flight at any time. Finished web and PDF stages are checkpointed per notice.
+
+_END = object()
+
+
+
+
+def _start_stage(func, in_queue, out_queue, workers):
+    """
+    Start `workers` threads that apply func to the items of in_queue and put the results on out_queue.
+    func returns None to drop an item; an item on which func raises is reported and dropped, and the worker goes on.
+    The end marker is passed on once all workers are done.
+    """
+
+    def work():
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                # Let the other workers of this stage see the end marker too
+                in_queue.put(_END)
+                return
+            try:
+                result = func(item)
+            except Exception as e:
+                logging.error(f"{func.__name__} failed for {item.get('usaceWebUrl')}: {e}")
+                print(f"{func.__name__} failed for {item.get('usaceWebUrl')}: {e}")
+                continue
+            if result is not None:
+                out_queue.put(result)
+
+    threads = [threading.Thread(target = work, daemon = True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+
+    def close():
+        for thread in threads:
+            thread.join()
+        out_queue.put(_END)
+
+    threading.Thread(target = close, daemon = True).start()
+
+
+
+
+def stream_notices(weblist, update, tesseract_path = None, web_workers = 8, host_limits = None,
+                   pdf_fetch_workers = 4, pdf_workers = 1, pdf_timeout = None, queue_size = 32, batch_size = 20):
+    """
+    Scrape the webpage and PDF of each notice in weblist and yield the df_base rows in micro-batches (DataFrames).
+
+    web_workers / host_limits: notice webpages scraped at the same time in total / per district host
+    pdf_fetch_workers: notice PDFs downloaded to the PDF store at the same time
+    pdf_workers: processes extracting PDFs; 1 without pdf_timeout extracts in this process
+    pdf_timeout: seconds allowed to extract one notice PDF; a notice over the limit has its worker process terminated and replaced
+    queue_size: maximum notices waiting between two stages
+    batch_size: rows per yielded micro-batch
+
+    Rows come in the order they finish; the "position" column gives their order in weblist.
+    """
+
+    if host_limits is None:
+        host_limits = {}
+
+    url_queue = queue.Queue(maxsize = queue_size)
+    web_queue = queue.Queue(maxsize = queue_size)
+    pdf_queue = queue.Queue(maxsize = queue_size)
+
+    # (1) Feed the notice list
+    def feed():
+        for position, row in enumerate(weblist.to_dict("records")):
+            row["position"] = position
+            url_queue.put(row)
+        url_queue.put(_END)
+
+    threading.Thread(target = feed, daemon = True).start()
+
+    # (2) Scrape the webpage of each notice, politely per district host
+    host_semaphores = {}
+    host_lock = threading.Lock()
+
+    def web_stage(row):
+        host = re.search(r'www\.(.*?)\.usace', row["usaceWebUrl"]).group(1)
+        with host_lock:
+            if host not in host_semaphores:
+                host_semaphores[host] = threading.BoundedSemaphore(host_limits.get(host, 2))
+        def scrape():
+            with host_semaphores[host]:
+                return scrape_rss_webpage.web_extraction(row["usaceWebUrl"], update)
+        try:
+            row.update(checkpoint.cached("web", f'{row["usaceWebUrl"]}#update={update}', scrape))
+            return row
+        except Exception as e:
+            logging.error(f"Webpage scraping failed for {row['usaceWebUrl']}: {e}")
+            print(f"Webpage scraping failed for {row['usaceWebUrl']}: {e}")
+            return None
+
+    _start_stage(web_stage, url_queue, web_queue, web_workers)
+
+    # (3) Download the notice PDF into the PDF store, so the extraction stage only reads from local disk;
+    # notices extracted by an earlier run are picked up from the checkpoints
+    def pdf_fetch_stage(row):
+        found, pdf_fields = checkpoint.get("pdf", row["usaceWebUrl"])
+        row["checkpoint"] = pdf_fields if found else None
+        if found == False and pd.isnull(row["PdfUrl"]) == False and "ERROR" not in str(row["PdfUrl"]):
+            try:
+                pdf_store.get_pdf_path(row["PdfUrl"])
+            except Exception:
+                # Dead links are handled by pdf_read
+                pass
+        return row
+
+    _start_stage(pdf_fetch_stage, web_queue, pdf_queue, pdf_fetch_workers)
+
+    # (4) Extract the PDF fields, and group the rows into micro-batches
+    batch = []
+
+    def add_row(row, pdf_fields):
+        # Timed-out or failed extractions are not checkpointed, so the next run tries them again
+        if row.pop("checkpoint") is None and not str(pdf_fields["pdf_text_flag"]).startswith("ERROR: PDF extraction"):
+            checkpoint.put("pdf", row["usaceWebUrl"], pdf_fields)
+        row.update(pdf_fields)
+        batch.append(row)
+
+    if pdf_workers <= 1 and pdf_timeout is None:
+        for row in iter(pdf_queue.get, _END):
+            if row["checkpoint"] is not None:
+                add_row(row, row["checkpoint"])
+            else:
+                try:
+                    pdf_fields = scrape_pdf.pdf_extraction(row["PdfUrl"], row["web_text"], row["web_title"], tesseract_path)
+                except Exception as e:
+                    print(f"PDF extraction failed for {row['usaceWebUrl']}: {e}")
+                    pdf_fields = scrape_pdf.pdf_extraction_error("ERROR: PDF extraction failed; " + str(e))
+                add_row(row, pdf_fields)
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch)
+                batch = []
+
+    else:
+        rows = {}
+
+        def tasks():
+            for row in iter(pdf_queue.get, _END):
+                rows[row["position"]] = row
+                if row["checkpoint"] is not None:
+                    yield (row["position"], row["checkpoint"])
+                else:
+                    yield (row["position"], (row["PdfUrl"], row["web_text"], row["web_title"]))
+
+        # The pool takes at most one notice ahead per worker, so pdf_queue stays the bound on the notices in flight
+        with scrape_pdf.PdfExtractionPool(pdf_workers, tesseract_path, pdf_timeout) as pool:
+            for position, pdf_fields in pool.imap_unordered(tasks()):
+                add_row(rows.pop(position), pdf_fields)
+                if len(batch) >= batch_size:
+                    yield pd.DataFrame(batch)
+                    batch = []
+
+    if len(batch) > 0:
+        yield pd.DataFrame(batch)
@@ -1,13 +1,23 @@
 import pandas as pd
 # import numpy as np
 from bs4 import BeautifulSoup
-import requests
+import http_client
+import pdf_store
+import scrape_rss_webpage
+import extractors
 import PyPDF2 as pdf
 import io
 import re
 import nltk
 import boto3
 import time
+import hashlib
+import tempfile
+import queue
+import threading
+import multiprocessing
+import multiprocessing.connection
+from concurrent.futures import ThreadPoolExecutor
 import fitz
 import pytesseract
 from PIL import Image
@@ -25,8 +35,8 @@ def OCR(pdf_url, tesseract_path):
     if tesseract_path is not None:
         pytesseract.pytesseract.tesseract_cmd = tesseract_path
     
-    # Download the PDF file
-    pdf_content = requests.get(pdf_url).content
+    # Read the PDF file from the PDF store (downloaded once per run)
+    pdf_content = pdf_store.get_pdf(pdf_url)
     
     # Open the PDF file from bytes
     pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
@@ -60,8 +70,8 @@ def pdf_read(pdf_url, district):
     """
     
     try:
-        # Download the PDF content as a bytes object
-        pdf_bytes = requests.get(pdf_url).content
+        # Download the PDF content as a bytes object (or read it from the PDF store)
+        pdf_bytes = pdf_store.get_pdf(pdf_url)
 
         # Create a PyPDF2 PdfFileReader object from the PDF content
         pdf_reader = pdf.PdfReader(io.BytesIO(pdf_bytes))
@@ -131,521 +141,651 @@ def pdf_read(pdf_url, district):
     
     
     
+# Regex patterns of the PDF field extractors (see extractors.py), compiled once per district on first use
+
+extractors.add_patterns("pdf", {
+    # Section markers
+    "applicant_marker": extractors.Marker(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', "applicant"),
+    "agent_marker": extractors.Marker(r'A\s?[Gg]\s?[Ee]\s?[Nn]\s?[Tt]', "agent"),
+    "location_marker": extractors.Marker(r'L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]', "location"),
+    # Letter heading of the notices
+    "trim_intro": r'(T\s?O\s?W\s?H\s?O\s?M\s?I\s?T\s?M\s?A\s?Y\s?C\s?O\s?N\s?C\s?E\s?R\s?N|P\s?U\s?R\s?P\s?O\s?S\s?E\s?O\s?F\s?P\s?U\s?B\s?L\s?I\s?C\s?N\s?O\s?T\s?I\s?C\s?E|I\s?n\s?t\s?e\s?r\s?e\s?s\s?t\s?e\s?d\s?p\s?a\s?r\s?t\s?i\s?e\s?s).*?(?=A\s?P\s?P\s?L\s?I\s?C\s?A\s?N\s?T|4\s?0\s?8\s?\))',
+    "app_num_date": r'(January|February|March|April|May|June|July|August|September|October|November|December).*',
+    # Applicant / agent
+    "applicant": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?\:?(.+?)(?=(P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d|c\/o|A\s?t\s?t\s?n|A\s?t\s?t\s?e\s?n\s?t\s?i\s?o\s?n))',
+    "agent": r'A\s?[Gg]\s?[Ee]\s?[Nn]\s?[Tt]\s?:?(.+?)(?=(P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d|c\/o|A\s?t\s?t\s?n|A\s?t\s?t\s?e\s?n\s?t\s?i\s?o\s?n|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))',
+    # Mitigation (Mobile, Jacksonville, Galveston)
+    "mitigation_marker": extractors.Marker(r'(A\s?V\s?O\s?I\s?D\s?A\s?N\s?C\s?E\s?(&|A\s?N\s?D)\s?M\s?I\s?N\s?I\s?M\s?I\s?Z\s?A\s?T\s?I\s?O\s?N|C?\s?O?\s?M?\s?P?\s?E?\s?N?\s?S?\s?A?\s?T?\s?O?\s?R?\s?Y?\s?M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N)',
+                                          "minimization", "mitigation"),
+    "avoidance_minimization": r'M\s?[Ii]\s?[Nn]\s?[Ii]\s?[Mm]\s?[Ii]\s?[Zz]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?[Ii]?\s?[Nn]?\s?[Ff]?\s?[Oo]?\s?[Rr]?\s?[Mm]?\s?[Aa]?\s?[Tt]?\s?[Ii]?\s?[Oo]?\s?[Nn]?.+?(?=([A-Z]{6,}[:\s]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?w\s?i\s?l\s?l\s?a\s?p\s?p\s?l\s?y))',
+    "compensatory_mitigation": r'M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N.+?(?=([A-Z]{6,}[:\s]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?w\s?i\s?l\s?l\s?a\s?p\s?p\s?l\s?y))',
+    # Others
+    "wqc": r'W\s?Q\s?C\s?:?#?([\d\s]*-[\s\d]*)',
+    "coastal_use_permit": r'P\d{8}',
+    "hydrologic_marker": extractors.Marker(r'(H\s?y\s?d\s?r\s?o\s?l\s?o\s?g\s?i\s?c\s?U\s?n\s?i\s?t\s?C\s?o\s?d\s?e|H\s?U\s?C)', "hydrologicunitcode", "huc"),
+    "hydrologic": r'(H\s?y\s?d\s?r\s?o\s?l\s?o\s?g\s?i\s?c\s?U\s?n\s?i\s?t\s?C\s?o\s?d\s?e|H\s?U\s?C)\s?8?\s?:?\s?([\s\d]*)',
+    "county_marker": r'[Cc]\s?o\s?u\s?n\s?t\s?y',
+    "parish_marker": r'P\s?a\s?r\s?i\s?s\s?h',
+    "longitude_marker": extractors.Marker(r'([Ll]\s?[Oo]\s?[Nn]\s?[Gg]\s?[Ii]\s?[Tt]\s?[Uu]\s?[Dd]\s?[Ee]|[Ll]\s?[Oo]\s?[Nn]\s?[Gg]\s?\.)', "longitude", "long."),
+    "latitude_marker": extractors.Marker(r'([Ll]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Tt]\s?[Uu]\s?[Dd]\s?[Ee]|[Ll]\s?[Aa]\s?[Tt]\s?\.)', "latitude", "lat."),
+    "special_notice": r'[Ss][Pp][Ee][Cc][Ii][Aa][Ll][Pp][Uu][Bb][Ll][Ii][Cc][Nn][Oo][Tt][Ii][Cc][Ee]|G[Ee][Nn][Ee][Rr][Aa][Ll][Pp][Ee][Rr][Mm][Ii][Tt]',
+})
+
+extractors.add_patterns("pdf", {
+    # Everything after the "Corps of Engineers Permit Critria"
+    "trim_tail": r'C\s?o\s?r\s?p\s?s\s?o\s?f\s?E\s?n\s?g\s?i\s?n\s?e\s?e\s?r\s?s\s?P\s?e\s?r\s?m\s?i\s?t\s?C\s?r\s?i\s?t\s?e\s?r\s?i\s?a.*',
+    "comment_window": r'c\s?l\s?o\s?s\s?e\s?i?n?([\s\d]*)(?=d\s?a\s?y\s?s)',
+    "app_num": r'(Application|[Ss][Uu][Bb][Jj][Ee][Cc][Tt])#?:?.*?([A-Z]{3}-?\d{4}-?\d{4,5}-?[A-Z]{2,3}).*?(WQC|PUBLICNOTICE|Interested|SPECIAL|New|\(Section)',
+    # Typical formatting: "project_name" OR "zipcode" (xxx)-xxx-xxxx non-numeric characters
+    "manager_phone": r'[a-z\.|\d{4,5}](\(?\d{3}\)?-?\d{3}-?\d{4})[^\d]', # \(?\d{3}\)?-?\s{0,3}-?\d{3}\s?-?\s?\d{4}
+    # Typical formatting: xxx.xxx.xxx@usace.army.mil OR xxx-xxx-xxx@usace.army.mil
+    "manager_email": r'[A-Za-z]+[\.\-][A-Za-z\s\d\.\-]+@\s?u\s?s\s?a\s?c\s?e\s?\.\s?a\s?r\s?m\s?y\s?\.\s?m\s?i\s?l',
+    "project_manager": r'P\s?r\s?o\s?j\s?e\s?c\s?t\s?M\s?a\s?n\s?a\s?g\s?e\s?r\s?:?',
+    "regulatory": r'R\s?e\s?g\s?u\s?l\s?a\s?t\s?o\s?r\s?y',
+    "manager_after_branch": r'P\s?r\s?o\s?j\s?e\s?c\s?t\s?M\s?a\s?n\s?a\s?g\s?e\s?r\s?.*?(B\s?r\s?a\s?n\s?c\s?h|\))\s*?([A-Z][a-zA-Z\s\.]*)',
+    "applicant_contents": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?:?(.+)(?=L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn])',
+    "care_of": r'c\s?\/\s?o',
+    "applicant_before_care_of": r'.+?(?=\,?\s?c\s?\/\s?o)',
+    "contractor": r'c\s?\/\s?o\s?:?\s?(.+?)(?=(,?\s?P\s?o\s?s\s?t|,?\s?P\s?O|,?\s?P\s?\.\s?O\s?\.|,?\s*\d|,?\s?[Aa][tT]{2}))',
+    "applicant_without_contractor": r'.+?(?=(,?\s?P\s?o\s?s\s?t|,?\s?P\s?O|,?\s?P\s?\.\s?O\s?\.|,?\s*\d|,?\s?[Aa][tT]{2}))',
+    "location": r'L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk]\s?:?(?P<section>.*?)(?=C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk])',
+    "character_marker": extractors.Marker(r'C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk]|D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N',
+                                         "characterofwork", "description"),
+    "character": r'(C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?[Ww]\s?[Oo]\s?[Rr]\s?[Kk]|D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N)\s?:?(?P<section>.*?)(?=(M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N|T\s?h\s?e\s?c\s?o\s?m\s?m\s?e\s?n\s?t\s?p\s?e\s?r\s?i\s?o\s?d))',
+    # [Ti] is T or i: the pattern also matches "MIiIGATION"
+    "mitigation_marker": extractors.Marker(r'M\s?[Ii]\s?[Ti]\s?[Ii]\s?[Gg]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]', "mitigation", "miiigation"),
+    "mitigation": r'M\s?[Ii]\s?[Ti]\s?[Ii]\s?[Gg]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?:?(?P<section>.*?)(?=T\s?h\s?e\s?c\s?o\s?m\s?m\s?e\s?n\s?t\s?p\s?e\s?r\s?i\s?o\s?d)',
+}, district = "mvn")
+
+extractors.add_patterns("pdf", {
+    # Everyting between "COMMENTS" and "Environmental Protectioin Agency"
+    "trim_tail": r'C\s?O\s?M\s?M\s?E\s?N\s?T\s?S.*P\s?r\s?o\s?t\s?e\s?c\s?t\s?i\s?o\s?n\s?A\s?g\s?e\s?n\s?c\s?y',
+    "comment_window": r'l\s?a\s?t\s?e\s?r\s?t\s?h\s?a\s?n([\s\d]*)(?=d\s?a\s?y\s?s)',
+    "app_num": r'(?<=NO\.).*(?=JOINT)',
+    # Typical formatting: "concerning ..." (xxx)-xxx-xxxx non-numeric characters
+    "manager_phone": r'c\s?o\s?n\s?c\s?e\s?r\s?n\s?i\s?n\s?g.*?[a-z](\(?\d{3}\)?-?\d{3}-?\d{4})[^\d]',
+    # Typical formatting: xxx.xxx.xxx@usace.army.mil OR xxx-xxx-xxx@usace.army.mil
+    "manager_email": r'[A-Za-z]+\.[A-Za-z\s\d\.]+;?@\.?\s?u\s?s\s?a\s?c\s?e\s?\.\s?a\s?r\s?m\s?y\s?\.\s?m\s?i\s?l',
+    # Typical paragraph formmating: direct(ed) (any written comments) to(via) xxx ... "Copies" OR "copy" OR "For additional ..."
+    "manager_paragraph": r'd\s?i\s?r\s?e\s?c\s?t\s?e?\s?d?\s?(any\swritten\scomments)?(\s?t\s?o|v\s?i\s?a).*?(?=C\s?o\s?p\s?i\s?e\s?s|c\s?o\s?p\s?y|F\s?o\s?r\s?a\s?d\s?d\s?i\s?t\s?i\s?o\s?n\s?a\s?l)',
+    # Typical key phase formmating in pdf_location: "Attention(Attn)(. or :)" OR "P(p)roject M(m)anager(, or :)" OR "contact" xxx "," OR "or" OR "by" OR "at" OR "in" OR "via" OR numbers
+    "manager_name": r'(A\s?t\s?t\s?e?\s?n\s?t?\s?i?\s?o?\s?n?\s?\.?\:?|[Pp]\s?r\s?o\s?j\s?e\s?c\s?t\s?[Mm]\s?a\s?n\s?a\s?g\s?e\s?r\s?\,?\:?|c\s?o\s?n\s?t\s?a\s?c\s?t)(.*?)(?=(\,|\so\s?r|\sb\s?y|\sa\s?t|\si\s?n|\d{3,4}))',
+    "manager_organization": r'ERROR|[Bb]\s?r\s?a\s?n\s?c\s?h|[Dd]\s?i\s?v\s?i\s?s\s?i\s?o\s?n|[Ee]\s?n\s?g\s?i\s?n\s?e\s?e\s?r\s?s|U\s?S\s?A\s?C\s?E',
+    # "M(m)anager for this application," OR "the P(p)roject M(m)anager, xxx" OR  "M(m)anager ... Attention(Attn)(, or . or :)" xxx "," OR "or" OR "by" OR "at" OR "in" OR "via" OR numbers OR "("
+    "manager_name_fallback": r'([Mm]\s?a\s?n\s?a\s?g\s?e\s?r\s?f\s?o\s?r\s?t\s?h\s?i\s?s\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?t\s?i\s?o\s?n\,|t\s?h\s?e\s?[Pp]\s?r\s?o\s?j\s?e\s?c\s?t\s?[Mm]\s?a\s?n\s?a\s?g\s?e\s?r\s?\,|[Mn]\s?a\s?n\s?a\s?g\s?e\s?r.*?\s?A\s?t\s?t\s?e?\s?n\s?t?\s?i?\s?o?\s?n?\s?\,?\.?\:?)(\s?[A-Z].*?)(?=(\,|\,?\so\s?r|\,?\sb\s?y|\,?\sa\s?t|\,?\si\s?n|\,?\sv\s?i\s?a|\d{3,4}|\s?\())',
+    "applicant_contents": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))',
+    "location": r'(L\s?O\s?C\s?A\s?T\s?I\s?O\s?N|W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y)\s?:?(?P<section>.*?)(?=(P\s?R\s?O\s?J\s?E\s?C\s?T|P\s?R\s?O\s?P\s?O\s?S\s?E\s?D|A\s?P\s?P\s?L\s?I\s?C\s?A\s?N\s?T|W\s?O\s?R\s?K))',
+}, district = "sam")
+
+extractors.add_patterns("pdf", {
+    # Everything after "IMPACT ON NATUREAL RESOURCES"
+    "trim_tail": r'I\s?M\s?P\s?A\s?C\s?T\s?O\s?N\s?N\s?A\s?T\s?U\s?R\s?A\s?L\s?R\s?E\s?S\s?O\s?U\s?R\s?C\s?E\s?S.*',
+    "comment_window": r'w\s?i\s?t\s?h\s?i\s?n([\s\d]*)(?=d\s?a\s?y\s?s)',
+    "app_num": r'(?<=No\.).*?(?=T\s?O\s?W\s?H\s?O\s?M)',
+    # Typical formatting: "phone" (xxx)-xxx-xxxx non-numeric characters
+    "manager_phone": r'p\s?h\s?o\s?n\s?e.*?(\(?\d{3}\)?-?\d{3}-?\d{4})[^\d]',
+    # Typical formatting: "QUESTION" OR "question" ... xxx.xxx.xxx@usace.army.mil OR xxx-xxx-xxx@usace.army.mil
+    "manager_email": r'[Qq]\s?[Uu]\s?[Ee]\s?[Ss]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn].*?([A-Za-z’]+[\.\-][A-Za-z\s\d\.\-’]+@\s?u\s?s\s?a\s?c\s?e\s?\.\s?a\s?r\s?m\s?y\s?\.\s?m\s?i\s?l)',
+    # Typical formatting: the P(p)roject M(m)anager(:) xxx; contact xxx; directed to xxx
+    "manager_name": r'((t\s?h\s?e|o\s?r)\s?[Pp]\s?r\s?o\s?j\s?e\s?c\s?t\s?[Mm]\s?a\s?n\s?a\s?g\s?e\s?r\s?\,?\:?|c\s?o\s?n\s?t\s?a\s?c\s?t|d\s?i\s?r\s?e\s?c\s?t\s?e\s?d\s?t\s?o)(\s?[A-Z-].*?)(?=(\,|\,?\so\s?r|\,?\sb\s?y|\,?\sa\s?t|\,?\si\s?n))',
+    "applicant_contents": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))',
+    "applicant": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?\:?(.+?)(?=(P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d|c\/o|A\s?t\s?t\s?n|A\s?t\s?t\s?e\s?n\s?t\s?i\s?o\s?n|$))',
+    "location": r'L\s?O\s?C\s?A\s?T\s?I\s?O\s?N\s?:?(?P<section>.*?)(?=(D\s?i\s?r\s?e\s?c\s?t\s?i\s?o\s?n\s?s|A\s?P\s?P\s?R\s?O\s?X\s?I\s?M\s?A\s?T\s?E|P\s?R\s?O\s?J\s?E\s?C\s?T))',
+}, district = "saj")
+
+extractors.add_patterns("pdf", {
+    # Everything between "PUBLIC INTEREST REVIEW FACTORS" and "COMMENT PERIOD"
+    "trim_tail": r'C\s?U\s?R\s?R\s?E\s?N\s?T\s?S\s?I\s?T\s?E\s?C\s?O\s?N\s?D\s?I\s?T\s?I\s?O\s?N\s?S\s?:?.*(?=C\s?O\s?M\s?M\s?E\s?N\s?T\s?P\s?E\s?R\s?I\s?O\s?D\s?:?)',
+    "comment_window": r'w\s?i\s?t\s?h\s?i\s?n([\s\d]*)(?=d\s?a\s?y\s?s)',
+    "app_num": r'(?<=No:).*?(?=Of)',
+    # Typical formatting: English letter OR "zipcode" (xxx)-xxx-xxxx "Phone"
+    "manager_phone": r'[a-z|\d{4,5}](\(?\d{3}\)?-?\d{3}-?\d{4})\s?P\s?h\s?o\s?n\s?e',
+    # Typical formatting: swg_xxx_xxx@usace.army.mil OR SWGxxxxxx@usace.army.mil
+    "manager_email": r'[Ss]\s?[Ww][A-Za-z\s\d\_]+@\s?u\s?s\s?a\s?c\s?e\s?\.\s?a\s?r\s?m\s?y\s?\.\s?m\s?i\s?l',
+    # Typical paragraph formatting: COMMENT PERIOD ... submitted to(:) ... District ...
+    "manager_paragraph": r'C\s?O\s?M\s?M\s?E\s?N\s?T\s?P\s?E\s?R\s?I\s?O\s?D.*s\s?u\s?b\s?m\s?i\s?t\s?t\s?e\s?d.*?t\s?o\s?:?(.*?)(?=D\s?I\s?S\s?T\s?R\s?I\s?C\s?T)',
+    # Typical key phase formatting: xxx "U.S." OR "Galveston" OR "Post" OR "PO" OR "P.O." OR numbers OR "S(s)wg_"
+    "manager_name": r'.*?(?=(U\s?\.\s?S\s?\.|G\s?a\s?l\s?v\s?e\s?s\s?t\s?o\s?n|P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d{4}|[Ss]\s?w\s?g\s?_))',
+    "applicant_contents": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(L\s?O\s?C\s?A\s?T\s?I\s?O\s?N|P\s?R\s?O\s?J\s?E\s?C\s?T))',
+    "location": r'L\s?O\s?C\s?A\s?T\s?I\s?O\s?N\s?:?(?P<section>.*?)(?=(L\s?A\s?T\s?I\s?T\s?U\s?D\s?E|A\s?G\s?E\s?N\s?D\s?A|P\s?R\s?O\s?J\s?E\s?C\s?T|A\s?V\s?O\s?I\s?D\s?A\s?N\s?C\s?E))',
+    "character_marker": extractors.Marker(r'P?\s?R?\s?O?\s?J?\s?E?\s?C?\s?T?\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N', "description"),
+    "character": r'P?\s?R?\s?O?\s?J?\s?E?\s?C?\s?T?\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N\s?:?(?P<section>.*?)(?=[A-Z]{6,}[\s|:])',
+}, district = "swg")
+
+for district in ["sam", "saj"]:
+    extractors.add_patterns("pdf", {
+        "character_marker": r'[W\s?O\s?R\s?K|O\s?B\s?J\s?E\s?C\s?T\s?I\s?V\s?E\s?S]',
+        "character": r'(P\s?R\s?O\s?P\s?O\s?S\s?E\s?D\s?W\s?O\s?R\s?K|W\s?O\s?R\s?K\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N|W\s?O\s?R\s?K|P\s?R\s?O\s?J\s?E\s?C\s?T\s?G\s?O\s?A\s?L\s?S\s?A\s?N\s?D\s?O\s?B\s?J\s?E\s?C\s?T\s?I\s?V\s?E\s?S)\s?:?(?P<section>.*?)(?=(A\s?[Vv]\s?[Oo]\s?[Ii]\s?[Dd]\s?[Aa]\s?[Nn]\s?[Cc]\s?[Ee]|[A-Z]{6,}[\s|:]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?h\s?a\s?s\s?a\s?p\s?p\s?l\s?i\s?e\s?d))',
+    }, district = district)
+
+
+
+
+# Section headers, located once per document (see extractors.SectionMap): each field pattern starts searching at the first header of
+# its section. The headers of a section must cover every way its pattern can start (whitespace and case aside).
+
+extractors.add_sections("pdf", {
+    "intro": ("TO WHOM IT MAY CONCERN", "PURPOSE OF PUBLIC NOTICE", "Interested parties"),
+    "applicant": ("APPLICANT",),
+    "agent": ("AGENT",),
+    "minimization": ("MINIMIZATION",),
+    "mitigation": ("MITIGATION",),
+})
+extractors.add_sections("pdf", {
+    "tail": ("Corps of Engineers Permit Criteria",),
+    "location": ("LOCATION OF WORK",),
+    "character": ("CHARACTER OF WORK", "DESCRIPTION"),
+    # The mvn pattern starts M[Ii][Ti]...: also "MIiIGATION"
+    "mitigation": ("MITIGATION", "MIiIGATION"),
+}, district = "mvn")
+extractors.add_sections("pdf", {
+    "tail": ("COMMENTS",),
+    "location": ("LOCATION", "WATERWAY"),
+    "manager": ("direct",),
+}, district = "sam")
+extractors.add_sections("pdf", {
+    "tail": ("IMPACT ON NATURAL RESOURCES",),
+    "location": ("LOCATION",),
+    "manager": ("question",),
+    "contact": ("the Project Manager", "or Project Manager", "contact", "directed to"),
+}, district = "saj")
+extractors.add_sections("pdf", {
+    "tail": ("CURRENT SITE CONDITIONS",),
+    "location": ("LOCATION",),
+    "character": ("DESCRIPTION",),
+    "manager": ("COMMENT PERIOD",),
+}, district = "swg")
+for district in ["sam", "saj"]:
+    extractors.add_sections("pdf", {
+        "character": ("PROPOSED WORK", "WORK DESCRIPTION", "WORK", "PROJECT GOALS AND OBJECTIVES"),
+    }, district = district)
+
+
+
+
 # Trim PDF text for Azure summarization
 
-def trim_pdf(pdf_text, district):
-    """
-    Trim PDFs to resonable lengths for the cost management of Azure summarization
-    """
-    
+@extractors.register("pdf", "trimmed")
+def _trimmed(pdf_text, p):
     # Trim the letter heading of each PDFs which are identical
+    sections = extractors.sections(pdf_text, p)
     try:
-        trim_intro = re.search(r'(T\s?O\s?W\s?H\s?O\s?M\s?I\s?T\s?M\s?A\s?Y\s?C\s?O\s?N\s?C\s?E\s?R\s?N|P\s?U\s?R\s?P\s?O\s?S\s?E\s?O\s?F\s?P\s?U\s?B\s?L\s?I\s?C\s?N\s?O\s?T\s?I\s?C\s?E|I\s?n\s?t\s?e\s?r\s?e\s?s\s?t\s?e\s?d\s?p\s?a\s?r\s?t\s?i\s?e\s?s).*?(?=A\s?P\s?P\s?L\s?I\s?C\s?A\s?N\s?T|4\s?0\s?8\s?\))', pdf_text).group()
+        trim_intro = sections.search(p.trim_intro, "intro").group()
     except:
         trim_intro = ""
-    
-    if district == "mvn":
-        # Trim everything after the "Corps of Engineers Permit Critria"
-        try:
-            trim_tail = re.search(r'C\s?o\s?r\s?p\s?s\s?o\s?f\s?E\s?n\s?g\s?i\s?n\s?e\s?e\s?r\s?s\s?P\s?e\s?r\s?m\s?i\s?t\s?C\s?r\s?i\s?t\s?e\s?r\s?i\s?a.*', pdf_text).group()
-        except:
-            trim_tail = ""
-            
-    if district == "sam":
-        # Trim everyting between "COMMENTS" and "Environmental Protectioin Agency"
-        try:
-            trim_tail = re.search(r'C\s?O\s?M\s?M\s?E\s?N\s?T\s?S.*P\s?r\s?o\s?t\s?e\s?c\s?t\s?i\s?o\s?n\s?A\s?g\s?e\s?n\s?c\s?y', pdf_text).group()
-        except:
-            trim_tail = ""
-            
-    if district == "saj":
-        # Trim everything after "IMPACT ON NATUREAL RESOURCES"
-        try:
-            trim_tail = re.search(r'I\s?M\s?P\s?A\s?C\s?T\s?O\s?N\s?N\s?A\s?T\s?U\s?R\s?A\s?L\s?R\s?E\s?S\s?O\s?U\s?R\s?C\s?E\s?S.*', pdf_text).group()
-        except:
-            trim_tail = ""
-            
-        
-    if district == "swg":
-        # Trim everything between "PUBLIC INTEREST REVIEW FACTORS" and "COMMENT PERIOD"
-        try:
-            trim_tail = re.search(r'C\s?U\s?R\s?R\s?E\s?N\s?T\s?S\s?I\s?T\s?E\s?C\s?O\s?N\s?D\s?I\s?T\s?I\s?O\s?N\s?S\s?:?.*(?=C\s?O\s?M\s?M\s?E\s?N\s?T\s?P\s?E\s?R\s?I\s?O\s?D\s?:?)', pdf_text).group()
-        except:
-            trim_tail = ""
-    
+
+    # Trim the district-specific tail (see the trim_tail patterns)
+    try:
+        trim_tail = sections.search(p.trim_tail, "tail").group()
+    except:
+        trim_tail = ""
+
     pdf_trimmed = pdf_text.replace(trim_intro, "").replace(trim_tail, "")
     # pdf_trimmed = re.sub(r'\s{2,}', "", pdf_trimmed)
-    
+
     # Trim texts when the characters exceed 10,000
     if len(pdf_trimmed) > 5000:
         pdf_trimmed = pdf_trimmed[:5000]
-    
+
     return pdf_trimmed
-    
-    
-    
 
-# Seperate pdf texts into big chuncks:
 
-def get_comment_window(pdf_text, district):
+
+
+def trim_pdf(pdf_text, district):
     """
-    Get the comment window (days)
+    Trim PDFs to resonable lengths for the cost management of Azure summarization
     """
+
+    return extractors.run("pdf", "trimmed", pdf_text, district)
+
+
+
+
+# Seperate pdf texts into big chuncks:
+
+@extractors.register("pdf", "comment_window")
+def _comment_window(pdf_text, p):
     if "days" in pdf_text:
         try:
-            if district == "mvn":
-                comment_window = re.search(r'c\s?l\s?o\s?s\s?e\s?i?n?([\s\d]*)(?=d\s?a\s?y\s?s)', 
-                                           pdf_text).group(1).strip().replace(" ", "")
-            if district == "sam":
-                comment_window = re.search(r'l\s?a\s?t\s?e\s?r\s?t\s?h\s?a\s?n([\s\d]*)(?=d\s?a\s?y\s?s)', 
-                                           pdf_text).group(1).strip().replace(" ", "")
-            if district == "saj":
-                comment_window = re.search(r'w\s?i\s?t\s?h\s?i\s?n([\s\d]*)(?=d\s?a\s?y\s?s)', 
-                                           pdf_text).group(1).strip().replace(" ", "")
-            if district == "swg":
-                comment_window = re.search(r'w\s?i\s?t\s?h\s?i\s?n([\s\d]*)(?=d\s?a\s?y\s?s)', 
-                                           pdf_text).group(1).strip().replace(" ", "")
+            comment_window = p.comment_window.search(pdf_text).group(1).strip().replace(" ", "")
         except:
             comment_window = "ERROR: regex fails"
     else:
         comment_window = "unknown"
-        
+
     return comment_window
 
 
 
 
-def get_pdf_app_num(pdf_text, district):
+def get_comment_window(pdf_text, district):
     """
-    Get permit application # + district code + district Name
+    Get the comment window (days)
     """
-    
+
+    return extractors.run("pdf", "comment_window", pdf_text, district)
+
+
+
+
+@extractors.register("pdf", "app_num")
+def _app_num(pdf_text, p):
     try:
-        if district == "mvn":
-            permit_application_number = re.search(r'(Application|[Ss][Uu][Bb][Jj][Ee][Cc][Tt])#?:?.*?([A-Z]{3}-?\d{4}-?\d{4,5}-?[A-Z]{2,3}).*?(WQC|PUBLICNOTICE|Interested|SPECIAL|New|\(Section)', pdf_text.replace(" ", "")).group(2).replace("PUBLICNOTICE", "").strip()
-        if district == "sam":
-            permit_application_number = re.search(r'(?<=NO\.).*(?=JOINT)', \
-                                                  pdf_text).group().replace(" ", "")
-        if district == "saj":
-            permit_application_number = re.search(r'(?<=No\.).*?(?=T\s?O\s?W\s?H\s?O\s?M)', \
-                                      pdf_text).group().replace(" ", "")
-        if district == "swg":
-            permit_application_number = re.search(r'(?<=No:).*?(?=Of)', \
-                                      pdf_text).group().replace(" ", "")
-        
-        permit_application_number = re.sub(r'(January|February|March|April|May|June|July|August|September|October|November|December).*', "", permit_application_number)
+        permit_application_number = p.app_num.search(pdf_text).group().replace(" ", "")
+        permit_application_number = p.app_num_date.sub("", permit_application_number)
+    except:
+        permit_application_number = "ERROR: regex fails"
+
+    return permit_application_number
+
 
+
+
+@extractors.register("pdf", "app_num", districts = ["mvn"])
+def _mvn_app_num(pdf_text, p):
+    try:
+        permit_application_number = p.app_num.search(pdf_text.replace(" ", "")).group(2).replace("PUBLICNOTICE", "").strip()
+        permit_application_number = p.app_num_date.sub("", permit_application_number)
     except:
         permit_application_number = "ERROR: regex fails"
-        
-    finally:
-        return permit_application_number
 
-    
-    
+    return permit_application_number
 
-def get_pdf_manager(pdf_text, district):
+
+
+
+def get_pdf_app_num(pdf_text, district):
     """
-    Get manager name + phone + email
+    Get permit application # + district code + district Name
     """
-    
-    # MANAGER PHONE NUMBER ----------------------------------------------------------------------------------------
 
-    if district == "mvn":
-        # Typical formatting: "project_name" OR "zipcode" (xxx)-xxx-xxxx non-numeric characters
-        try:
-            manager_phone = re.search(r'[a-z\.|\d{4,5}](\(?\d{3}\)?-?\d{3}-?\d{4})[^\d]', # \(?\d{3}\)?-?\s{0,3}-?\d{3}\s?-?\s?\d{4}
-                                      pdf_text.replace(" ", "")).group(1).strip()            
-        except:
-            manager_phone = "ERROR: regex fails"
-        
-    if district == "sam":
-        # Typical formatting: "concerning ..." (xxx)-xxx-xxxx non-numeric characters
-        try:
-            manager_phone = re.search(r'c\s?o\s?n\s?c\s?e\s?r\s?n\s?i\s?n\s?g.*?[a-z](\(?\d{3}\)?-?\d{3}-?\d{4})[^\d]',
-                                  pdf_text.replace(" ", "")).group(1).strip()            
-        except:
-            manager_phone = "ERROR: regex fails"
-        
-    if district == "saj":
-        # Typical formatting: "phone" (xxx)-xxx-xxxx non-numeric characters
-        try:
-            manager_phone = re.search(r'p\s?h\s?o\s?n\s?e.*?(\(?\d{3}\)?-?\d{3}-?\d{4})[^\d]',
-                                  pdf_text.replace(" ", "")).group(1).strip()            
-        except:
-            manager_phone = "ERROR: regex fails"
-        
-    if district == "swg":
-        # Typical formatting: English letter OR "zipcode" (xxx)-xxx-xxxx "Phone"
+    return extractors.run("pdf", "app_num", pdf_text, district)
+
+
+
+
+def _manager_phone(pdf_text, p):
+    """
+    Manager phone number: (xxx)-xxx-xxxx after the district-specific key phrase (see the manager_phone patterns)
+    """
+
+    try:
+        return p.manager_phone.search(pdf_text.replace(" ", "")).group(1).strip()
+    except:
+        return "ERROR: regex fails"
+
 
-        try:
-            manager_phone = re.search(r'[a-z|\d{4,5}](\(?\d{3}\)?-?\d{3}-?\d{4})\s?P\s?h\s?o\s?n\s?e',
-                                      pdf_text.replace(" ", "")).group(1).strip()
-        except:
-            manager_phone = "ERROR: regex fails"
-        
-        
 
-    # MANAGER EMAIL ----------------------------------------------------------------------------------------
-    
-    if district == "mvn":
-        # Typical formatting: xxx.xxx.xxx@usace.army.mil OR xxx-xxx-xxx@usace.army.mil
-        try: 
-            manager_email = re.search(r'[A-Za-z]+[\.\-][A-Za-z\s\d\.\-]+@\s?u\s?s\s?a\s?c\s?e\s?\.\s?a\s?r\s?m\s?y\s?\.\s?m\s?i\s?l',
-                                      pdf_text).group().replace(" ", "")
-            if "ElizabethHill" in manager_email:
-                manager_email = re.sub(r'.*ElizabethHill', "", manager_email)
-        except:
-            manager_email = "ERROR: regex fails"
-    
-    if district == "sam":
-        # Typical formatting: xxx.xxx.xxx@usace.army.mil OR xxx-xxx-xxx@usace.army.mil
-        try: 
-            manager_email = re.search(r'[A-Za-z]+\.[A-Za-z\s\d\.]+;?@\.?\s?u\s?s\s?a\s?c\s?e\s?\.\s?a\s?r\s?m\s?y\s?\.\s?m\s?i\s?l',
-                                      pdf_text).group()
-            if "at" in manager_email:
-                manager_email = re.sub(r'.*\sat\s', "", manager_email)
-            manager_email = manager_email.replace(" ", "")
-        except:
-            manager_email = "ERROR: regex fails"
-            
-    if district == "saj":
-        # Typical formatting: "QUESTION" OR "question" ... xxx.xxx.xxx@usace.army.mil OR xxx-xxx-xxx@usace.army.mil
-        try: 
-            manager_email = re.search(r'[Qq]\s?[Uu]\s?[Ee]\s?[Ss]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn].*?([A-Za-z’]+[\.\-][A-Za-z\s\d\.\-’]+@\s?u\s?s\s?a\s?c\s?e\s?\.\s?a\s?r\s?m\s?y\s?\.\s?m\s?i\s?l)', pdf_text).group(1)
-            if any(word in manager_email for word in ["to", "at"]):
-                manager_email = re.sub(r'.*\s(at|to)\s', "", manager_email)
-            manager_email = manager_email.replace(" ", "")
-        except:
-            manager_email = "ERROR: regex fails" 
-    
-    if district == "swg":
-        # Typical formatting: swg_xxx_xxx@usace.army.mil OR SWGxxxxxx@usace.army.mil
-        try: 
-            manager_email = re.search(r'[Ss]\s?[Ww][A-Za-z\s\d\_]+@\s?u\s?s\s?a\s?c\s?e\s?\.\s?a\s?r\s?m\s?y\s?\.\s?m\s?i\s?l',
-                                      pdf_text).group().replace(" ", "")
-        except:
-            manager_email = "ERROR: regex fails"
-        
 
+@extractors.register("pdf", "manager", districts = ["mvn"])
+def _mvn_manager(pdf_text, p):
+    manager_phone = _manager_phone(pdf_text, p)
+
+    # MANAGER EMAIL ----------------------------------------------------------------------------------------
+    try:
+        manager_email = p.manager_email.search(pdf_text).group().replace(" ", "")
+        if "ElizabethHill" in manager_email:
+            manager_email = re.sub(r'.*ElizabethHill', "", manager_email)
+    except:
+        manager_email = "ERROR: regex fails"
 
     # MANAGER NAME ----------------------------------------------------------------------------------------
-    
-    if district == "mvn":
-        
-        # Typical formatting: Project Manager(:) xxx (also applied to joint notices which have two project managers)
-        try:
-            manager_name = re.search(r'(P\s?r\s?o\s?j\s?e\s?c\s?t\s?M\s?a\s?n\s?a\s?g\s?e\s?r\s?:?)\s*?(\1|C\s?e\s?r\s?t\s?i\s?f\s?i\s?c\s?a\s?t\s?i\s?o\s?n\s?A\s?n\s?a\s?l\s?y\s?s\s?t\s?:?)?\s*?([A-Z][a-zA-Z\s\.,]*)(\(|\d|P\s?e\s?r\s?m\s?i\s?t|P\s?r\s?o\s?j\s?e\s?c\s?t|' + manager_email + ')', pdf_text).group(3)
-            # Clean up the names: replace "Project Manager" and unneccessary spaces
-            manager_name = re.sub(r'P\s?r\s?o\s?j\s?e\s?c\s?t\s?M\s?a\s?n\s?a\s?g\s?e\s?r\s?:?', "", manager_name).strip()
-            # manager_name = re.sub(r'\s{2,}', ", ", manager_name)
-        
-        # When the key phase "Project Manager" is missing, try another format: Branch xxx
-        except:
-            try:
-                manager_name = re.search(r'B\s?r\s?a\s?n\s?c\s?h([a-zA-Z\s\.]*)(\(|\d|P\s?e\s?r\s?m\s?i\s?t|' + manager_email + ')', pdf_text).group(1).strip()
-                # manager_name = re.sub(r'\s{2,}', "", manager_name)
-            except:
-                manager_name = "ERROR: regex fails"
-                
-        # If mistakenly pull "Regulatory" branch name, pull the words after that
-        if len(re.findall(r'R\s?e\s?g\s?u\s?l\s?a\s?t\s?o\s?r\s?y', manager_name)) != 0:
-            try:
-                manager_name = re.search(r'P\s?r\s?o\s?j\s?e\s?c\s?t\s?M\s?a\s?n\s?a\s?g\s?e\s?r\s?.*?(B\s?r\s?a\s?n\s?c\s?h|\))\s*?([A-Z][a-zA-Z\s\.]*)', pdf_text).group(2).strip()
-                # manager_name = re.sub(r'\s{2,}', "", manager_name)
-            except:
-                manager_name = "ERROR: regex fails"
-        
-        # When the pulled text is too long, other text is mistakenlly pulled; try to pull the words directly before phone number
-        if len(manager_name) > 50:
-            if "ERROR" not in manager_phone:
-                try:
-                    manager_phone = re.sub(r'(\(|\))', '', manager_phone)
-                    manager_name = re.search(r'[A-Za-z\s\.]*(?=\(' + manager_phone[0:3] + '\))', pdf_text).group().strip()
-                    # manager_name = re.sub(r'\s{2,}', "", manager_name)
-                except:
-                    manager_name = "ERROR: regex fails"
-            else:
-                manager_name = "ERROR: regex fails; track back to manager_phone"
-            
-            
-            
-    if district == "saj":
-        
-        # Typical formatting: the P(p)roject M(m)anager(:) xxx; contact xxx; directed to xxx
+
+    # Typical formatting: Project Manager(:) xxx (also applied to joint notices which have two project managers)
+    try:
+        manager_name = re.search(r'(P\s?r\s?o\s?j\s?e\s?c\s?t\s?M\s?a\s?n\s?a\s?g\s?e\s?r\s?:?)\s*?(\1|C\s?e\s?r\s?t\s?i\s?f\s?i\s?c\s?a\s?t\s?i\s?o\s?n\s?A\s?n\s?a\s?l\s?y\s?s\s?t\s?:?)?\s*?([A-Z][a-zA-Z\s\.,]*)(\(|\d|P\s?e\s?r\s?m\s?i\s?t|P\s?r\s?o\s?j\s?e\s?c\s?t|' + manager_email + ')', pdf_text).group(3)
+        # Clean up the names: replace "Project Manager" and unneccessary spaces
+        manager_name = p.project_manager.sub("", manager_name).strip()
+        # manager_name = re.sub(r'\s{2,}', ", ", manager_name)
+
+    # When the key phase "Project Manager" is missing, try another format: Branch xxx
+    except:
         try:
-            manager_name = re.search(r'((t\s?h\s?e|o\s?r)\s?[Pp]\s?r\s?o\s?j\s?e\s?c\s?t\s?[Mm]\s?a\s?n\s?a\s?g\s?e\s?r\s?\,?\:?|c\s?o\s?n\s?t\s?a\s?c\s?t|d\s?i\s?r\s?e\s?c\s?t\s?e\s?d\s?t\s?o)(\s?[A-Z-].*?)(?=(\,|\,?\so\s?r|\,?\sb\s?y|\,?\sa\s?t|\,?\si\s?n))', pdf_text).group(3).strip()
+            manager_name = re.search(r'B\s?r\s?a\s?n\s?c\s?h([a-zA-Z\s\.]*)(\(|\d|P\s?e\s?r\s?m\s?i\s?t|' + manager_email + ')', pdf_text).group(1).strip()
             # manager_name = re.sub(r'\s{2,}', "", manager_name)
         except:
             manager_name = "ERROR: regex fails"
-    
-    
 
-    if district == "sam":
-        
-        # Typical paragraph formmating: direct(ed) (any written comments) to(via) xxx ... "Copies" OR "copy" OR "For additional ..."
+    # If mistakenly pull "Regulatory" branch name, pull the words after that
+    if p.regulatory.search(manager_name) is not None:
         try:
-            para_manager = re.search(r'd\s?i\s?r\s?e\s?c\s?t\s?e?\s?d?\s?(any\swritten\scomments)?(\s?t\s?o|v\s?i\s?a).*?(?=C\s?o\s?p\s?i\s?e\s?s|c\s?o\s?p\s?y|F\s?o\s?r\s?a\s?d\s?d\s?i\s?t\s?i\s?o\s?n\s?a\s?l)', pdf_text).group().strip()
-            # para_manager = re.sub(r'\s{2,}', "" ,para_manager)
+            manager_name = p.manager_after_branch.search(pdf_text).group(2).strip()
+            # manager_name = re.sub(r'\s{2,}', "", manager_name)
         except:
-            para_manager = "ERROR"
-            
-        if para_manager != "ERROR":
-            
-            # Typical key phase formmating in pdf_location: "Attention(Attn)(. or :)" OR "P(p)roject M(m)anager(, or :)" OR "contact" xxx "," OR "or" OR "by" OR "at" OR "in" OR "via" OR numbers
+            manager_name = "ERROR: regex fails"
+
+    # When the pulled text is too long, other text is mistakenlly pulled; try to pull the words directly before phone number
+    if len(manager_name) > 50:
+        if "ERROR" not in manager_phone:
             try:
-                manager_name = re.search(r'(A\s?t\s?t\s?e?\s?n\s?t?\s?i?\s?o?\s?n?\s?\.?\:?|[Pp]\s?r\s?o\s?j\s?e\s?c\s?t\s?[Mm]\s?a\s?n\s?a\s?g\s?e\s?r\s?\,?\:?|c\s?o\s?n\s?t\s?a\s?c\s?t)(.*?)(?=(\,|\so\s?r|\sb\s?y|\sa\s?t|\si\s?n|\d{3,4}))', para_manager).group(2).strip()
+                manager_phone = re.sub(r'(\(|\))', '', manager_phone)
+                manager_name = re.search(r'[A-Za-z\s\.]*(?=\(' + manager_phone[0:3] + r'\))', pdf_text).group().strip()
+                # manager_name = re.sub(r'\s{2,}', "", manager_name)
             except:
                 manager_name = "ERROR: regex fails"
-                
-            # When mistakenlly pulled organization names (branch, division, engineers) or having error:
-            if len(re.findall(r'ERROR|[Bb]\s?r\s?a\s?n\s?c\s?h|[Dd]\s?i\s?v\s?i\s?s\s?i\s?o\s?n|[Ee]\s?n\s?g\s?i\s?n\s?e\s?e\s?r\s?s|U\s?S\s?A\s?C\s?E', manager_name)) != 0:
-                
-                #try another formatting in pdf_text: "M(m)anager for this application," OR "the P(p)roject M(m)anager, xxx" OR  "M(m)anager ... Attention(Attn)(, or . or :)" xxx "," OR "or" OR "by" OR "at" OR "in" OR "via" OR numbers OR "("
-                try:
-                    manager_name = re.search(r'([Mm]\s?a\s?n\s?a\s?g\s?e\s?r\s?f\s?o\s?r\s?t\s?h\s?i\s?s\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?t\s?i\s?o\s?n\,|t\s?h\s?e\s?[Pp]\s?r\s?o\s?j\s?e\s?c\s?t\s?[Mm]\s?a\s?n\s?a\s?g\s?e\s?r\s?\,|[Mn]\s?a\s?n\s?a\s?g\s?e\s?r.*?\s?A\s?t\s?t\s?e?\s?n\s?t?\s?i?\s?o?\s?n?\s?\,?\.?\:?)(\s?[A-Z].*?)(?=(\,|\,?\so\s?r|\,?\sb\s?y|\,?\sa\s?t|\,?\si\s?n|\,?\sv\s?i\s?a|\d{3,4}|\s?\())', pdf_text).group(2).strip()
-                except:
-                    manager_name = "ERROR: regex fails"
         else:
-            manager_name = "ERROR: regex fails; track back to para_manager"
-           
-        
-        
-    if district  == "swg":
-        # Typical paragraph formatting: COMMENT PERIOD ... submitted to(:) ... District ...
+            manager_name = "ERROR: regex fails; track back to manager_phone"
+
+    return {"manager_name":manager_name,
+            "manager_phone":manager_phone,
+            "manager_email":manager_email}
+
+
+
+
+@extractors.register("pdf", "manager", districts = ["saj"])
+def _saj_manager(pdf_text, p):
+    manager_phone = _manager_phone(pdf_text, p)
+
+    try:
+        manager_email = extractors.sections(pdf_text, p).search(p.manager_email, "manager").group(1)
+        if any(word in manager_email for word in ["to", "at"]):
+            manager_email = re.sub(r'.*\s(at|to)\s', "", manager_email)
+        manager_email = manager_email.replace(" ", "")
+    except:
+        manager_email = "ERROR: regex fails"
+
+    try:
+        manager_name = extractors.sections(pdf_text, p).search(p.manager_name, "contact").group(3).strip()
+        # manager_name = re.sub(r'\s{2,}', "", manager_name)
+    except:
+        manager_name = "ERROR: regex fails"
+
+    return {"manager_name":manager_name,
+            "manager_phone":manager_phone,
+            "manager_email":manager_email}
+
+
+
+
+@extractors.register("pdf", "manager", districts = ["sam"])
+def _sam_manager(pdf_text, p):
+    manager_phone = _manager_phone(pdf_text, p)
+
+    try:
+        manager_email = p.manager_email.search(pdf_text).group()
+        if "at" in manager_email:
+            manager_email = re.sub(r'.*\sat\s', "", manager_email)
+        manager_email = manager_email.replace(" ", "")
+    except:
+        manager_email = "ERROR: regex fails"
+
+    try:
+        para_manager = extractors.sections(pdf_text, p).search(p.manager_paragraph, "manager").group().strip()
+        # para_manager = re.sub(r'\s{2,}', "" ,para_manager)
+    except:
+        para_manager = "ERROR"
+
+    if para_manager != "ERROR":
+
         try:
-            para_manager = re.search(r'C\s?O\s?M\s?M\s?E\s?N\s?T\s?P\s?E\s?R\s?I\s?O\s?D.*s\s?u\s?b\s?m\s?i\s?t\s?t\s?e\s?d.*?t\s?o\s?:?(.*?)(?=D\s?I\s?S\s?T\s?R\s?I\s?C\s?T)', pdf_text).group(1).strip()
-            # para_manager = re.sub(r'\s{2,}', "" ,para_manager)
+            manager_name = p.manager_name.search(para_manager).group(2).strip()
         except:
-            para_manager = "ERROR"
-            
-        if para_manager != "ERROR":
-            
-            # Typical key phase formatting: xxx "U.S." OR "Galveston" OR "Post" OR "PO" OR "P.O." OR numbers OR "S(s)wg_"
+            manager_name = "ERROR: regex fails"
+
+        # When mistakenlly pulled organization names (branch, division, engineers) or having error: try another formatting in pdf_text
+        if p.manager_organization.search(manager_name) is not None:
             try:
-                manager_name = re.search(r'.*?(?=(U\s?\.\s?S\s?\.|G\s?a\s?l\s?v\s?e\s?s\s?t\s?o\s?n|P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d{4}|[Ss]\s?w\s?g\s?_))', para_manager).group().strip().replace("  ", "")
-                # If none is pulled, no specific sub organization is mentioned
-                if manager_name == "":
-                    manager_name = "U.S. Army Corps of Engineers"
+                manager_name = p.manager_name_fallback.search(pdf_text).group(2).strip()
             except:
                 manager_name = "ERROR: regex fails"
-        else:
-            manager_name = "ERROR: regex fails; track back to para_manager" 
-        
-    return {"manager_name":manager_name, 
-            "manager_phone":manager_phone, 
+    else:
+        manager_name = "ERROR: regex fails; track back to para_manager"
+
+    return {"manager_name":manager_name,
+            "manager_phone":manager_phone,
             "manager_email":manager_email}
 
 
 
 
-def get_pdf_applicant(pdf_text, district):
-    """ 
-    Get all info in "NAME OF APPLICANT"
+@extractors.register("pdf", "manager", districts = ["swg"])
+def _swg_manager(pdf_text, p):
+    manager_phone = _manager_phone(pdf_text, p)
+
+    try:
+        manager_email = p.manager_email.search(pdf_text).group().replace(" ", "")
+    except:
+        manager_email = "ERROR: regex fails"
+
+    try:
+        para_manager = extractors.sections(pdf_text, p).search(p.manager_paragraph, "manager").group(1).strip()
+        # para_manager = re.sub(r'\s{2,}', "" ,para_manager)
+    except:
+        para_manager = "ERROR"
+
+    if para_manager != "ERROR":
+
+        try:
+            manager_name = p.manager_name.search(para_manager).group().strip().replace("  ", "")
+            # If none is pulled, no specific sub organization is mentioned
+            if manager_name == "":
+                manager_name = "U.S. Army Corps of Engineers"
+        except:
+            manager_name = "ERROR: regex fails"
+    else:
+        manager_name = "ERROR: regex fails; track back to para_manager"
+
+    return {"manager_name":manager_name,
+            "manager_phone":manager_phone,
+            "manager_email":manager_email}
+
+
+
+
+def get_pdf_manager(pdf_text, district):
+    """
+    Get manager name + phone + email
     """
-    
-    if district == "mvn":
-        
-        if len(re.findall(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', pdf_text)) != 0:
-            
-            # Applicant full info
-            try:
-                pdf_applicant_contents = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?:?(.+)(?=L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn])', pdf_text).group(1).strip()
-                # pdf_applicant_contents = re.sub(r'\s{2,}', "", pdf_applicant_contents)
 
-                # Extract applicant and contractor when the contractor exists
-                if len(re.findall(r'c\s?\/\s?o', pdf_applicant_contents)) != 0:
-                    try:
-                        applicant = re.search(r'.+?(?=\,?\s?c\s?\/\s?o)', pdf_applicant_contents).group().strip()
-                    except:
-                        applicant = "ERROR: regex fails"
-                    try:    
-                        contractor = re.search(r'c\s?\/\s?o\s?:?\s?(.+?)(?=(,?\s?P\s?o\s?s\s?t|,?\s?P\s?O|,?\s?P\s?\.\s?O\s?\.|,?\s*\d|,?\s?[Aa][tT]{2}))', pdf_applicant_contents).group(1).strip()
-                    except:
-                        contractor = "ERROR: regex fails"
-                        
-                 # Extract applicant and contractor when no contractor
-                else:
-                    contractor = "unknown"
-                    try:
-                        applicant = re.search(r'.+?(?=(,?\s?P\s?o\s?s\s?t|,?\s?P\s?O|,?\s?P\s?\.\s?O\s?\.|,?\s*\d|,?\s?[Aa][tT]{2}))', pdf_applicant_contents).group().strip()
-                    except:
-                        applicant = "ERROR: regex fails"
+    return extractors.run("pdf", "manager", pdf_text, district)
 
-            except:
-                pdf_applicant_contents = applicant = contractor = "ERROR: regex fails; track back to pdf_applicant_contents"
-        else:
-            pdf_applicant_contents = applicant = contractor = "unknown"
-    
-    
-    
-    if district == "sam":
-        
-        if len(re.findall(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', pdf_text)) != 0:
-            
-            # Applicant full info
-            try:
-                pdf_applicant_contents = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))', pdf_text).group().strip()
-                # pdf_applicant_contents = re.sub(r'\s{2,}', "", pdf_applicant_contents)
-            except:
-                pdf_applicant_contents = "ERROR: regex fails"
-                
-            # Applicant
+
+
+
+@extractors.register("pdf", "applicant", districts = ["mvn"])
+def _mvn_applicant(pdf_text, p):
+    if not extractors.has(pdf_text, p.applicant_marker):
+        return {"pdf_applicant_contents":"unknown",
+                "applicant":"unknown",
+                "contractor":"unknown"}
+
+    # Applicant full info
+    try:
+        pdf_applicant_contents = extractors.sections(pdf_text, p).search(p.applicant_contents, "applicant").group(1).strip()
+        # pdf_applicant_contents = re.sub(r'\s{2,}', "", pdf_applicant_contents)
+
+        # Extract applicant and contractor when the contractor exists
+        if p.care_of.search(pdf_applicant_contents) is not None:
             try:
-                applicant = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?\:?(.+?)(?=(P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d|c\/o|A\s?t\s?t\s?n|A\s?t\s?t\s?e\s?n\s?t\s?i\s?o\s?n))', pdf_text).group(1).strip()
+                applicant = p.applicant_before_care_of.search(pdf_applicant_contents).group().strip()
             except:
                 applicant = "ERROR: regex fails"
-        else:
-            pdf_applicant_contents = applicant = "unknown"
-            
-        # Agent
-        if len(re.findall(r'A\s?[Gg]\s?[Ee]\s?[Nn]\s?[Tt]', pdf_text)) != 0:
             try:
-                contractor = re.search(r'A\s?[Gg]\s?[Ee]\s?[Nn]\s?[Tt]\s?:?(.+?)(?=(P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d|c\/o|A\s?t\s?t\s?n|A\s?t\s?t\s?e\s?n\s?t\s?i\s?o\s?n|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))', pdf_text).group(1).strip()
+                contractor = p.contractor.search(pdf_applicant_contents).group(1).strip()
             except:
                 contractor = "ERROR: regex fails"
-        else:
-            contractor = "unknown"
-            
-            
-            
-    if district == "saj":
-        
-        if len(re.findall(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', pdf_text)) != 0:
-                
-            # Applicant full info
-            try:
-                pdf_applicant_contents = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))', pdf_text).group().strip()
-                # pdf_applicant_contents = re.sub(r'\s{2,}', "", pdf_applicant_contents)
 
-                # Extract applicant; no contractor for Jacksonville                  
-                try:
-                    applicant = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?\:?(.+?)(?=(P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d|c\/o|A\s?t\s?t\s?n|A\s?t\s?t\s?e\s?n\s?t\s?i\s?o\s?n|$))', pdf_applicant_contents).group(1).strip()
-                except:
-                    applicant = "ERROR: regex fails"
-                contractor = "unknown"
-
-            except:
-                pdf_applicant_contents = applicant = "ERROR: regex fails; track back to pdf_applicant_contents"
-                contractor = "unknown"
+         # Extract applicant and contractor when no contractor
         else:
-            pdf_applicant_contents = applicant = contractor = "unknown"
-            
-            
-        
-    if district == "swg":
-        
-        if len(re.findall(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', pdf_text)) != 0:
-            
-            # Applicant full info
-            try:
-                pdf_applicant_contents = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(L\s?O\s?C\s?A\s?T\s?I\s?O\s?N|P\s?R\s?O\s?J\s?E\s?C\s?T))', pdf_text).group().strip()
-                # pdf_applicant_contents = re.sub(r'\s{2,}', "", pdf_applicant_contents)
-            except:
-                pdf_applicant_contents = "ERROR: regex fails"
-                
-            # Applicant
+            contractor = "unknown"
             try:
-                applicant = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?\:?(.+?)(?=(P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d|c\/o|A\s?t\s?t\s?n|A\s?t\s?t\s?e\s?n\s?t\s?i\s?o\s?n))', pdf_text).group(1).strip()
+                applicant = p.applicant_without_contractor.search(pdf_applicant_contents).group().strip()
             except:
                 applicant = "ERROR: regex fails"
-        else:
-            pdf_applicant_contents = applicant = "unknown"
-        
-        # Agent
-        if len(re.findall(r'A\s?[Gg]\s?[Ee]\s?[Nn]\s?[Tt]', pdf_text)) != 0:
-            try:
-                contractor = re.search(r'A\s?[Gg]\s?[Ee]\s?[Nn]\s?[Tt]\s?:?(.+?)(?=(P\s?o\s?s\s?t|P\s?O|P\s?\.\s?O\s?\.|\d|c\/o|A\s?t\s?t\s?n|A\s?t\s?t\s?e\s?n\s?t\s?i\s?o\s?n|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))', pdf_text).group(1).strip()
-            except:
-                contractor = "ERROR: regex fails"
-        else:
-            contractor = "unknown"
-            
-    return {"pdf_applicant_contents":pdf_applicant_contents, 
-            "applicant":applicant, 
+
+    except:
+        pdf_applicant_contents = applicant = contractor = "ERROR: regex fails; track back to pdf_applicant_contents"
+
+    return {"pdf_applicant_contents":pdf_applicant_contents,
+            "applicant":applicant,
             "contractor":contractor}
 
 
 
-    
+
+@extractors.register("pdf", "applicant", districts = ["sam", "swg"])
+def _applicant_and_agent(pdf_text, p):
+    if extractors.has(pdf_text, p.applicant_marker):
+
+        # Applicant full info
+        try:
+            pdf_applicant_contents = extractors.sections(pdf_text, p).search(p.applicant_contents, "applicant").group().strip()
+            # pdf_applicant_contents = re.sub(r'\s{2,}', "", pdf_applicant_contents)
+        except:
+            pdf_applicant_contents = "ERROR: regex fails"
+
+        # Applicant
+        try:
+            applicant = extractors.sections(pdf_text, p).search(p.applicant, "applicant").group(1).strip()
+        except:
+            applicant = "ERROR: regex fails"
+    else:
+        pdf_applicant_contents = applicant = "unknown"
+
+    # Agent
+    if extractors.has(pdf_text, p.agent_marker):
+        try:
+            contractor = extractors.sections(pdf_text, p).search(p.agent, "agent").group(1).strip()
+        except:
+            contractor = "ERROR: regex fails"
+    else:
+        contractor = "unknown"
+
+    return {"pdf_applicant_contents":pdf_applicant_contents,
+            "applicant":applicant,
+            "contractor":contractor}
+
+
+
+
+@extractors.register("pdf", "applicant", districts = ["saj"])
+def _saj_applicant(pdf_text, p):
+    if not extractors.has(pdf_text, p.applicant_marker):
+        return {"pdf_applicant_contents":"unknown",
+                "applicant":"unknown",
+                "contractor":"unknown"}
+
+    # Applicant full info
+    try:
+        pdf_applicant_contents = extractors.sections(pdf_text, p).search(p.applicant_contents, "applicant").group().strip()
+        # pdf_applicant_contents = re.sub(r'\s{2,}', "", pdf_applicant_contents)
+
+        # Extract applicant; no contractor for Jacksonville
+        try:
+            applicant = p.applicant.search(pdf_applicant_contents).group(1).strip()
+        except:
+            applicant = "ERROR: regex fails"
+
+    except:
+        pdf_applicant_contents = applicant = "ERROR: regex fails; track back to pdf_applicant_contents"
+
+    return {"pdf_applicant_contents":pdf_applicant_contents,
+            "applicant":applicant,
+            "contractor":"unknown"}
+
+
+
+
+def get_pdf_applicant(pdf_text, district):
+    """
+    Get all info in "NAME OF APPLICANT"
+    """
+
+    return extractors.run("pdf", "applicant", pdf_text, district)
+
+
+
+
+@extractors.register("pdf", "location")
+def _location(pdf_text, p):
+    if not extractors.has(pdf_text, p.location_marker):
+        return "unknown"
+    try:
+        return extractors.sections(pdf_text, p).search(p.location, "location").group("section").replace("  ", " ").strip()
+    except:
+        return "ERROR: regex fails"
+
+
+
+
+@extractors.register("pdf", "location", districts = ["swg"])
+def _swg_location(pdf_text, p):
+    if not extractors.has(pdf_text, p.location_marker):
+        return "unknown"
+    try:
+        return extractors.sections(pdf_text, p).search(p.location, "location").group("section").replace("  ", "").strip()
+    except:
+        return "ERROR: regex fails"
+
+
+
+
 def get_pdf_location(pdf_text, district):
     """
     Get location of work
     """
-    
-    if len(re.findall(r'L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]', pdf_text)) != 0:
-        
-        if district == "mvn":
-            try:
-                pdf_location = re.search(r'L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk]\s?:?(.*?)(?=C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk])', pdf_text).group(1).replace("  ", " ").strip()
-            except:
-                pdf_location = "ERROR: regex fails"
-                
-        if district  == "sam":
-            try:
-                pdf_location = re.search(r'(L\s?O\s?C\s?A\s?T\s?I\s?O\s?N|W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y)\s?:?(.*?)(?=(P\s?R\s?O\s?J\s?E\s?C\s?T|P\s?R\s?O\s?P\s?O\s?S\s?E\s?D|A\s?P\s?P\s?L\s?I\s?C\s?A\s?N\s?T|W\s?O\s?R\s?K))', pdf_text).group(2).replace("  ", " ").strip()
-            except:
-                pdf_location = "ERROR: regex fails"
-                
-        if district == "saj":
-            try:
-                pdf_location = re.search(r'L\s?O\s?C\s?A\s?T\s?I\s?O\s?N\s?:?(.*?)(?=(D\s?i\s?r\s?e\s?c\s?t\s?i\s?o\s?n\s?s|A\s?P\s?P\s?R\s?O\s?X\s?I\s?M\s?A\s?T\s?E|P\s?R\s?O\s?J\s?E\s?C\s?T))', pdf_text).group(1).replace("  ", " ").strip()
-            except:
-                pdf_location = "ERROR: regex fails"
-                
-        if district == "swg":
-            try:
-                pdf_location = re.search(r'L\s?O\s?C\s?A\s?T\s?I\s?O\s?N\s?:?(.*?)(?=(L\s?A\s?T\s?I\s?T\s?U\s?D\s?E|A\s?G\s?E\s?N\s?D\s?A|P\s?R\s?O\s?J\s?E\s?C\s?T|A\s?V\s?O\s?I\s?D\s?A\s?N\s?C\s?E))', pdf_text).group(1).replace("  ", "").strip()
-            except:
-                pdf_location = "ERROR: regex fails"
-                
-    else:
-        pdf_location = "unknown"
-        
-    return pdf_location
 
- 
-    
-    
+    return extractors.run("pdf", "location", pdf_text, district)
+
+
+
+
+@extractors.register("pdf", "character")
+def _character(pdf_text, p):
+    if not extractors.has(pdf_text, p.character_marker):
+        return "unknown"
+    try:
+        # Moved back for the optional "PROJECT" before "DESCRIPTION" (Galveston)
+        return extractors.sections(pdf_text, p).search(p.character, "character", lead = 7).group("section").strip()
+        # pdf_character = re.sub(r'\s{2,}', "", pdf_character)
+    except:
+        return "ERROR: regex fails"
+
+
+
+
 def get_pdf_character(pdf_text, district):
     """
     Get character of work
     """
-    
-    if district == "mvn":
-        if len(re.findall(r'C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk]|D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N', pdf_text)) != 0:
-            try:
-                pdf_character = re.search(r'(C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?[Ww]\s?[Oo]\s?[Rr]\s?[Kk]|D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N)\s?:?(.*?)(?=(M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N|T\s?h\s?e\s?c\s?o\s?m\s?m\s?e\s?n\s?t\s?p\s?e\s?r\s?i\s?o\s?d))', pdf_text).group(2).strip()
-                # pdf_character = re.sub(r'\s{2,}', "", pdf_character)
-            except:
-                pdf_character = "ERROR: regex fails"
-        else:
-            pdf_character = "unknown"
-            
-                          
-    if district in ("sam", "saj"):
-        if len(re.findall(r'[W\s?O\s?R\s?K|O\s?B\s?J\s?E\s?C\s?T\s?I\s?V\s?E\s?S]', pdf_text)) != 0:
-            try:
-                pdf_character = re.search(
-                r'(P\s?R\s?O\s?P\s?O\s?S\s?E\s?D\s?W\s?O\s?R\s?K|W\s?O\s?R\s?K\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N|W\s?O\s?R\s?K|P\s?R\s?O\s?J\s?E\s?C\s?T\s?G\s?O\s?A\s?L\s?S\s?A\s?N\s?D\s?O\s?B\s?J\s?E\s?C\s?T\s?I\s?V\s?E\s?S)\s?:?(.*?)(?=(A\s?[Vv]\s?[Oo]\s?[Ii]\s?[Dd]\s?[Aa]\s?[Nn]\s?[Cc]\s?[Ee]|[A-Z]{6,}[\s|:]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?h\s?a\s?s\s?a\s?p\s?p\s?l\s?i\s?e\s?d))',
-                pdf_text).group(2).strip()
-                # pdf_character = re.sub(r'\s{2,}', "", pdf_character)
-            except:
-                pdf_character = "ERROR: regex fails"
-        else:
-            pdf_character = "unknown"
-                          
-            
-    if district == "swg":
-        if len(re.findall(r'P?\s?R?\s?O?\s?J?\s?E?\s?C?\s?T?\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N', pdf_text)) != 0:
-            try:
-                pdf_character = re.search(r'P?\s?R?\s?O?\s?J?\s?E?\s?C?\s?T?\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N\s?:?(.*?)(?=[A-Z]{6,}[\s|:])', pdf_text).group(1).strip()
-            except:
-                pdf_character = "ERROR: regex fails"
-        else:
-            pdf_character = "unknown"
-            
-    return pdf_character
+
+    return extractors.run("pdf", "character", pdf_text, district)
+
+
+
+
+@extractors.register("pdf", "mitigation", districts = ["mvn"])
+def _mvn_mitigation(pdf_text, p):
+    if not extractors.has(pdf_text, p.mitigation_marker):
+        return "unknown"
+    try:
+        return extractors.sections(pdf_text, p).search(p.mitigation, "mitigation").group("section").strip()
+        # pdf_mitigation = re.sub(r'\s{2,}', "", pdf_mitigation)
+    except:
+        return "ERROR: regex fails"
+
+
+
+
+@extractors.register("pdf", "mitigation", districts = ["sam", "saj", "swg"])
+def _avoidance_and_mitigation(pdf_text, p):
+    if not extractors.has(pdf_text, p.mitigation_marker):
+        return "unknown"
+        # pdf_mitigation = re.search(r'(AVOIDANCE|COMPENSATORY|MITIGATION).*?(?=WATER|The applicant will apply|The applicant has applied|CULTURAL)', pdf_text).group().strip()
+    try:
+        pdf_avio_mini = extractors.sections(pdf_text, p).search(p.avoidance_minimization, "minimization").group().strip()
+    except:
+        pdf_avio_mini = "ERROR:  regex fails, AVOIDANCE AND MINIMIZATION"
+    try:
+        pdf_comp_miti = extractors.sections(pdf_text, p).search(p.compensatory_mitigation, "mitigation").group().strip()
+    except:
+        pdf_comp_miti = "ERROR:  regex fails, COMPENSATORY MITIGATION"
+    if "ERROR" not in pdf_avio_mini and "ERROR" not in pdf_comp_miti:
+        return pdf_avio_mini + " " + pdf_comp_miti
+        # pdf_mitigation = re.sub(r'\s{2,}', "", pdf_mitigation)
+    return "ERROR: regex fails; track back to pdf_avio_mini or pdf_comp_miti"
 
 
 
@@ -654,39 +794,9 @@ def get_pdf_mitigation(pdf_text, district):
     """
     Get mitigation
     """
-    
-    if district == "mvn":
-        if len(re.findall(r'M\s?[Ii]\s?[Ti]\s?[Ii]\s?[Gg]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]', pdf_text)) != 0:
-            try:
-                pdf_mitigation = re.search(r'M\s?[Ii]\s?[Ti]\s?[Ii]\s?[Gg]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?:?(.*?)(?=T\s?h\s?e\s?c\s?o\s?m\s?m\s?e\s?n\s?t\s?p\s?e\s?r\s?i\s?o\s?d)', pdf_text).group(1).strip()
-                # pdf_mitigation = re.sub(r'\s{2,}', "", pdf_mitigation)
-            except:
-                pdf_mitigation = "ERROR: regex fails"
-        else:
-            pdf_mitigation = "unknown"
-    
-    if district in ["sam", "saj", "swg"]:
-        if len(re.findall(r'(A\s?V\s?O\s?I\s?D\s?A\s?N\s?C\s?E\s?(&|A\s?N\s?D)\s?M\s?I\s?N\s?I\s?M\s?I\s?Z\s?A\s?T\s?I\s?O\s?N|C?\s?O?\s?M?\s?P?\s?E?\s?N?\s?S?\s?A?\s?T?\s?O?\s?R?\s?Y?\s?M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N)', pdf_text)) != 0:
-                # pdf_mitigation = re.search(r'(AVOIDANCE|COMPENSATORY|MITIGATION).*?(?=WATER|The applicant will apply|The applicant has applied|CULTURAL)', pdf_text).group().strip()
-            try:
-                pdf_avio_mini = re.search(r'M\s?[Ii]\s?[Nn]\s?[Ii]\s?[Mm]\s?[Ii]\s?[Zz]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?[Ii]?\s?[Nn]?\s?[Ff]?\s?[Oo]?\s?[Rr]?\s?[Mm]?\s?[Aa]?\s?[Tt]?\s?[Ii]?\s?[Oo]?\s?[Nn]?.+?(?=([A-Z]{6,}[:\s]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?w\s?i\s?l\s?l\s?a\s?p\s?p\s?l\s?y))', pdf_text).group().strip()
-            except:
-                pdf_avio_mini = "ERROR:  regex fails, AVOIDANCE AND MINIMIZATION"
-            try:
-                pdf_comp_miti = re.search(r'M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N.+?(?=([A-Z]{6,}[:\s]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?w\s?i\s?l\s?l\s?a\s?p\s?p\s?l\s?y))', 
-                                     pdf_text).group().strip()
-            except:
-                pdf_comp_miti = "ERROR:  regex fails, COMPENSATORY MITIGATION"
-            if "ERROR" not in pdf_avio_mini and "ERROR" not in pdf_comp_miti:
-                pdf_mitigation = pdf_avio_mini + " " + pdf_comp_miti
-                # pdf_mitigation = re.sub(r'\s{2,}', "", pdf_mitigation)
-            else:
-                pdf_mitigation = "ERROR: regex fails; track back to pdf_avio_mini or pdf_comp_miti"
-        else:
-            pdf_mitigation = "unknown"
-        
-    return pdf_mitigation
-                
+
+    return extractors.run("pdf", "mitigation", pdf_text, district)
+
 
 
 
@@ -699,6 +809,8 @@ def get_pdf_city_county_parish(pdf_location):
     Get county, city, and parish name
     """
     
+    p = extractors.patterns("pdf")
+
     # Divide the parapragh into sentenses
     loc_sent_list = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?)\s', pdf_location)
     if len(loc_sent_list) == 0:
@@ -710,10 +822,8 @@ def get_pdf_city_county_parish(pdf_location):
 
     for sent in loc_sent_list:
         # if any(x in sent for x in ["Louisiana", "LA", "Alabama", "AL", "Florida", "Fl orida", "FL", "Texas", "TX"]):
-        have_county = re.findall(r'[Cc]\s?o\s?u\s?n\s?t\s?y', sent)
-
         # For the sentence mentions "County", pull the xxx County
-        if len(have_county)!= 0:
+        if p.county_marker.search(sent) is not None:
             county = re.findall(r'[A-Z][\w\s]+?C\s?o\s?u\s?n\s?t\s?y', sent)
 
             # Pull the city name, which usually is before county name
@@ -762,8 +872,7 @@ def get_pdf_city_county_parish(pdf_location):
                 city_list.append(city_name)
 
         # Parish        
-        have_parish = re.findall(r'P\s?a\s?r\s?i\s?s\s?h', sent)
-        if len(have_parish) != 0:
+        if p.parish_marker.search(sent) is not None:
             parish = re.findall(r'(i\s?n|o\s?f)\s?([A-Z][\w\s\.]+?P\s?a\s?r\s?i\s?s\s?h)', sent)
             for parish_name in parish:
                 parish_name = re.sub(r'([a-z])([A-Z])', r'\1 \2', parish_name[1].replace(" ", ""))
@@ -794,9 +903,10 @@ def get_pdf_hydrologic(pdf_text):
     """
     Get hydrologic unit code
     """
-    if len(re.findall(r'(H\s?y\s?d\s?r\s?o\s?l\s?o\s?g\s?i\s?c\s?U\s?n\s?i\s?t\s?C\s?o\s?d\s?e|H\s?U\s?C)', pdf_text)) != 0:
+    p = extractors.patterns("pdf")
+    if extractors.has(pdf_text, p.hydrologic_marker):
         try:
-            hydrologic_unit_code = re.search(r'(H\s?y\s?d\s?r\s?o\s?l\s?o\s?g\s?i\s?c\s?U\s?n\s?i\s?t\s?C\s?o\s?d\s?e|H\s?U\s?C)\s?8?\s?:?\s?([\s\d]*)', pdf_text).group(2).strip().replace(" ", "")
+            hydrologic_unit_code = p.hydrologic.search(pdf_text).group(2).strip().replace(" ", "")
         except:
             hydrologic_unit_code = "ERROR: regex fails"
     else:
@@ -820,10 +930,10 @@ def get_lon_lat(pdf_text):
     
     
     # Longitude
-    lon_exist = re.findall(r'([Ll]\s?[Oo]\s?[Nn]\s?[Gg]\s?[Ii]\s?[Tt]\s?[Uu]\s?[Dd]\s?[Ee]|[Ll]\s?[Oo]\s?[Nn]\s?[Gg]\s?\.)', pdf_text)
+    p = extractors.patterns("pdf")
     
     # when longitude is provided
-    if len(lon_exist) != 0:  
+    if extractors.has(pdf_text, p.longitude_marker):  
         
         # Try to pull lon in decimal degree format
         lon = re.findall(r'([Ll]\s?o\s?n\s?g?\s?i?\s?t?\s?u?\s?d?\s?e?\s?\.?:?|-|–|W\s?e?\s?s?\s?t?\s?\.?:?)(\s*[\d\s]{2,3}\.[\d\s]{3,8})', pdf_text)
@@ -855,10 +965,8 @@ def get_lon_lat(pdf_text):
     
     
     # Latitude
-    lat_exist = re.findall(r'([Ll]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Tt]\s?[Uu]\s?[Dd]\s?[Ee]|[Ll]\s?[Aa]\s?[Tt]\s?\.)', pdf_text) 
-    
     # When latitude is provided
-    if len(lat_exist) != 0:
+    if extractors.has(pdf_text, p.latitude_marker):
         
         # Try to pull lon in decimal degree format
         lat = re.findall(r"(?<=[^-W°ºo][^-\d°ºo])\d\s?\d\s?\.[\d\s]{4,8}", pdf_text)
@@ -1223,66 +1331,109 @@ def lf_type_term(lf_item):
 
 
 
+# Tokens of the impact extraction, matched in one pass each without backtracking:
+# the end of a sentence (a period after a non-digit), the units of the impacted quantities (with their optional last letter, e.g. "acres"),
+# and the end of a piece of sentence after its unit (a non-digit followed by ",", "." or " and", with the words after it)
+sentence_end = re.compile(r'(?<=\D)\.')
+impact_units = {"acre": re.compile(r'acre(s?)'),
+                "square feet": re.compile(r'f[eo]*t(2?)'),
+                "linear feet": re.compile(r'linear\sfe?e?t()')}
+piece_end = re.compile(r'(?<=\D)(,|\.|\sand)[A-Za-z\s]*')
+
+
+
+
+def split_sentences(pdf_character):
+    """
+    Split character of work into sentences, each ending with a period after a non-digit (not a decimal point); the text after the last
+    one is left out
+    """
+    
+    sentences = []
+    start = 0
+    for period in sentence_end.finditer(pdf_character):
+        end = period.start()
+        # The period closes a sentence of at least one character, on one line (but for the character just before the period)
+        if end > start:
+            newline = pdf_character.rfind("\n", start, end - 1)
+            sentences.append(pdf_character[max(start, newline + 1):end + 1])
+            start = end + 1
+    return sentences
+
+
+
+
+def split_pieces(char_sent, unit):
+    """
+    Break one sentence into pieces with each piece having one subject, one verb, and one object: each piece runs to the end of the piece
+    after its quantity in the unit
+    """
+    
+    pieces = []
+    start = 0
+    while True:
+        unit_token = impact_units[unit].search(char_sent, start)
+        if unit_token is None:
+            return pieces
+        # The unit with its optional last letter, else without it
+        unit_ends = [unit_token.end()]
+        if unit_token.group(1) != "":
+            unit_ends.append(unit_token.start(1))
+        for unit_end in unit_ends:
+            end_token = piece_end.search(char_sent, unit_end + 2)
+            if end_token is not None:
+                break
+        # No piece ends after this unit, nor after the later ones
+        if end_token is None:
+            return pieces
+        pieces.append(char_sent[start:end_token.end()])
+        start = end_token.end()
+
+
+
+
 def get_pdf_impact(pdf_character):
     """
     Get impacted acreage
     """
-    # Split character of work into sentences
-    char_sent_list = re.findall(r'.*?\D\.', pdf_character)
     
     # Create a empty impact output list
     impact_output = []
-
+    
     # Select sentences containing key words indicating impacts
-    for char_sent in char_sent_list:
+    for char_sent in split_sentences(pdf_character):
         
         # is_impact = re.findall(r'im\s?pact|affect|loss|excava|b\s?enef|preserv|creat', char_sent)
         # if len(is_impact) != 0:
-
-        # Create empty impact output list of different units in each sentence
-        acre_output = ft2_output = lf_output = []
-
+        
+        # For each piece of the sentence, pull the number, impacted type, and impacted time length
+        impacts = []
         if "acre" in char_sent:
-
-            # Break one sentence into pieces with each piece having one subject, one verb, and one object
-            acre_list = re.findall(r'(.*?\d*,?\d*\s?\.?\s?\d*-?\s?acres?.+?\D(,|\.|\sand)[A-Za-z\s]*)', char_sent)
-            # For each piece, pull the number, impacted type, and impacted time length
-            acre_output = acre_output + [acre_type_term(x[0]) for x in acre_list]
-
+            impacts = impacts + [acre_type_term(piece) for piece in split_pieces(char_sent, "acre")]
         if any(w in char_sent for w in ["square", "ft2"]):
-
-            # Break one sentence into pieces with each piece having one subject, one verb, and one object
-            ft2_list = re.findall(r'(.*?\d*,?\d*\s?\.?\s?\d*-?\s?(square)?-?\s?f[eo]*t2?.+?\D(,|\.|\sand)[A-Za-z\s]*)', char_sent)
-            # For each piece, pull the number, impacted type, and impacted time length
-            ft2_output = ft2_output + [ft2_type_term(x[0]) for x in ft2_list]
-
+            impacts = impacts + [ft2_type_term(piece) for piece in split_pieces(char_sent, "square feet")]
         if "linear" in char_sent:
-
-             # Break one sentence into pieces with each piece having one subject, one verb, and one object
-            lf_list = re.findall(r'(.*?\d*,?\d*\s?\.?\s?\d*-?\s?linear\sfe?e?t.+?\D(,|\.|\sand)[A-Za-z\s]*)', char_sent)
-            # For each piece, pull the number, impacted type, and impacted time length
-            lf_output = lf_output + [lf_type_term(x[0]) for x in lf_list]
-
+            impacts = impacts + [lf_type_term(piece) for piece in split_pieces(char_sent, "linear feet")]
+        
         # The impact time length and for this text piece might be found in other text piece: eg. permanently impact xxx, xxx, and xxx
-        if len(acre_output + ft2_output + lf_output) != 0:
-            impact_df = pd.DataFrame(acre_output + ft2_output + lf_output)
-
+        if len(impacts) != 0:
+            
             # "temporarily impact a and b", impact time length of a and b should be "temporary"
-            if any(n == 0 for n in impact_df["impact_duration_missing"]):
-                for r in range(len(impact_df)):
-                    if impact_df.loc[r, "impact_duration_missing"] == 2:
-                        impact_df.loc[r, "impact_duration"] = impact_df[impact_df["impact_duration_missing"] == 0].reset_index().loc[0, "impact_duration"]
-
-            # "impact/preserve a and b", a and b should be both negatively/positively impacted
-            if any(n != "same as previous/later one" for n in impact_df["impact_condition"]):
-                for r in range(len(impact_df)):
-                    if impact_df.loc[r, "impact_condition"] == "same as previous/later one":
-                        impact_df.loc[r, "impact_condition"] = impact_df[impact_df["impact_condition"] != "same as previous/later one"].reset_index().loc[0, "impact_condition"]
-            else:
-                for r in range(len(impact_df)):
-                    impact_df.loc[r, "impact_condition"] = "unknown"
-
-            impact_output = impact_output + impact_df.drop("impact_duration_missing", axis = 1).to_dict("records")
+            durations = [impact["impact_duration"] for impact in impacts if impact["impact_duration_missing"] == 0]
+            conditions = [impact["impact_condition"] for impact in impacts if impact["impact_condition"] != "same as previous/later one"]
+            
+            for impact in impacts:
+                duration_missing = impact.pop("impact_duration_missing")
+                if len(durations) != 0 and duration_missing == 2:
+                    impact["impact_duration"] = durations[0]
+                
+                # "impact/preserve a and b", a and b should be both negatively/positively impacted
+                if len(conditions) == 0:
+                    impact["impact_condition"] = "unknown"
+                elif impact["impact_condition"] == "same as previous/later one":
+                    impact["impact_condition"] = conditions[0]
+            
+            impact_output = impact_output + impacts
             
     return impact_output
 
@@ -1298,7 +1449,7 @@ def get_wqc(pdf_text):
     
     if "WQC" in pdf_text:
         try:
-            wqc = re.search(r'W\s?Q\s?C\s?:?#?([\d\s]*-[\s\d]*)', pdf_text).group(1).strip().replace(" ", "")
+            wqc = extractors.patterns("pdf").wqc.search(pdf_text).group(1).strip().replace(" ", "")
         except:
             wqc = "ERROR: regex fails"
     else:
@@ -1315,7 +1466,7 @@ def get_coastal_use_permit(pdf_text):
     
     if pdf_text.find("Natural Resource’s Coastal Resources Program") != -1:
         try:
-            coastal_use_permit_list = re.findall(r'P\d{8}', pdf_text)
+            coastal_use_permit_list = extractors.patterns("pdf").coastal_use_permit.findall(pdf_text)
             coastal_use_permit = ", ".join(coastal_use_permit_list)
         except:
             coastal_use_permit = "ERROR: regex fails"
@@ -1324,11 +1475,171 @@ def get_coastal_use_permit(pdf_text):
         
     return coastal_use_permit
 
+
+
+
+# The district-independent fields also belong to extractors.extract(pdf_text, district)
+for field, get_field in [("hydrologic", get_pdf_hydrologic), ("lon_lat", get_lon_lat), ("wqc", get_wqc), ("coastal_use_permit", get_coastal_use_permit)]:
+    extractors.register("pdf", field)(lambda pdf_text, p, get_field = get_field: get_field(pdf_text))
+
     
     
     
 # FINAL FUNCTION (COMBINED)
 
+# Fields of the pdf_extraction output, in order
+pdf_extraction_fields = ['specialFlag', 'pdf_comment_window', 'usacePermitNumber', 'pdf_districtCode', 'pdf_districtName', 'name', 'phone', 'email',
+                         'applicantDetails', 'applicantCompanyName', 'applicantContractorName', 'pdf_location', 'pdf_longitude', 'pdf_latitude',
+                         'pdf_county', 'pdf_parish', 'pdf_city', 'pdf_character', 'pdf_mitigation', 'hydrologicUnitCode', 'pdf_wqc', 'pdf_cup',
+                         'pdf_impact', 'pdf_full_text', 'pdf_trimmed', 'pdf_text_flag']
+
+
+
+
+def special_notice(pdf_text, pdf_applicant_contents, pdf_location, pdf_character):
+    """
+    1 for a special public notice (declared as such, or without applicant, location and character of work), else 0
+    """
+    
+    if extractors.patterns("pdf").special_notice.search(pdf_text.replace(" ", "")) is not None:
+        return 1
+    if all("ERROR" in item or item == "unknown" for item in [pdf_applicant_contents, pdf_location, pdf_character]):
+        return 1
+    return 0
+
+
+
+
+def special_notice_app_num(pdf_app_num, special):
+    """
+    A special public notice may have no application number: no error then
+    """
+    
+    if special == 1 and "ERROR" in pdf_app_num:
+        return "unknown"
+    return pdf_app_num
+
+
+
+
+# Extraction plan of a readable notice text: (field, function, input fields, skip), in order of computation.
+# Each field is computed once and shared with the fields depending on it. With skip None, the function always runs; otherwise the function
+# is skipped when one of the inputs is "unknown" (the field is "unknown") or an ERROR (the field is skip + that ERROR).
+pdf_extraction_plan = [
+    ('pdf_trimmed', trim_pdf, ['pdf_full_text', 'district'], None),
+    ('pdf_comment_window', get_comment_window, ['pdf_full_text', 'district'], None),
+    ('pdf_app_num', get_pdf_app_num, ['pdf_full_text', 'district'], None),
+    ('pdf_manager', get_pdf_manager, ['pdf_full_text', 'district'], None),
+    ('name', lambda pdf_manager: pdf_manager["manager_name"], ['pdf_manager'], None),
+    ('phone', lambda pdf_manager: pdf_manager["manager_phone"], ['pdf_manager'], None),
+    ('email', lambda pdf_manager: pdf_manager["manager_email"], ['pdf_manager'], None),
+    ('pdf_applicant', get_pdf_applicant, ['pdf_full_text', 'district'], None),
+    ('applicantDetails', lambda pdf_applicant: pdf_applicant["pdf_applicant_contents"], ['pdf_applicant'], None),
+    ('applicantCompanyName', lambda pdf_applicant: pdf_applicant["applicant"], ['pdf_applicant'], None),
+    ('applicantContractorName', lambda pdf_applicant: pdf_applicant["contractor"], ['pdf_applicant'], None),
+    ('pdf_location', get_pdf_location, ['pdf_full_text', 'district'], None),
+    ('pdf_character', get_pdf_character, ['pdf_full_text', 'district'], None),
+    ('pdf_mitigation', get_pdf_mitigation, ['pdf_full_text', 'district'], None),
+    ('pdf_wqc', get_wqc, ['pdf_full_text'], None),
+    ('pdf_cup', get_coastal_use_permit, ['pdf_full_text'], None),
+    ('hydrologicUnitCode', get_pdf_hydrologic, ['pdf_location'], "ERROR: cannot extract location of work"),
+    ('county_parish_city', get_pdf_city_county_parish, ['pdf_location'], "ERROR: cannot extract location of work"),
+    ('pdf_county', lambda county_parish_city: county_parish_city[0], ['county_parish_city'], ""),
+    ('pdf_parish', lambda county_parish_city: county_parish_city[1], ['county_parish_city'], ""),
+    ('pdf_city', lambda county_parish_city: county_parish_city[2], ['county_parish_city'], ""),
+    ('lon_lat', get_lon_lat, ['pdf_full_text'], None),
+    ('pdf_longitude', lambda lon_lat: lon_lat["lon"], ['lon_lat'], None),
+    ('pdf_latitude', lambda lon_lat: lon_lat["lat"], ['lon_lat'], None),
+    ('pdf_impact', get_pdf_impact, ['pdf_character'], "ERROR: cannot extract character of work "),
+    ('specialFlag', special_notice, ['pdf_full_text', 'applicantDetails', 'pdf_location', 'pdf_character'], None),
+    ('usacePermitNumber', special_notice_app_num, ['pdf_app_num', 'specialFlag'], None),
+]
+
+
+
+
+def run_extraction_plan(pdf_text, district, plan=pdf_extraction_plan):
+    """
+    Compute the fields of the extraction plan from a readable notice text: {field: value}, with the intermediate fields
+    """
+    
+    fields = {"pdf_full_text": pdf_text, "district": district}
+    for field, function, inputs, skip in plan:
+        missing = [fields[name] for name in inputs if isinstance(fields[name], str) and (fields[name] == "unknown" or "ERROR" in fields[name])]
+        if skip is None or len(missing) == 0:
+            fields[field] = function(*[fields[name] for name in inputs])
+        elif missing[0] == "unknown":
+            fields[field] = "unknown"
+        else:
+            fields[field] = skip + missing[0]
+    return fields
+
+
+
+
+def run_extraction_plan_column(pdf_texts, district, plan=pdf_extraction_plan):
+    """
+    Run the extraction plan over a column of notice texts of one district, e.g. the archived pdf_full_text of the district: a DataFrame with
+    the pdf_extraction fields of the plan, indexed as pdf_texts. Each distinct text is extracted once; the texts that are not readable
+    (missing or ERROR) get missing fields.
+    """
+    
+    planned = [field for field, _, _, _ in plan]
+    columns = [field for field in pdf_extraction_fields if field in planned]
+    
+    def extract_text(pdf_text):
+        if "ERROR" in pdf_text:
+            return [None] * len(columns)
+        fields = run_extraction_plan(pdf_text, district, plan)
+        return [fields[field] for field in columns]
+    
+    return extractors.map_column(pdf_texts, extract_text, columns)
+
+
+
+
+def pdf_extraction_output(pdf_url, pdf_text, pdf_text_flag, district, web_title):
+    """
+    The pdf_extraction output of a notice from its text (after OCR or replacement with the webpage text)
+    """
+    
+    # PDF url exists
+    if pd.isnull(pdf_url) == False:
+        
+        # If the PDf url is valid and readable
+        if "ERROR" not in pdf_text:
+            fields = run_extraction_plan(pdf_text, district)
+            district_dic = {"MVN": "New Orleans District",
+                            "SWG": "Galveston District",
+                            "SAM": "Mobile District",
+                            "SAJ": "Jacksonville District"}
+            fields["pdf_districtCode"] = district.upper()
+            fields["pdf_districtName"] = district_dic[district.upper()]
+            
+        # PDF reader problem
+        else:
+            fields = pdf_extraction_error("ERROR: no pdf or webpage text found")
+            fields["pdf_full_text"] = pdf_text
+            
+    # Do not have pdf url
+    else:
+        fields = pdf_extraction_error("unknown")
+        fields["specialFlag"] = 1
+        
+    fields["pdf_text_flag"] = pdf_text_flag
+    
+    # if applicantion permit number is error, pull from webpage title:
+    if "ERROR" in fields["usacePermitNumber"] or fields["usacePermitNumber"] == "unknown":
+        try:
+            fields["usacePermitNumber"] = re.search(r'[A-Z]{3}[-\s]?\d{4}[-\s]?\d{4,5}[-\s]?\d?[-\s]?[A-Z]{0,3}[\(A-Z\-]*\)?', web_title).group()
+        except:
+            fields["usacePermitNumber"] = "ERROR: cannot pull from webpage title"
+            
+    return {field: fields[field] for field in pdf_extraction_fields}
+
+
+
+
 def pdf_extraction(pdf_url, web_text, web_title, tesseract_path=None):
     """
     This function consists of all the components above to extract fields from the public notice pdf.
@@ -1344,14 +1655,6 @@ def pdf_extraction(pdf_url, web_text, web_title, tesseract_path=None):
         except:
              # The pdf url for Jacksonville is unique: do not contain district abbreviation
             district = "saj"
-
-        district_dic = {"MVN": "New Orleans District",
-                   "SWG": "Galveston District",
-                   "SAM": "Mobile District",
-                   "SAJ": "Jacksonville District"}
-
-        pdf_dist_code = district.upper()
-        pdf_dist_name = district_dic[pdf_dist_code]
         
         # Pull the PDF texts
         pdf_text = pdf_read(pdf_url, district)
@@ -1379,204 +1682,394 @@ def pdf_extraction(pdf_url, web_text, web_title, tesseract_path=None):
         if isinstance(pdf_text, str) == False:
             pdf_text = "ERROR: Replaced with webpage text but no texts in the webpage body"
             pdf_text_flag = "Replaced with webpage text but no texts in the webpage body"
+    
+    # Do not have pdf url
+    else:
+        district = None
+        pdf_text = "unknown"
+        pdf_text_flag = "PDF url is unknown"
+        
+    return pdf_extraction_output(pdf_url, pdf_text, pdf_text_flag, district, web_title)
+
 
-        # If the PDf url is valid and readable
-        if "ERROR" not in pdf_text: 
 
-            pdf_trimmed = trim_pdf(pdf_text, district)
 
-            comment_window = get_comment_window(pdf_text, district)
+def pdf_extraction_error(message):
+    """
+    The pdf_extraction output when the extraction of a notice fails as a whole
+    """
+    
+    return {field: message for field in pdf_extraction_fields}
+
 
-            pdf_app_num = get_pdf_app_num(pdf_text, district)
 
-            pdf_manager = get_pdf_manager(pdf_text, district)
 
-            pdf_applicant = get_pdf_applicant(pdf_text, district)
+def _init_pdf_worker(http_settings, pdf_store_settings):
+    """
+    Carry the HTTP client and PDF store settings over to each worker process (needed when processes are spawned)
+    """
+    
+    http_client.configure(**http_settings)
+    pdf_store.configure(**pdf_store_settings)
 
-            pdf_location = get_pdf_location(pdf_text, district)
 
-            pdf_character = get_pdf_character(pdf_text, district)
 
-            pdf_mitigation = get_pdf_mitigation(pdf_text, district)
 
-            wqc = get_wqc(pdf_text)
+def _pdf_worker(conn, http_settings, pdf_store_settings):
+    """
+    Worker process of PdfExtractionPool: extract the notices received on conn, one at a time, until None
+    """
+    
+    _init_pdf_worker(http_settings, pdf_store_settings)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        key, args = task
+        try:
+            pdf_fields = pdf_extraction(*args)
+        except Exception as e:
+            pdf_fields = pdf_extraction_error("ERROR: PDF extraction failed; " + str(e))
+        conn.send((key, pdf_fields))
 
-            cup = get_coastal_use_permit(pdf_text)
 
-            if pdf_location == "unknown":
-                hydrologic_unit_code = county = city = parish = "unknown"
-            elif "ERROR" in pdf_location:
-                hydrologic_unit_code = county = city = parish = "ERROR: cannot extract location of work" + pdf_location
-            else:
-                hydrologic_unit_code = get_pdf_hydrologic(pdf_location)
-                county = get_pdf_city_county_parish(pdf_location)[0]
-                parish = get_pdf_city_county_parish(pdf_location)[1]
-                city = get_pdf_city_county_parish(pdf_location)[2]
-
-            lon = get_lon_lat(pdf_text)["lon"]
-            lat = get_lon_lat(pdf_text)["lat"]
-
-            if pdf_character == "unknown":
-                impact_output = "unknown"
-            elif "ERROR" in pdf_character:
-                impact_output = "ERROR: cannot extract character of work " + pdf_character
-            else:
-                impact_output = get_pdf_impact(pdf_character)
 
-            # Special public notice
-            if len(re.findall(r'[Ss][Pp][Ee][Cc][Ii][Aa][Ll][Pp][Uu][Bb][Ll][Ii][Cc][Nn][Oo][Tt][Ii][Cc][Ee]|G[Ee][Nn][Ee][Rr][Aa][Ll][Pp][Ee][Rr][Mm][Ii][Tt]', pdf_text.replace(" ", ""))) != 0:
-                special = 1
-                if "ERROR" in pdf_app_num:
-                    pdf_app_num = "unknown"
-            else:
-                if all("ERROR" in item or item == "unknown" for item in [pdf_applicant["pdf_applicant_contents"], pdf_location, pdf_character]):
-                    special = 1
-                    if "ERROR" in pdf_app_num:
-                        pdf_app_num = "unknown"
-                else:
-                    special = 0
-     
-        # PDF reader problem
-        else:
-            special = "ERROR: no pdf or webpage text found"
-            pdf_app_num = pdf_dist_code = pdf_dist_name = "ERROR: no pdf or webpage text found"
-            pdf_manager = {"manager_name":"ERROR: no pdf or webpage text found",
-                           "manager_phone":"ERROR: no pdf or webpage text found",
-                           "manager_email": "ERROR: no pdf or webpage text found"}
-            pdf_applicant = {"pdf_applicant_contents":"ERROR: no pdf or webpage text found",
-                             "applicant":"ERROR: no pdf or webpage text found",
-                             "contractor": "ERROR: no pdf or webpage text found"}
-            comment_window = pdf_location = pdf_character = pdf_mitigation = county = parish = city = hydrologic_unit_code = lon = lat = wqc = cup = "ERROR: no pdf or webpage text found"
-            impact_output = "ERROR: no pdf or webpage text found"
-            pdf_text = pdf_text
-            pdf_trimmed = "ERROR: no pdf or webpage text found"
+
+class PdfExtractionPool:
+    """
+    Worker processes extracting notice PDFs, one notice per worker at a time.
+    The time limit of a notice is enforced from this process: a worker still busy after timeout seconds is terminated and replaced, and
+    the notice gets the "ERROR: PDF extraction timed out" output. Nothing is raised into the extraction code, which catches most exceptions.
+    """
     
-    # Do not have pdf url
-    else:
-        special = 1
-        pdf_app_num = pdf_dist_code = pdf_dist_name = "unknown"
-        pdf_manager = {"manager_name":"unknown",
-                       "manager_phone":"unknown",
-                       "manager_email": "unknown"}
-        pdf_applicant = {"pdf_applicant_contents":"unknown",
-                         "applicant":"unknown",
-                         "contractor": "unknown"}
-        comment_window = pdf_location = pdf_character = pdf_mitigation = county = parish = city = hydrologic_unit_code = lon = lat = wqc = cup = "unknown"
-        impact_output = "unknown"
-        pdf_text = "unknown"
-        pdf_trimmed = "unknown"
-        pdf_text_flag = "PDF url is unknown"
+    def __init__(self, workers=1, tesseract_path=None, timeout=None):
+        self.tesseract_path = tesseract_path
+        self.timeout = timeout
+        self.workers = [self._start_worker() for _ in range(max(1, workers))]
+    
+    def _start_worker(self):
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target = _pdf_worker,
+                                          args = (child_conn, http_client.settings(), pdf_store.settings()),
+                                          daemon = True)
+        process.start()
+        child_conn.close()
+        return {"process": process, "conn": conn, "key": None, "pdf_url": None, "started": None}
+    
+    def _replace_worker(self, worker):
+        worker["process"].terminate()
+        worker["process"].join()
+        worker["conn"].close()
+        worker.update(self._start_worker())
+    
+    def imap_unordered(self, tasks):
+        """
+        Extract the notices of tasks, an iterable of (key, (pdf_url, web_text, web_title)), and yield (key, pdf_fields) as they finish.
+        A task whose second item is already the pdf fields (e.g. from a checkpoint) is passed through.
+        tasks is consumed by a feeder thread, at most one task ahead per worker, so a slow source does not hold back the time limits.
+        An exception raised by tasks is raised here once the notices already handed to the workers are yielded.
+        """
+        
+        task_queue = queue.Queue(maxsize = len(self.workers))
+        end = object()
+        feed_errors = []
+        
+        def feed():
+            try:
+                for task in tasks:
+                    task_queue.put(task)
+            except BaseException as e:
+                feed_errors.append(e)
+            finally:
+                task_queue.put(end)
         
-    # if applicantion permit number is error, pull from webpage title:
-    if "ERROR" in pdf_app_num or pdf_app_num == "unknown":
-        try:
-            pdf_app_num = re.search(r'[A-Z]{3}[-\s]?\d{4}[-\s]?\d{4,5}[-\s]?\d?[-\s]?[A-Z]{0,3}[\(A-Z\-]*\)?', web_title).group()
-        except:
-            pdf_app_num = "ERROR: cannot pull from webpage title"
-
-    return {'specialFlag': special,
-            'pdf_comment_window': comment_window,                           
-            'usacePermitNumber': pdf_app_num,
-            'pdf_districtCode':  pdf_dist_code,
-            'pdf_districtName': pdf_dist_name,
-            'name': pdf_manager["manager_name"],
-            'phone': pdf_manager["manager_phone"],
-            'email': pdf_manager["manager_email"],
-            'applicantDetails': pdf_applicant["pdf_applicant_contents"],
-            'applicantCompanyName': pdf_applicant["applicant"],
-            'applicantContractorName': pdf_applicant["contractor"],
-            'pdf_location': pdf_location, 
-            'pdf_longitude': lon,
-            'pdf_latitude': lat,
-            'pdf_county': county,
-            'pdf_parish': parish,
-            'pdf_city': city,
-            'pdf_character': pdf_character, 
-            'pdf_mitigation': pdf_mitigation,
-            'hydrologicUnitCode': hydrologic_unit_code, 
-            'pdf_wqc': wqc,
-            'pdf_cup': cup,
-            'pdf_impact': impact_output,
-            'pdf_full_text': pdf_text,
-            'pdf_trimmed': pdf_trimmed,
-             'pdf_text_flag': pdf_text_flag}  
-
-
-    
-def pdf_to_aws(aws_client, web_url, pdf_url, notice_id):
-    
-    # Download PDFs
+        threading.Thread(target = feed, daemon = True).start()
+        
+        ended = False
+        while True:
+            
+            # Hand a notice to each idle worker
+            for worker in self.workers:
+                while worker["key"] is None and not ended:
+                    busy = any(w["key"] is not None for w in self.workers)
+                    try:
+                        # Without busy workers there is nothing else to do than wait for the next task
+                        task = task_queue.get(block = not busy)
+                    except queue.Empty:
+                        break
+                    if task is end:
+                        ended = True
+                    elif isinstance(task[1], dict):
+                        yield task
+                    else:
+                        key, (pdf_url, web_text, web_title) = task
+                        worker["conn"].send((key, (pdf_url, web_text, web_title, self.tesseract_path)))
+                        worker.update(key = key, pdf_url = pdf_url, started = time.monotonic())
+            
+            busy = [worker for worker in self.workers if worker["key"] is not None]
+            if len(busy) == 0:
+                if ended:
+                    if len(feed_errors) > 0:
+                        raise feed_errors[0]
+                    return
+                continue
+            
+            # Wait for a result, the next time limit, or (while tasks may come) a short poll for new tasks
+            wait = None if ended else 0.2
+            if self.timeout is not None:
+                deadline = min(worker["started"] for worker in busy) + self.timeout
+                wait = max(0, deadline - time.monotonic()) if wait is None else min(wait, max(0, deadline - time.monotonic()))
+            ready = multiprocessing.connection.wait([worker["conn"] for worker in busy], wait)
+            
+            for worker in busy:
+                key = worker["key"]
+                if worker["conn"] in ready:
+                    try:
+                        key, pdf_fields = worker["conn"].recv()
+                    except (EOFError, OSError):
+                        # The worker process died (e.g. a crash in a PDF library)
+                        print(f"PDF extraction worker exited: {worker['pdf_url']}")
+                        self._replace_worker(worker)
+                        pdf_fields = pdf_extraction_error("ERROR: PDF extraction failed; worker process exited")
+                elif self.timeout is not None and time.monotonic() - worker["started"] >= self.timeout:
+                    print(f"PDF extraction timed out: {worker['pdf_url']}")
+                    self._replace_worker(worker)
+                    pdf_fields = pdf_extraction_error(f"ERROR: PDF extraction timed out; took more than {self.timeout} seconds")
+                else:
+                    continue
+                worker.update(key = None, pdf_url = None, started = None)
+                yield key, pdf_fields
+    
+    def close(self):
+        for worker in self.workers:
+            try:
+                worker["conn"].send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker["process"].join(timeout = 5)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+            worker["conn"].close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+
+def pdf_extraction_many(notices, tesseract_path=None, workers=1, timeout=None):
+    """
+    Run pdf_extraction for many notices.
+    
+    notices: a list of (pdf_url, web_text, web_title)
+    workers: number of processes; 1 without timeout runs the notices one by one in this process
+    timeout: seconds allowed per notice; None for no limit (a time limit needs a worker process, which can be terminated)
+    
+    The results are returned in the same order as notices.
+    """
+    
+    if (workers <= 1 and timeout is None) or len(notices) == 0:
+        return [pdf_extraction(pdf_url, web_text, web_title, tesseract_path) for pdf_url, web_text, web_title in notices]
+    
+    pdf_list = [None] * len(notices)
+    with PdfExtractionPool(min(workers, len(notices)), tesseract_path, timeout) as pool:
+        for position, pdf_fields in pool.imap_unordered(enumerate(notices)):
+            pdf_list[position] = pdf_fields
+    
+    return pdf_list
+
+
+
+    
+def pdf_to_aws(bucket, web_url, pdf_url, notice_id, limiter = None, attachment_url = None, lookup_attachment = True):
+    """
+    Archive the PDF of a notice (with the attachment for Galveston) to full-pdf/<noticeID>.pdf.
+    limiter: optional http_client.TokenBucket shared by the parallel archival workers
+    attachment_url: for Galveston, the attachment link captured by web_extraction (None: the webpage has none)
+    lookup_attachment: for Galveston, look the attachment link up on the webpage instead (notices scraped before it was captured)
+    """
+    
+    return archive_pdf(bucket, web_url, pdf_url, notice_id, limiter, attachment_url, lookup_attachment)[0]
+
+
+
+
+def _file_md5(f):
+    """
+    MD5 of a file object, read in chunks from the start
+    """
+    
+    f.seek(0)
+    md5 = hashlib.md5()
+    for chunk in iter(lambda: f.read(1024 ** 2), b""):
+        md5.update(chunk)
+    f.seek(0)
+    return md5.hexdigest()
+
+
+
+
+def merge_pdfs(paths, spill_size = 8 * 1024 ** 2):
+    """
+    Concatenate PDF files into a temp file object (kept in memory up to spill_size bytes, then spilled to disk).
+    The PDFs are read from their files by the merger rather than copied into memory first.
+    """
+    
+    merger = pdf.PdfMerger()
+    merged = tempfile.SpooledTemporaryFile(max_size = spill_size)
     try:
-        pdf_bytes = requests.get(pdf_url).content
+        for path in paths:
+            merger.append(path)
+        merger.write(merged)
     except:
-        pdf_bytes = "ERROR"
-        print(pdf_url)
-        
+        merged.close()
+        raise
+    finally:
+        merger.close()
+    merged.seek(0)
+    return merged
+
+
+
+
+def archive_pdf(bucket, web_url, pdf_url, notice_id, limiter = None, attachment_url = None, lookup_attachment = True):
+    """
+    pdf_to_aws, also returning a report: {"status": "uploaded" / "unchanged" / "error", "bytes", "seconds"}.
+    The upload is skipped when the archived object already has the same content (MD5 = ETag of a single-part upload).
+    """
+    
+    started = time.monotonic()
+    if limiter is not None:
+        limiter.acquire()
+    
     # Identify the district
     district = pdf_url[12:15]
     
-    # For Galveston where attachment PDF has a separate link
-    if district == "swg":
-        
-        ## 1. Extract the attachment link
+    # For Galveston where attachment PDF has a separate link: captured by web_extraction,
+    # looked up on the webpage only for notices scraped before it was
+    if district == "swg" and lookup_attachment:
         try:
-            req = requests.get(web_url)
-            content = req.text
-            soup = BeautifulSoup(content, 'html.parser')
-            attachment_end = soup.find("div", {"itemprop":"articleBody"}).p.find_all("a")[1].get("href")
+            soup = BeautifulSoup(http_client.get(web_url).text, 'html.parser')
+            attachment_url = scrape_rss_webpage.get_web_attachment_url(soup, web_url)
         except:
-            attachment_end = "ERROR"
-            print(web_url)
-
-        if "ERROR" not in attachment_end:
-            attachment_url = web_url[:30] + attachment_end
-        else:
             attachment_url = "ERROR"
-
-        ## 2. Merge main text PDF with attachment PDF
-        if "ERROR" not in attachment_url:
-            try:
-                attachment_bytes = requests.get(attachment_url).content
-            except:
-                attachment_bytes = "ERROR"
-                print(web_url)
-        else:
-            attachment_bytes = "ERROR"
-
-        if pdf_bytes != "ERROR" and attachment_bytes != "ERROR":
-            try:
-                merged_pdf = pdf.PdfMerger()
-                merged_pdf.append(io.BytesIO(pdf_bytes))
-                merged_pdf.append(io.BytesIO(attachment_bytes))
-                merged_bytes = io.BytesIO()
-                merged_pdf.write(merged_bytes)
-                merged_bytes.seek(0)
-                pdf_bytes = merged_bytes.read()
-            except:
-                pdf_bytes = "ERROR"
-                print(web_url)
-        else:
-            pdf_bytes = "ERROR"
-
+            print(web_url)
+    
+    # Without an attachment link ("unknown" once the tables are preprocessed, or a failed lookup) the notice PDF is archived alone
+    if not (isinstance(attachment_url, str) and attachment_url.startswith("http")):
+        attachment_url = None
+    
+    # Local paths of the PDFs in the PDF store (the notice PDF was downloaded when the notice was scraped);
+    # the Galveston attachment is downloaded at the same time
+    urls = [pdf_url, attachment_url] if district == "swg" and attachment_url is not None else [pdf_url]
+    
+    def get_path(url):
+        try:
+            return pdf_store.get_pdf_path(url) if isinstance(url, str) and "ERROR" not in url else "ERROR"
+        except:
+            print(url)
+            return "ERROR"
+    
+    with ThreadPoolExecutor(max_workers = len(urls)) as pool:
+        paths = list(pool.map(get_path, urls))
+    
+    # Open the PDF (for Galveston: main text PDF merged with the attachment PDF)
+    pdf_file = None
+    if "ERROR" not in paths:
+        try:
+            pdf_file = merge_pdfs(paths) if len(paths) > 1 else open(paths[0], "rb")
+        except:
+            print(web_url)
+    
     # Set up the id and key
     # aws_client = boto3.client(
     #     's3',
     #     aws_access_key_id = aws_access_key_id,
     #     aws_secret_access_key = aws_secret_access_key)
     
-    if pdf_bytes != "ERROR":
-        aws_client.put_object(
-            Body = pdf_bytes, 
-            Bucket = "usace-notices", 
-            Key = "full-pdf/" + notice_id + '.pdf', 
-            ACL = "public-read")
+    status = "error"
+    size = 0
+    if pdf_file is not None:
+        with pdf_file:
+            # Skip the upload when the same PDF is archived already
+            archived = bucket.head("full-pdf/" + notice_id + '.pdf')
+            
+            if archived is not None and archived["etag"].strip('"') == _file_md5(pdf_file):
+                status = "unchanged"
+            else:
+                pdf_file.seek(0, io.SEEK_END)
+                size = pdf_file.tell()
+                pdf_file.seek(0)
+                bucket.put("full-pdf/" + notice_id + '.pdf', pdf_file, content_type = "application/pdf")
+                status = "uploaded"
         
-    aws_link = "https://usace-notices.s3.amazonaws.com/full-pdf/" + notice_id + ".pdf"
+    aws_link = bucket.public_url("full-pdf/" + notice_id + ".pdf")
     
-    time.sleep(1)
+    report = {"status": status,
+              "bytes": size,
+              "seconds": time.monotonic() - started}
     
     return {"noticeID": notice_id,
-            "awsLink": aws_link}
+            "awsLink": aws_link}, report
+
+
+
+
+def pdf_to_aws_many(bucket, notices, workers = 8, rate = 10):
+    """
+    Run pdf_to_aws for many notices in parallel threads.
+    
+    notices: a list of (web_url, pdf_url, notice_id), or (web_url, pdf_url, notice_id, attachment_url) when the
+             Galveston attachment links were captured by web_extraction (None, NaN or "unknown": no attachment link)
+    workers: number of notices archived at the same time
+    rate: notices started per second across all workers (token bucket)
+    
+    Returns the pdf_to_aws records in the same order as notices, and a summary report
+    (uploaded / unchanged / error counts, bytes uploaded, latency per notice).
+    """
+    
+    limiter = http_client.TokenBucket(rate, burst = max(1, workers))
+    
+    def archive(notice):
+        web_url, pdf_url, notice_id = notice[:3]
+        lookup_attachment = len(notice) <= 3
+        attachment_url = None if lookup_attachment or pd.isnull(notice[3]) else notice[3]
+        try:
+            return archive_pdf(bucket, web_url, pdf_url, notice_id, limiter, attachment_url, lookup_attachment)
+        except Exception as e:
+            print(f"PDF archival failed for {notice_id}: {e}")
+            return ({"noticeID": notice_id,
+                     "awsLink": bucket.public_url("full-pdf/" + notice_id + ".pdf")},
+                    {"status": "error", "bytes": 0, "seconds": 0})
+    
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers = max(1, workers)) as pool:
+        results = list(pool.map(archive, notices))
+    
+    records = [record for record, _ in results]
+    reports = [report for _, report in results]
+    latencies = sorted(report["seconds"] for report in reports)
+    
+    summary = {"uploaded": sum(report["status"] == "uploaded" for report in reports),
+               "unchanged": sum(report["status"] == "unchanged" for report in reports),
+               "error": sum(report["status"] == "error" for report in reports),
+               "bytes": sum(report["bytes"] for report in reports),
+               "seconds": time.monotonic() - started,
+               "latency_mean": sum(latencies) / len(latencies) if len(latencies) > 0 else 0,
+               "latency_max": latencies[-1] if len(latencies) > 0 else 0}
+    
+    print(f"PDF archival: {summary['uploaded']} uploaded, {summary['unchanged']} unchanged, {summary['error']} errors, "
+          f"{summary['bytes'] / 1024 ** 2:.1f} MB in {summary['seconds']:.1f} s "
+          f"(latency per notice: mean {summary['latency_mean']:.2f} s, max {summary['latency_max']:.2f} s)")
+    
+    return records, summary
 
     # Extract images in the attachment
         # pdf_reader = pdf.PdfReader(io.BytesIO(pdf_bytes))
@@ -1608,14 +2101,6 @@ def pdf_extraction_test(pdf_url, pdf_text, web_text, web_title, tesseract_path=N
         except:
              # The pdf url for Jacksonville is unique: do not contain district abbreviation
             district = "saj"
-
-        district_dic = {"MVN": "New Orleans District",
-                   "SWG": "Galveston District",
-                   "SAM": "Mobile District",
-                   "SAJ": "Jacksonville District"}
-
-        pdf_dist_code = district.upper()
-        pdf_dist_name = district_dic[pdf_dist_code]
         
         # Pull the PDF texts
         # pdf_text = pdf_read(pdf_url, district)
@@ -1646,124 +2131,11 @@ def pdf_extraction_test(pdf_url, pdf_text, web_text, web_title, tesseract_path=N
         if isinstance(pdf_text, str) == False:
             pdf_text = "ERROR: Replaced with webpage text but no texts in the webpage body"
             pdf_text_flag = "Replaced with webpage text but no texts in the webpage body"
-
-        # If the PDf url is valid and readable
-        if "ERROR" not in pdf_text: 
-
-            pdf_trimmed = trim_pdf(pdf_text, district)
-
-            comment_window = get_comment_window(pdf_text, district)
-
-            pdf_app_num = get_pdf_app_num(pdf_text, district)
-
-            pdf_manager = get_pdf_manager(pdf_text, district)
-
-            pdf_applicant = get_pdf_applicant(pdf_text, district)
-
-            pdf_location = get_pdf_location(pdf_text, district)
-
-            pdf_character = get_pdf_character(pdf_text, district)
-
-            pdf_mitigation = get_pdf_mitigation(pdf_text, district)
-
-            wqc = get_wqc(pdf_text)
-
-            cup = get_coastal_use_permit(pdf_text)
-
-            if pdf_location == "unknown":
-                hydrologic_unit_code = county = city = parish = "unknown"
-            elif "ERROR" in pdf_location:
-                hydrologic_unit_code = county = city = parish = "ERROR: cannot extract location of work" + pdf_location
-            else:
-                hydrologic_unit_code = get_pdf_hydrologic(pdf_location)
-                county = get_pdf_city_county_parish(pdf_location)[0]
-                parish = get_pdf_city_county_parish(pdf_location)[1]
-                city = get_pdf_city_county_parish(pdf_location)[2]
-
-            lon = get_lon_lat(pdf_text)["lon"]
-            lat = get_lon_lat(pdf_text)["lat"]
-
-            if pdf_character == "unknown":
-                impact_output = "unknown"
-            elif "ERROR" in pdf_character:
-                impact_output = "ERROR: cannot extract character of work " + pdf_character
-            else:
-                impact_output = get_pdf_impact(pdf_character)
-
-            # Special public notice
-            if len(re.findall(r'[Ss][Pp][Ee][Cc][Ii][Aa][Ll][Pp][Uu][Bb][Ll][Ii][Cc][Nn][Oo][Tt][Ii][Cc][Ee]|G[Ee][Nn][Ee][Rr][Aa][Ll][Pp][Ee][Rr][Mm][Ii][Tt]', pdf_text.replace(" ", ""))) != 0:
-                special = 1
-                if "ERROR" in pdf_app_num:
-                    pdf_app_num = "unknown"
-            else:
-                if all("ERROR" in item or item == "unknown" for item in [pdf_applicant["pdf_applicant_contents"], pdf_location, pdf_character]):
-                    special = 1
-                    if "ERROR" in pdf_app_num:
-                        pdf_app_num = "unknown"
-                else:
-                    special = 0
-     
-        # PDF reader problem
-        else:
-            special = "ERROR: no pdf or webpage text found"
-            pdf_app_num = pdf_dist_code = pdf_dist_name = "ERROR: no pdf or webpage text found"
-            pdf_manager = {"manager_name":"ERROR: no pdf or webpage text found",
-                           "manager_phone":"ERROR: no pdf or webpage text found",
-                           "manager_email": "ERROR: no pdf or webpage text found"}
-            pdf_applicant = {"pdf_applicant_contents":"ERROR: no pdf or webpage text found",
-                             "applicant":"ERROR: no pdf or webpage text found",
-                             "contractor": "ERROR: no pdf or webpage text found"}
-            comment_window = pdf_location = pdf_character = pdf_mitigation = county = parish = city = hydrologic_unit_code = lon = lat = wqc = cup = "ERROR: no pdf or webpage text found"
-            impact_output = "ERROR: no pdf or webpage text found"
-            pdf_text = pdf_text
-            pdf_trimmed = "ERROR: no pdf or webpage text found"
     
     # Do not have pdf url
     else:
-        special = 1
-        pdf_app_num = pdf_dist_code = pdf_dist_name = "unknown"
-        pdf_manager = {"manager_name":"unknown",
-                       "manager_phone":"unknown",
-                       "manager_email": "unknown"}
-        pdf_applicant = {"pdf_applicant_contents":"unknown",
-                         "applicant":"unknown",
-                         "contractor": "unknown"}
-        comment_window = pdf_location = pdf_character = pdf_mitigation = county = parish = city = hydrologic_unit_code = lon = lat = wqc = cup = "unknown"
-        impact_output = "unknown"
+        district = None
         pdf_text = "unknown"
-        pdf_trimmed = "unknown"
         pdf_text_flag = "PDF url is unknown"
         
-    # if applicantion permit number is error, pull from webpage title:
-    if "ERROR" in pdf_app_num or pdf_app_num == "unknown":
-        try:
-            pdf_app_num = re.search(r'[A-Z]{3}[-\s]?\d{4}[-\s]?\d{4,5}[-\s]?\d?[-\s]?[A-Z]{0,3}[\(A-Z\-]*\)?', web_title).group()
-        except:
-            pdf_app_num = "ERROR: cannot pull from webpage title"
-
-    return {'specialFlag': special,
-            'pdf_comment_window': comment_window,                           
-            'usacePermitNumber': pdf_app_num,
-            'pdf_districtCode':  pdf_dist_code,
-            'pdf_districtName': pdf_dist_name,
-            'name': pdf_manager["manager_name"],
-            'phone': pdf_manager["manager_phone"],
-            'email': pdf_manager["manager_email"],
-            'applicantDetails': pdf_applicant["pdf_applicant_contents"],
-            'applicantCompanyName': pdf_applicant["applicant"],
-            'applicantContractorName': pdf_applicant["contractor"],
-            'pdf_location': pdf_location, 
-            'pdf_longitude': lon,
-            'pdf_latitude': lat,
-            'pdf_county': county,
-            'pdf_parish': parish,
-            'pdf_city': city,
-            'pdf_character': pdf_character, 
-            'pdf_mitigation': pdf_mitigation,
-            'hydrologicUnitCode': hydrologic_unit_code, 
-            'pdf_wqc': wqc,
-            'pdf_cup': cup,
-            'pdf_impact': impact_output,
-            'pdf_full_text': pdf_text,
-            'pdf_trimmed': pdf_trimmed,
-             'pdf_text_flag': pdf_text_flag}  
\ No newline at end of file
+    return pdf_extraction_output(pdf_url, pdf_text, pdf_text_flag, district, web_title)
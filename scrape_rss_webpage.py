@@ -1,23 +1,40 @@
 import pandas as pd
 import numpy as np
 import feedparser
-import requests
+import http_client
+import extractors
 from bs4 import BeautifulSoup
 import re
-from datetime import datetime
+import os
+import io
+import json
+import hashlib
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from xml.etree import ElementTree
 
 
 
 
 # FIRST-TIME scraping: scrape the webpage links for all the released notices from each district' public notice website
 
-def get_item(soup, item_i):
+dist_website = {"Galveston": "https://www.swg.usace.army.mil/Media/Public-Notices/",
+                "New Orleans":"https://www.mvn.usace.army.mil/Missions/Regulatory/Public-Notices/",
+                "Jacksonville":"https://www.saj.usace.army.mil/Missions/Regulatory/Public-Notices/",
+                "Mobile":"https://www.sam.usace.army.mil/Missions/Regulatory/Public-Notices/"}
+
+
+
+
+def parse_item(item):
     """
-    Extract each items in each page of district website
+    Extract the fields in the box of one notice on the district website; 
+    the PDF url end is None when the box has no PDF link
     """
     
-    # Get the info in the box for each notice
-    item = soup.find_all("div", class_="desc")[item_i]
     web_url = item.find("a", class_="title").get("href")
     web_url = web_url[:4] + "s" + web_url[4:]
     web_title = item.find("a", class_="title").get_text()
@@ -26,32 +43,65 @@ def get_item(soup, item_i):
         expire_date = item.find("p", class_="standout").get_text().replace("Expiration date: ", "")
     except Exception as e:
         expire_date = None
-        #print(page_p, item_i, str(e))
         
-    # Get the notice PDF url
+    # directly pull from each box on the main website
     try:
-        # directly pull from each box on the main website
         pdf_end = item.find("div", class_="attachment").a.get("href")
     except:
+        pdf_end = None
+        
+    return [web_url, web_title, publish_date, expire_date, pdf_end]
+
+
+
+
+def get_item_pdf_end(content):
+    """
+    For notices without a PDF url on the main website, pull the PDF url end from the notice webpage
+    """
+    
+    soup = BeautifulSoup(content, 'html.parser')
+    try:
+        web_href = soup.find("div", {"itemprop":"articleBody"}).find_all("a", href=True)
+        pdf_end = [a.get("href") for a in web_href if "pdf" in a.get("href").lower()][0]
+    except:
+        pdf_end = "ERROR: cannot pull pdf url"
+    return pdf_end
+
+
+
+
+def get_item_pdf_url(web_url, pdf_end):
+    """
+    Build the full PDF url from the PDF url end
+    """
+    
+    if any(word in pdf_end for word in ["ERROR", "http"]):
+        pdf_url = pdf_end
+    else:
+        pdf_url = web_url[:30]  + pdf_end
+    return pdf_url
+
+
+
+
+def get_item(soup, item_i):
+    """
+    Extract each items in each page of district website
+    """
+    
+    # Get the info in the box for each notice
+    web_url, web_title, publish_date, expire_date, pdf_end = parse_item(soup.find_all("div", class_="desc")[item_i])
+        
+    # Get the notice PDF url
+    if pdf_end is None:
         try:
             # for those do not have pdf url in the main website, pull from each webpage of notice
-            req = requests.get(web_url)
-            content = req.text
-            soup = BeautifulSoup(content, 'html.parser')
-            try:
-                web_href = soup.find("div", {"itemprop":"articleBody"}).find_all("a", href=True)
-                pdf_end = [a.get("href") for a in web_href if "pdf" in a.get("href").lower()][0]
-            except:
-                pdf_end = "ERROR: cannot pull pdf url"
+            pdf_end = get_item_pdf_end(http_client.get(web_url).text)
         except:
             pdf_end = "ERROR: cannot read web url"
-    finally:
-        if any(word in pdf_end for word in ["ERROR", "http"]):
-            pdf_url = pdf_end
-        else:
-            pdf_url = web_url[:30]  + pdf_end
         
-    return [web_url, web_title, publish_date, expire_date, pdf_url]
+    return [web_url, web_title, publish_date, expire_date, get_item_pdf_url(web_url, pdf_end)]
 
     
 
@@ -61,7 +111,7 @@ def get_page(url, page_p):
     Scrape the main public notice website by page
     """
     main_url = url + "?page=" + str(page_p)
-    content = requests.get(main_url).text
+    content = http_client.get(main_url).text
     soup = BeautifulSoup(content, 'html.parser')
     item_num = len(soup.find_all("div", class_="desc"))
     
@@ -70,92 +120,230 @@ def get_page(url, page_p):
                                  columns = ["usaceWebUrl", "web_title", "datePublished", "dateExpiry", "PdfUrl"])
     return web_singlepage_df  
 
-    
 
+
+
+async def crawl_weblist(dist_weblinks, rate_limit = 5, max_concurrency = 8):
+    """
+    Crawl the listing pages of several district websites concurrently.
     
-def get_weblist(district = "all"):
+    rate_limit: requests per second across all districts
+    max_concurrency: requests in flight at the same time
     """
-    Scrape the list of public notice webpages for one district USACE website.
+    
+    limiter = http_client.TokenBucket(rate_limit)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def fetch_text(url):
+        async with semaphore:
+            await limiter.acquire_async()
+            response = await asyncio.to_thread(http_client.get, url)
+            return response.text
+    
+    # Check how many pages there are in each district website; the first page is also page 1 of the listing
+    first_pages = await asyncio.gather(*[fetch_text(dist_weblink) for dist_weblink in dist_weblinks])
+    page_nums = [int(BeautifulSoup(content, 'html.parser').find_all("a", class_="page-link")[-1].string) for content in first_pages]
+    
+    # Get all the other pages of all districts at the same time
+    page_urls = [dist_weblink + "?page=" + str(p) for dist_weblink, page_num in zip(dist_weblinks, page_nums) for p in range(2, page_num + 1)]
+    other_pages = iter(await asyncio.gather(*[fetch_text(page_url) for page_url in page_urls]))
+    
+    # Keep the order of districts and pages
+    allpage_contents = []
+    for first_page, page_num in zip(first_pages, page_nums):
+        allpage_contents.append(first_page)
+        allpage_contents += [next(other_pages) for p in range(2, page_num + 1)]
+    
+    items = [parse_item(item) for content in allpage_contents 
+             for item in BeautifulSoup(content, 'html.parser').find_all("div", class_="desc")]
+    
+    # For those do not have pdf url in the main website, pull from each webpage of notice at the same time
+    async def resolve_pdf_end(web_url):
+        try:
+            return get_item_pdf_end(await fetch_text(web_url))
+        except:
+            return "ERROR: cannot read web url"
+    
+    missing = [i for i, item in enumerate(items) if item[4] is None]
+    pdf_ends = await asyncio.gather(*[resolve_pdf_end(items[i][0]) for i in missing])
+    for i, pdf_end in zip(missing, pdf_ends):
+        items[i][4] = pdf_end
+    
+    items = [item[:4] + [get_item_pdf_url(item[0], item[4])] for item in items]
+    
+    return pd.DataFrame(items, columns = ["usaceWebUrl", "web_title", "datePublished", "dateExpiry", "PdfUrl"])
+
+    
+
+    
+def get_weblist(district = "all", rate_limit = 5, max_concurrency = 8):
     """
+    Scrape the list of public notice webpages for one district USACE website, or all of them.
     
-    dist_website = {"Galveston": "https://www.swg.usace.army.mil/Media/Public-Notices/",
-                "New Orleans":"https://www.mvn.usace.army.mil/Missions/Regulatory/Public-Notices/",
-                "Jacksonville":"https://www.saj.usace.army.mil/Missions/Regulatory/Public-Notices/",
-                "Mobile":"https://www.sam.usace.army.mil/Missions/Regulatory/Public-Notices/"}
+    rate_limit: requests per second across all districts; default as 5
+    max_concurrency: requests in flight at the same time; default as 8
+    """
     
     if district != "all":
-        # Check how many pages there are in the website
-        check_content = requests.get(dist_website[district]).text
-        check_soup = BeautifulSoup(check_content, 'html.parser')
-        page_num = int(check_soup.find_all("a", class_="page-link")[-1].string)
+        dist_weblinks = [dist_website[district]]
+    else:
+        dist_weblinks = list(dist_website.values())
+
+    web_df = asyncio.run(crawl_weblist(dist_weblinks, rate_limit, max_concurrency))
+
+    return web_df
+
+
+
+# UPDATE: extract the webpage link for each notice in the past n days
+
+dist_rss = {"Galveston": "https://www.swg.usace.army.mil/DesktopModules/ArticleCS/RSS.ashx?ContentType=4&Site=437&isdashboardselected=0&max=500",
+            "New Orleans":"https://www.mvn.usace.army.mil/DesktopModules/ArticleCS/RSS.ashx?ContentType=4&Site=417&isdashboardselected=0&max=500",
+            "Jacksonville":"https://www.saj.usace.army.mil/DesktopModules/ArticleCS/RSS.ashx?ContentType=4&Site=435&isdashboardselected=0&max=500",
+            "Mobile":"https://www.sam.usace.army.mil/DesktopModules/ArticleCS/RSS.ashx?ContentType=4&Site=460&isdashboardselected=0&max=500"}
+
+
+
+
+def fetch_feed(rss_url, feed_state, cache_dir):
+    """
+    Download one RSS feed with a conditional GET.
+    
+    feed_state: the ETag/Last-Modified validators saved for this feed by the last run, or None
+    
+    Returns the feed body and the new state; an unchanged feed (304) is read from the local copy.
+    """
+    
+    body_path = os.path.join(cache_dir, hashlib.sha1(rss_url.encode("utf-8")).hexdigest() + ".xml")
+    
+    headers = {}
+    if feed_state is not None and os.path.exists(body_path):
+        if feed_state.get("etag"):
+            headers["If-None-Match"] = feed_state["etag"]
+        if feed_state.get("last_modified"):
+            headers["If-Modified-Since"] = feed_state["last_modified"]
+    
+    response = http_client.get(rss_url, headers = headers)
+    
+    if response.status_code == 304:
+        with open(body_path, "rb") as f:
+            return f.read(), feed_state
+    
+    response.raise_for_status()
+    body = response.content
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(body_path, "wb") as f:
+        f.write(body)
+    
+    return body, {"etag": response.headers.get("ETag"),
+                  "last_modified": response.headers.get("Last-Modified")}
+
+
+
+
+def parse_pubdate(pubdate):
+    """
+    Parse an RSS date such as "Tue, 02 Jan 2024 15:00:00 GMT"; dates without time zone are taken as UTC
+    """
+    
+    published = parsedate_to_datetime(pubdate)
+    if published.tzinfo is None:
+        published = published.replace(tzinfo = timezone.utc)
+    return published
+
+
 
-        # Get a list of public notice pages of all pages
-        allpage_list = [get_page(dist_website[district], p) for p in range(1, page_num + 1)]
 
-        # Convert the list to a dataframe
-        web_df = pd.concat(allpage_list, axis = 0, ignore_index = True)
+def iter_feed_entries(body, cutoff):
+    """
+    Stream the items of an RSS feed (newest first) and stop at the first item published before the cutoff
+    """
+    
+    for event, elem in ElementTree.iterparse(io.BytesIO(body), events = ("end",)):
+        if elem.tag != "item":
+            continue
         
-    else:
-        allpage_alldist_list = []
+        published = parse_pubdate(elem.findtext("pubDate"))
+        if published < cutoff:
+            break
         
-        for dist_weblink in list(dist_website.values()):
-            
-            # Check how many pages there are in the website
-            check_content = requests.get(dist_weblink).text
-            check_soup = BeautifulSoup(check_content, 'html.parser')
-            page_num = int(check_soup.find_all("a", class_="page-link")[-1].string)
+        yield {"web_title": (elem.findtext("title") or "").strip(), 
+               "usaceWebUrl": (elem.findtext("link") or "").strip(),
+               "rssPubDate": published.astimezone(timezone.utc)}
+        
+        # Free the parsed item
+        elem.clear()
 
-            # Get a list of public notice pages of all pages
-            allpage_list = [get_page(dist_weblink, p) for p in range(1, page_num + 1)]
-            
-            allpage_alldist_list += allpage_list
 
-        # Convert the list to a dataframe
-        web_df = pd.concat(allpage_alldist_list, axis = 0, ignore_index = True)
 
-    return web_df
 
+def parse_feed(body, cutoff):
+    """
+    Get the items published after the cutoff from an RSS feed body
+    """
+    
+    try:
+        return list(iter_feed_entries(body, cutoff))
+    except (ElementTree.ParseError, TypeError, ValueError):
+        # Malformed feed (or an item without a valid pubDate): fall back to feedparser, which is lenient, and filter all entries;
+        # entries without a valid publication date are skipped
+        entries = []
+        for entry in feedparser.parse(body).entries:
+            try:
+                published = parse_pubdate(entry.get("published"))
+            except (TypeError, ValueError):
+                print(f"RSS item without a valid publication date skipped: {entry.get('link')}")
+                continue
+            if published >= cutoff:
+                entries.append({"web_title": entry.get("title", ""), "usaceWebUrl": entry.get("link", ""),
+                                "rssPubDate": published.astimezone(timezone.utc)})
+        return entries
 
 
-# UPDATE: extract the webpage link for each notice in the past n days
 
-def update_weblist_from_rss(district, n_days):
+
+def update_weblist_from_rss(district, n_days, cache_dir = "rss_cache/"):
     """
     Scrape the RSS feeder for new notice webpage links and titles
 
     dist_rss: District for which to scrape RSS feed
 
     n_days = No. of days in the past (from current day to count)
+    
+    cache_dir: where the last feed bodies and their ETag/Last-Modified validators are kept between runs
 
     """
-
-    dist_rss = {"Galveston": "https://www.swg.usace.army.mil/DesktopModules/ArticleCS/RSS.ashx?ContentType=4&Site=437&isdashboardselected=0&max=500",
-                "New Orleans":"https://www.mvn.usace.army.mil/DesktopModules/ArticleCS/RSS.ashx?ContentType=4&Site=417&isdashboardselected=0&max=500",
-                "Jacksonville":"https://www.saj.usace.army.mil/DesktopModules/ArticleCS/RSS.ashx?ContentType=4&Site=435&isdashboardselected=0&max=500",
-                "Mobile":"https://www.sam.usace.army.mil/DesktopModules/ArticleCS/RSS.ashx?ContentType=4&Site=460&isdashboardselected=0&max=500"}
     
     if district != "all":
-        # Parse the RSS feed to a dataframe
-        rss_parsed = feedparser.parse(dist_rss[district])
-        rss_df = pd.DataFrame(rss_parsed.entries)
-        
+        rss_urls = [dist_rss[district]]
     else:
-        rss_df_list = [pd.DataFrame(feedparser.parse(dist_rss_url).entries) for dist_rss_url in list(dist_rss.values())]
-        rss_df = pd.concat(rss_df_list, ignore_index=True)
-
-    # Clean the df to include information needed only
-    rss_df = rss_df[["title", "link", "published"]].rename(
-        columns = {"title": "web_title", "link": "usaceWebUrl"}, 
-        copy = False)
-
-    # Filter rss to the most recent month:
-    rss_df['published'] = pd.to_datetime(rss_df['published'], format = "%a, %d %b %Y %H:%M:%S %Z")
-    last_n_days = pd.Timestamp.now(tz = rss_df['published'].dt.tz) - pd.DateOffset(days=n_days)
-    rss_df = rss_df[rss_df["published"] >= last_n_days]
-
-    # change the formatting of date time so we can include those later than the last date in redivis
-    # rss_df['published'] = rss_df['published'].dt.strftime("%Y-%m-%d")
-    rss_df = rss_df.drop(["published"], axis = 1)
+        rss_urls = list(dist_rss.values())
+    
+    # Validators saved by the last run
+    state_path = os.path.join(cache_dir, "rss_state.json")
+    try:
+        with open(state_path, "r") as f:
+            rss_state = json.load(f)
+    except (OSError, ValueError):
+        rss_state = {}
+    
+    # Download the feeds at the same time; an unchanged feed costs one 304
+    with ThreadPoolExecutor(max_workers = len(rss_urls)) as executor:
+        feeds = list(executor.map(lambda rss_url: fetch_feed(rss_url, rss_state.get(rss_url), cache_dir), rss_urls))
+    
+    # Filter rss to the most recent n days
+    last_n_days = datetime.now(timezone.utc) - timedelta(days = n_days)
+    rss_entries = [entry for body, feed_state in feeds for entry in parse_feed(body, last_n_days)]
+    # rssPubDate: the publication date of the feed item, to take the newest notices across the district feeds
+    rss_df = pd.DataFrame(rss_entries, columns = ["web_title", "usaceWebUrl", "rssPubDate"])
+    
+    # Save the validators for the next run
+    for rss_url, (body, feed_state) in zip(rss_urls, feeds):
+        rss_state[rss_url] = feed_state
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(state_path, "w") as f:
+        json.dump(rss_state, f)
     
     return rss_df    
 
@@ -221,6 +409,23 @@ def get_web_pdf_url(soup, web_url):
     
     
     
+def get_web_attachment_url(soup, web_url):
+    """
+    Get the url of the attachment pdf (drawings), which Galveston notices link separately from the notice pdf
+    """
+    
+    try:
+        attachment_end = soup.find("div", {"itemprop":"articleBody"}).p.find_all("a")[1].get("href")
+    except Exception as e:
+        return "ERROR: " + str(e)
+    
+    if "http" in attachment_end:
+        return attachment_end
+    return web_url[:30] + attachment_end
+
+    
+    
+    
 def get_web_text(soup):
     """
     Get all web texts
@@ -240,74 +445,133 @@ def get_web_text(soup):
         return web_text
 
     
-    
-    
+# Regex patterns of the webpage field extractors (see extractors.py), compiled once per district on first use
+
+extractors.add_patterns("web", {
+    "applicant_marker": extractors.Marker(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', "applicant"),
+    "applicant_contents": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))',
+    "location_marker": extractors.Marker(r'L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]', "location"),
+    "mitigation_marker": extractors.Marker(r'(A\s?V\s?O\s?I\s?D\s?A\s?N\s?C\s?E\s?(&|A\s?N\s?D)\s?M\s?I\s?N\s?I\s?M\s?I\s?Z\s?A\s?T\s?I\s?O\s?N|C?\s?O?\s?M?\s?P?\s?E?\s?N?\s?S?\s?A?\s?T?\s?O?\s?R?\s?Y?\s?M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N)',
+                                          "minimization", "mitigation"),
+    "avoidance_minimization": r'M\s?[Ii]\s?[Nn]\s?[Ii]\s?[Mm]\s?[Ii]\s?[Zz]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?[Ii]?\s?[Nn]?\s?[Ff]?\s?[Oo]?\s?[Rr]?\s?[Mm]?\s?[Aa]?\s?[Tt]?\s?[Ii]?\s?[Oo]?\s?[Nn]?.+?(?=([A-Z]{6,}[:\s]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?w\s?i\s?l\s?l\s?a\s?p\s?p\s?l\s?y))',
+    "compensatory_mitigation": r'M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N.+?(?=([A-Z]{6,}[:\s]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?w\s?i\s?l\s?l\s?a\s?p\s?p\s?l\s?y))',
+})
+
+extractors.add_patterns("web", {
+    "applicant_contents": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?:?(.+)(?=L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn])',
+    "location": r'L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk]\s?:?(?P<section>.*)(?=C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk])',
+    "character_marker": extractors.Marker(r'C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk]|D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N',
+                                         "characterofwork", "description"),
+    "character": r'(C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?[Ww]\s?[Oo]\s?[Rr]\s?[Kk]|D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N)\s?:?(?P<section>.*?)(?=(M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N|T\s?h\s?e\s?c\s?o\s?m\s?m\s?e\s?n\s?t\s?p\s?e\s?r\s?i\s?o\s?d|$))',
+    # [Ti] is T or i: the pattern also matches "MIiIGATION"
+    "mitigation_marker": extractors.Marker(r'M\s?[Ii]\s?[Ti]\s?[Ii]\s?[Gg]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]', "mitigation", "miiigation"),
+    "mitigation": r'M\s?[Ii]\s?[Ti]\s?[Ii]\s?[Gg]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?:?(?P<section>.*?)(?=(T\s?h\s?e\s?c\s?o\s?m\s?m\s?e\s?n\s?t\s?p\s?e\s?r\s?i\s?o\s?d|$))',
+}, district = "mvn")
+
+extractors.add_patterns("web", {
+    "location": r'(L\s?O\s?C\s?A\s?T\s?I\s?O\s?N|W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y)\s?:?(?P<section>.*)(?=(P\s?R\s?O\s?J\s?E\s?C\s?T|P\s?R\s?O\s?P\s?O\s?S\s?E\s?D|A\s?P\s?P\s?L\s?I\s?C\s?A\s?N\s?T|W\s?O\s?R\s?K))',
+}, district = "sam")
+
+extractors.add_patterns("web", {
+    "location": r'L\s?O\s?C\s?A\s?T\s?I\s?O\s?N\s?:?(?P<section>.*)(?=(D\s?i\s?r\s?e\s?c\s?t\s?i\s?o\s?n\s?s|A\s?P\s?P\s?R\s?O\s?X\s?I\s?M\s?A\s?T\s?E|P\s?R\s?O\s?J\s?E\s?C\s?T))',
+}, district = "saj")
+
+extractors.add_patterns("web", {
+    "applicant_contents": r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(L\s?O\s?C\s?A\s?T\s?I\s?O\s?N|P\s?R\s?O\s?J\s?E\s?C\s?T))',
+    "location": r'L\s?O\s?C\s?A\s?T\s?I\s?O\s?N\s?:?(?P<section>.*)(?=(L\s?A\s?T\s?I\s?T\s?U\s?D\s?E|A\s?G\s?E\s?N\s?D\s?A|P\s?R\s?O\s?J\s?E\s?C\s?T|A\s?V\s?O\s?I\s?D\s?A\s?N\s?C\s?E))',
+    "character_marker": extractors.Marker(r'P?\s?R?\s?O?\s?J?\s?E?\s?C?\s?T?\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N', "description"),
+    "character": r'P?\s?R?\s?O?\s?J?\s?E?\s?C?\s?T?\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N\s?:?(?P<section>.*?)(?=([A-Z]{6,}[\s|:]|$))',
+}, district = "swg")
+
+for district in ["sam", "saj"]:
+    extractors.add_patterns("web", {
+        "character_marker": r'[W\s?O\s?R\s?K|O\s?B\s?J\s?E\s?C\s?T\s?I\s?V\s?E\s?S]',
+        "character": r'(P\s?R\s?O\s?P\s?O\s?S\s?E\s?D\s?W\s?O\s?R\s?K|W\s?O\s?R\s?K\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N|W\s?O\s?R\s?K|P\s?R\s?O\s?J\s?E\s?C\s?T\s?G\s?O\s?A\s?L\s?S\s?A\s?N\s?D\s?O\s?B\s?J\s?E\s?C\s?T\s?I\s?V\s?E\s?S)\s?:?(?P<section>.*?)(?=(A\s?[Vv]\s?[Oo]\s?[Ii]\s?[Dd]\s?[Aa]\s?[Nn]\s?[Cc]\s?[Ee]|[A-Z]{6,}[\s|:]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?h\s?a\s?s\s?a\s?p\s?p\s?l\s?i\s?e\s?d|$))',
+    }, district = district)
+
+
+
+
+# Section headers, located once per document (see extractors.SectionMap): each field pattern starts searching at the first header of
+# its section. The headers of a section must cover every way its pattern can start (whitespace and case aside).
+
+extractors.add_sections("web", {
+    "applicant": ("APPLICANT",),
+    "minimization": ("MINIMIZATION",),
+    "mitigation": ("MITIGATION",),
+})
+extractors.add_sections("web", {
+    "location": ("LOCATION OF WORK",),
+    "character": ("CHARACTER OF WORK", "DESCRIPTION"),
+    # The mvn pattern starts M[Ii][Ti]...: also "MIiIGATION"
+    "mitigation": ("MITIGATION", "MIiIGATION"),
+}, district = "mvn")
+extractors.add_sections("web", {
+    "location": ("LOCATION", "WATERWAY"),
+}, district = "sam")
+extractors.add_sections("web", {
+    "location": ("LOCATION",),
+}, district = "saj")
+extractors.add_sections("web", {
+    "location": ("LOCATION",),
+    "character": ("DESCRIPTION",),
+}, district = "swg")
+for district in ["sam", "saj"]:
+    extractors.add_sections("web", {
+        "character": ("PROPOSED WORK", "WORK DESCRIPTION", "WORK", "PROJECT GOALS AND OBJECTIVES"),
+    }, district = district)
+
+
+
+
+@extractors.register("web", "applicant")
+def _applicant(web_text, p):
+    if not extractors.has(web_text, p.applicant_marker):
+        return "unknown"
+
+    # Applicant full info
+    try:
+        return extractors.sections(web_text, p).search(p.applicant_contents, "applicant").group().strip()
+        # web_applicant_contents = re.sub(r'\s{2,}', "", web_applicant_contents)
+    except:
+        return "ERROR: regex fails"
+
+
+
+
+@extractors.register("web", "applicant", districts = ["mvn"])
+def _mvn_applicant(web_text, p):
+    if not extractors.has(web_text, p.applicant_marker):
+        return "unknown"
+
+    # Applicant full info
+    try:
+        return extractors.sections(web_text, p).search(p.applicant_contents, "applicant").group(1).strip()
+        # web_applicant_contents = re.sub(r'\s{2,}', "", web_applicant_contents)
+    except:
+        return "ERROR: regex fails"
+
+
+
+
 def get_web_applicant(web_text, district):
     """
     Get all info in "NAME OF APPLICANT"
     """
-    
-    if district == "mvn":
-        
-        if len(re.findall(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', web_text)) != 0:
-            
-            # Applicant full info
-            try:
-                web_applicant_contents = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]\s?:?(.+)(?=L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn])', web_text).group(1).strip()
-                # web_applicant_contents = re.sub(r'\s{2,}', "", web_applicant_contents)
 
-            except:
-                web_applicant_contents = "ERROR: regex fails"
-        else:
-            web_applicant_contents = "unknown"
-    
-    
-    
-    if district == "sam":
-        
-        if len(re.findall(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', web_text)) != 0:
-            
-            # Applicant full info
-            try:
-                web_applicant_contents = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))', web_text).group().strip()
-                # web_applicant_contents = re.sub(r'\s{2,}', "", web_applicant_contents)
-            except:
-                web_applicant_contents = "ERROR: regex fails"
-        else:
-            web_applicant_contents = "unknown"
-            
-            
-            
-    if district == "saj":
-        
-        if len(re.findall(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', web_text)) != 0:
-                
-            # Applicant full info
-            try:
-                web_applicant_contents = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y|L\s?O\s?C\s?A\s?T\s?I\s?O\s?N))', web_text).group().strip()
-                # web_applicant_contents = re.sub(r'\s{2,}', "", web_applicant_contents)
+    return extractors.run("web", "applicant", web_text, district)
 
-            except:
-                web_applicant_contents = "ERROR: regex fails"
-        else:
-            web_applicant_contents = "unknown"
-            
-            
-        
-    if district == "swg":
-        
-        if len(re.findall(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt]', web_text)) != 0:
-            
-            # Applicant full info
-            try:
-                web_applicant_contents = re.search(r'A\s?[Pp]\s?[Pp]\s?[Ll]\s?[Ii]\s?[Cc]\s?[Aa]\s?[Nn]\s?[Tt].+(?=(L\s?O\s?C\s?A\s?T\s?I\s?O\s?N|P\s?R\s?O\s?J\s?E\s?C\s?T))', web_text).group().strip()
-                # web_applicant_contents = re.sub(r'\s{2,}', "", web_applicant_contents)
-            except:
-                web_applicant_contents = "ERROR: regex fails"
-        else:
-            web_applicant_contents = "unknown"
-        
-    return web_applicant_contents
+
+
+
+@extractors.register("web", "location")
+def _location(web_text, p):
+    if not extractors.has(web_text, p.location_marker):
+        return "unknown"
+    try:
+        return extractors.sections(web_text, p).search(p.location, "location").group("section").strip()
+    except:
+        return "ERROR: regex fails"
 
 
 
@@ -316,37 +580,22 @@ def get_web_location(web_text, district):
     """
     Get all info in "LOCATION OF WORK"
     """
-    
-    if len(re.findall(r'L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]', web_text)) != 0:
-        
-        if district == "mvn":
-            try:
-                web_location = re.search(r'L\s?[Oo]\s?[Cc]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk]\s?:?(.*)(?=C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk])', web_text).group(1).strip()
-            except:
-                web_location = "ERROR: regex fails"
-                
-        if district  == "sam":
-            try:
-                web_location = re.search(r'(L\s?O\s?C\s?A\s?T\s?I\s?O\s?N|W\s?A\s?T\s?E\s?R\s?W\s?A\s?Y)\s?:?(.*)(?=(P\s?R\s?O\s?J\s?E\s?C\s?T|P\s?R\s?O\s?P\s?O\s?S\s?E\s?D|A\s?P\s?P\s?L\s?I\s?C\s?A\s?N\s?T|W\s?O\s?R\s?K))', web_text).group(2).strip()
-            except:
-                web_location = "ERROR: regex fails"
-                
-        if district == "saj":
-            try:
-                web_location = re.search(r'L\s?O\s?C\s?A\s?T\s?I\s?O\s?N\s?:?(.*)(?=(D\s?i\s?r\s?e\s?c\s?t\s?i\s?o\s?n\s?s|A\s?P\s?P\s?R\s?O\s?X\s?I\s?M\s?A\s?T\s?E|P\s?R\s?O\s?J\s?E\s?C\s?T))', web_text).group(1).strip()
-            except:
-                web_location = "ERROR: regex fails"
-                
-        if district == "swg":
-            try:
-                web_location = re.search(r'L\s?O\s?C\s?A\s?T\s?I\s?O\s?N\s?:?(.*)(?=(L\s?A\s?T\s?I\s?T\s?U\s?D\s?E|A\s?G\s?E\s?N\s?D\s?A|P\s?R\s?O\s?J\s?E\s?C\s?T|A\s?V\s?O\s?I\s?D\s?A\s?N\s?C\s?E))', web_text).group(1).strip()
-            except:
-                web_location = "ERROR: regex fails"
-                
-    else:
-        web_location = "unknown"
-        
-    return web_location
+
+    return extractors.run("web", "location", web_text, district)
+
+
+
+
+@extractors.register("web", "character")
+def _character(web_text, p):
+    if not extractors.has(web_text, p.character_marker):
+        return "unknown"
+    try:
+        # Moved back for the optional "PROJECT" before "DESCRIPTION" (Galveston)
+        return extractors.sections(web_text, p).search(p.character, "character", lead = 7).group("section").strip()
+        # web_character = re.sub(r'\s{2,}', "", web_character)
+    except:
+        return "ERROR: regex fails"
 
 
 
@@ -355,40 +604,42 @@ def get_web_character(web_text, district):
     """
     Get all info in "CHRACATER OF WORK"
     """
-    
-    if district == "mvn":
-        if len(re.findall(r'C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?W\s?[Oo]\s?[Rr]\s?[Kk]|D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N', web_text)) != 0:
-            try:
-                web_character = re.search(r'(C\s?[Hh]\s?[Aa]\s?[Rr]\s?[Aa]\s?[Cc]\s?[Tt]\s?[Ee]\s?[Rr]\s?[Oo]\s?[Ff]\s?[Ww]\s?[Oo]\s?[Rr]\s?[Kk]|D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N)\s?:?(.*?)(?=(M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N|T\s?h\s?e\s?c\s?o\s?m\s?m\s?e\s?n\s?t\s?p\s?e\s?r\s?i\s?o\s?d|$))', web_text).group(2).strip()
-                # web_character = re.sub(r'\s{2,}', "", web_character)
-            except:
-                web_character = "ERROR: regex fails"
-        else:
-            web_character = "unknown"
-            
-    if district in ("sam", "saj"):
-        if len(re.findall(r'[W\s?O\s?R\s?K|O\s?B\s?J\s?E\s?C\s?T\s?I\s?V\s?E\s?S]', web_text)) != 0:
-            try:
-                web_character = re.search(
-                 r'(P\s?R\s?O\s?P\s?O\s?S\s?E\s?D\s?W\s?O\s?R\s?K|W\s?O\s?R\s?K\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N|W\s?O\s?R\s?K|P\s?R\s?O\s?J\s?E\s?C\s?T\s?G\s?O\s?A\s?L\s?S\s?A\s?N\s?D\s?O\s?B\s?J\s?E\s?C\s?T\s?I\s?V\s?E\s?S)\s?:?(.*?)(?=(A\s?[Vv]\s?[Oo]\s?[Ii]\s?[Dd]\s?[Aa]\s?[Nn]\s?[Cc]\s?[Ee]|[A-Z]{6,}[\s|:]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?h\s?a\s?s\s?a\s?p\s?p\s?l\s?i\s?e\s?d|$))',
-                web_text).group(2).strip()
-                # web_character = re.sub(r'\s{2,}', "", web_character)
-            except:
-                web_character = "ERROR: regex fails"
-        else:
-            web_character = "unknown"
-            
-    if district == "swg":
-        if len(re.findall(r'P?\s?R?\s?O?\s?J?\s?E?\s?C?\s?T?\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N', web_text)) != 0:
-            try:
-                web_character = re.search(r'P?\s?R?\s?O?\s?J?\s?E?\s?C?\s?T?\s?D\s?E\s?S\s?C\s?R\s?I\s?P\s?T\s?I\s?O\s?N\s?:?(.*?)(?=([A-Z]{6,}[\s|:]|$))', web_text).group(1).strip()
-                # web_character = re.sub(r'\s{2,}', "", web_character)
-            except:
-                web_character = "ERROR: regex fails"
-        else:
-            web_character = "unknown"
-                        
-    return web_character       
+
+    return extractors.run("web", "character", web_text, district)
+
+
+
+
+@extractors.register("web", "mitigation", districts = ["mvn"])
+def _mvn_mitigation(web_text, p):
+    if not extractors.has(web_text, p.mitigation_marker):
+        return "unknown"
+    try:
+        return extractors.sections(web_text, p).search(p.mitigation, "mitigation").group("section").strip()
+        # web_mitigation = re.sub(r'\s{2,}', "", web_mitigation)
+    except:
+        return "ERROR: regex fails"
+
+
+
+
+@extractors.register("web", "mitigation", districts = ["sam", "saj", "swg"])
+def _avoidance_and_mitigation(web_text, p):
+    if not extractors.has(web_text, p.mitigation_marker):
+        return "unknown"
+        # web_mitigation = re.search(r'(AVOIDANCE|COMPENSATORY|MITIGATION).*?(?=WATER|The applicant will apply|The applicant has applied|CULTURAL)', web_text).group().strip()
+    try:
+        web_avio_mini = extractors.sections(web_text, p).search(p.avoidance_minimization, "minimization").group().strip()
+    except:
+        web_avio_mini = "ERROR: AVOIDANCE AND MINIMIZATION"
+    try:
+        web_comp_miti = extractors.sections(web_text, p).search(p.compensatory_mitigation, "mitigation").group().strip()
+    except:
+        web_comp_miti = "ERROR: COMPENSATORY MITIGATION"
+    if "ERROR" not in web_avio_mini and "ERROR" not in web_comp_miti:
+        return web_avio_mini + " " + web_comp_miti
+        # web_mitigation = re.sub(r'\s{2,}', "", web_mitigation)
+    return "ERROR: regex fails; track back to web_avio_mini and web_comp_miti"
 
 
 
@@ -397,38 +648,9 @@ def get_web_mitigation(web_text, district):
     """
     Get all info in "MITIGATION"
     """
-    
-    if district == "mvn":
-        if len(re.findall(r'M\s?[Ii]\s?[Ti]\s?[Ii]\s?[Gg]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]', web_text)) != 0:
-            try:
-                web_mitigation = re.search(r'M\s?[Ii]\s?[Ti]\s?[Ii]\s?[Gg]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?:?(.*?)(?=(T\s?h\s?e\s?c\s?o\s?m\s?m\s?e\s?n\s?t\s?p\s?e\s?r\s?i\s?o\s?d|$))', web_text).group(1).strip()
-                # web_mitigation = re.sub(r'\s{2,}', "", web_mitigation)
-            except:
-                web_mitigation = "ERROR: regex fails"
-        else:
-            web_mitigation = "unknown"
-    
-    if district in ["sam", "saj", "swg"]:
-        if len(re.findall(r'(A\s?V\s?O\s?I\s?D\s?A\s?N\s?C\s?E\s?(&|A\s?N\s?D)\s?M\s?I\s?N\s?I\s?M\s?I\s?Z\s?A\s?T\s?I\s?O\s?N|C?\s?O?\s?M?\s?P?\s?E?\s?N?\s?S?\s?A?\s?T?\s?O?\s?R?\s?Y?\s?M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N)', web_text)) != 0:
-                # web_mitigation = re.search(r'(AVOIDANCE|COMPENSATORY|MITIGATION).*?(?=WATER|The applicant will apply|The applicant has applied|CULTURAL)', web_text).group().strip()
-            try:
-                web_avio_mini = re.search(r'M\s?[Ii]\s?[Nn]\s?[Ii]\s?[Mm]\s?[Ii]\s?[Zz]\s?[Aa]\s?[Tt]\s?[Ii]\s?[Oo]\s?[Nn]\s?[Ii]?\s?[Nn]?\s?[Ff]?\s?[Oo]?\s?[Rr]?\s?[Mm]?\s?[Aa]?\s?[Tt]?\s?[Ii]?\s?[Oo]?\s?[Nn]?.+?(?=([A-Z]{6,}[:\s]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?w\s?i\s?l\s?l\s?a\s?p\s?p\s?l\s?y))', web_text).group().strip()
-            except:
-                web_avio_mini = "ERROR: AVOIDANCE AND MINIMIZATION"
-            try:
-                web_comp_miti = re.search(r'M\s?I\s?T\s?I\s?G\s?A\s?T\s?I\s?O\s?N.+?(?=([A-Z]{6,}[:\s]|T\s?h\s?e\s?a\s?p\s?p\s?l\s?i\s?c\s?a\s?n\s?t\s?w\s?i\s?l\s?l\s?a\s?p\s?p\s?l\s?y))', web_text).group().strip()
-            except:
-                web_comp_miti = "ERROR: COMPENSATORY MITIGATION"
-            if "ERROR" not in web_avio_mini and "ERROR" not in web_comp_miti:
-                web_mitigation = web_avio_mini + " " + web_comp_miti
-                # web_mitigation = re.sub(r'\s{2,}', "", web_mitigation)
-            else:
-                web_mitigation = "ERROR: regex fails; track back to web_avio_mini and web_comp_miti"
-        else:
-            web_mitigation = "unknown"
-            
-    return web_mitigation
-    
+
+    return extractors.run("web", "mitigation", web_text, district)
+
 
 
 
@@ -443,7 +665,7 @@ def web_extraction(web_url, update):
     
     district = re.search(r'www\.(.*?)\.usace', web_url).group(1)
     
-    req = requests.get(web_url)
+    req = http_client.get(web_url)
     print(f"Status code: {req.status_code}")
     content = req.text
     soup = BeautifulSoup(content, 'html.parser')
@@ -454,6 +676,12 @@ def web_extraction(web_url, update):
         web_expire_date = get_web_expire_date(soup)
         pdf_url = get_web_pdf_url(soup, web_url)
 
+    # Galveston notices link the attachment pdf separately; it is archived together with the notice pdf
+    # (None for the other districts, and when the webpage has no attachment link)
+    attachment_url = get_web_attachment_url(soup, web_url) if district == "swg" else None
+    if attachment_url is not None and "ERROR" in attachment_url:
+        attachment_url = None
+
     # Extract webpage body
     web_text = get_web_text(soup)
 
@@ -475,13 +703,15 @@ def web_extraction(web_url, update):
         return {"datePublished":web_published_date, 
                 "dateExpiry":web_expire_date, 
                 "PdfUrl":pdf_url,
+                "AttachmentUrl":attachment_url,
                 "web_applicant":web_applicant, 
                 "web_location":web_location, 
                 "web_character":web_character, 
                 "web_mitigation":web_mitigation,
                 "web_text": web_text}
     else:
-        return {"web_applicant":web_applicant, 
+        return {"AttachmentUrl":attachment_url,
+                "web_applicant":web_applicant, 
                 "web_location":web_location, 
                 "web_character":web_character, 
                 "web_mitigation":web_mitigation,
@@ -490,3 +720,37 @@ def web_extraction(web_url, update):
 
     
 
+
+
+
+def web_extraction_many(web_urls, update, max_workers = 8, host_limits = None):
+    """
+    Run web_extraction for a list of notice webpages with a bounded thread pool.
+    
+    max_workers: the number of webpages scraped at the same time across all districts
+    host_limits: the maximum number of webpages scraped at the same time per district host, 
+                 e.g. {"swg": 2, "mvn": 2, "saj": 2, "sam": 2}; 2 for hosts not listed
+    
+    The results are returned in the same order as web_urls.
+    """
+    
+    if host_limits is None:
+        host_limits = {}
+    
+    # One semaphore per district host to stay polite to each USACE website
+    host_semaphores = {}
+    for web_url in web_urls:
+        host = re.search(r'www\.(.*?)\.usace', web_url).group(1)
+        if host not in host_semaphores:
+            host_semaphores[host] = threading.BoundedSemaphore(host_limits.get(host, 2))
+    
+    def extract_one(web_url):
+        host = re.search(r'www\.(.*?)\.usace', web_url).group(1)
+        with host_semaphores[host]:
+            return web_extraction(web_url, update)
+    
+    # map() keeps the order of web_urls
+    with ThreadPoolExecutor(max_workers = max(1, max_workers)) as executor:
+        webpage_list = list(executor.map(extract_one, web_urls))
+    
+    return webpage_list
@@ -0,0 +1,139 @@
+import io
+import threading
+import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+import manifest
+import storage
+
+
+
+
+# Run-scoped snapshot of the dashboard tables in the bucket: each object (Parquet part or legacy CSV) is downloaded
+# at most once per run, in parallel, and each caller parses only the columns it needs:
+#   snapshot.begin(bucket, ["location_df", "geocoded_df"])     # start downloading in the background
+#   snapshot.table("location_df", columns = ["noticeID", "type", "detail"])
+# The tables are read as they were when the snapshot began; rows uploaded by this run are not in it.
+
+_state = {"bucket": None, "manifest": None, "pool": None, "objects": {}}
+_lock = threading.Lock()
+
+
+
+
+def begin(bucket, tables = (), max_workers = 8):
+    """
+    Start the snapshot of a run and prefetch the given tables in parallel
+    """
+
+    end()
+    with _lock:
+        _state["bucket"] = bucket
+        _state["manifest"], _ = manifest.read(bucket)
+        _state["pool"] = ThreadPoolExecutor(max_workers = max_workers)
+        _state["objects"] = {}
+    prefetch(tables)
+
+
+
+
+def end():
+    """
+    Drop the snapshot
+    """
+
+    with _lock:
+        if _state["pool"] is not None:
+            _state["pool"].shutdown(wait = False, cancel_futures = True)
+        _state.update({"bucket": None, "manifest": None, "pool": None, "objects": {}})
+
+
+
+
+def active():
+    return _state["bucket"] is not None
+
+
+
+
+def _table_keys(tbl_name):
+    """
+    Objects holding a table: its Parquet parts listed in the manifest, or its legacy CSV
+    """
+
+    parts = _state["manifest"].get("tables", {}).get(tbl_name, {}).get("parts", [])
+    if len(parts) > 0:
+        return [part["key"] for part in parts]
+    return [f"dashboard-data/{tbl_name}.csv"]
+
+
+
+
+def _download(key):
+    try:
+        return _state["bucket"].get(key)
+    except storage.NotFound:
+        return None
+
+
+
+
+def _fetch(key):
+    """
+    Future of the bytes of an object (None if it does not exist); each object is downloaded once
+    """
+
+    with _lock:
+        if key not in _state["objects"]:
+            _state["objects"][key] = _state["pool"].submit(_download, key)
+        return _state["objects"][key]
+
+
+
+
+def prefetch(tables):
+    """
+    Start downloading the objects of the tables
+    """
+
+    if not active():
+        raise RuntimeError("snapshot.begin() has not been called")
+
+    for tbl_name in tables:
+        for key in _table_keys(tbl_name):
+            _fetch(key)
+
+
+
+
+def _parse(key, content, columns):
+    if key.endswith(".parquet"):
+        if columns is not None:
+            available = set(pq.ParquetFile(io.BytesIO(content)).schema_arrow.names)
+            columns = [column for column in columns if column in available]
+        return pd.read_parquet(io.BytesIO(content), columns = columns)
+
+    if columns is not None:
+        wanted = set(columns)
+        return pd.read_csv(io.BytesIO(content), usecols = lambda column: column in wanted)
+    return pd.read_csv(io.BytesIO(content))
+
+
+
+
+def table(tbl_name, columns = None):
+    """
+    A table of the snapshot as a DataFrame, with only the given columns (all if None); empty if the table does not exist
+    """
+
+    prefetch([tbl_name])
+
+    frames = []
+    for key in _table_keys(tbl_name):
+        content = _fetch(key).result()
+        if content is not None:
+            frames.append(_parse(key, content, columns))
+
+    if len(frames) == 0:
+        return pd.DataFrame(columns = columns)
+    return pd.concat(frames, ignore_index = True)
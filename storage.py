@@ -0,0 +1,356 @@
+import io
+import os
+import gzip
+import json
+import mmap
+import fcntl
+import hashlib
+import tempfile
+import threading
+from botocore.exceptions import ClientError
+
+
+
+
+# Storage backends for the bucket holding the dashboard tables, the manifest and the archived notice PDFs.
+# Both implement the same interface, with keys such as "dashboard-data/manifest.json":
+#   get(key) / get_with_etag(key) / get_range(key, start, length) / head(key) / list(prefix)
+#   put(key, data, ..., if_match = etag, if_none_match = True) / open_writer(key, ...) / public_url(key)
+#   S3Storage:    an S3 bucket (usace-notices)
+#   LocalStorage: a local directory, read through memory-mapping; to run and benchmark the pipeline offline
+# Objects written with content_encoding "gzip" are decompressed by get(), like a browser does.
+
+
+
+
+class NotFound(Exception):
+    """
+    The object does not exist
+    """
+
+
+
+
+class PreconditionFailed(Exception):
+    """
+    A conditional put failed: the object changed (if_match) or exists already (if_none_match)
+    """
+
+
+
+
+class S3Storage:
+    """
+    Storage in an S3 bucket
+    """
+
+    def __init__(self, client, bucket = "usace-notices", public_read = True):
+        self.client = client
+        self.bucket = bucket
+        self.acl = {"ACL": "public-read"} if public_read else {}
+
+    def _get_object(self, key, **kwargs):
+        try:
+            return self.client.get_object(Bucket = self.bucket, Key = key, **kwargs)
+        except self.client.exceptions.NoSuchKey:
+            raise NotFound(key)
+
+    def get_with_etag(self, key):
+        """
+        Return (bytes, etag) of an object
+        """
+
+        response = self._get_object(key)
+        content = response['Body'].read()
+        if response.get('ContentEncoding') == "gzip":
+            content = gzip.decompress(content)
+        return content, response['ETag']
+
+    def get(self, key):
+        return self.get_with_etag(key)[0]
+
+    def get_range(self, key, start, length):
+        """
+        Bytes [start, start + length) of an object, as stored
+        """
+
+        response = self._get_object(key, Range = f"bytes={start}-{start + length - 1}")
+        return response['Body'].read()
+
+    def head(self, key):
+        """
+        {"etag", "size", "content_encoding"} of an object, or None if it does not exist
+        """
+
+        try:
+            response = self.client.head_object(Bucket = self.bucket, Key = key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return {"etag": response['ETag'], "size": response['ContentLength'], "content_encoding": response.get('ContentEncoding')}
+
+    def list(self, prefix = ""):
+        """
+        Keys starting with prefix
+        """
+
+        keys = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket = self.bucket, Prefix = prefix):
+            keys += [item['Key'] for item in page.get('Contents', [])]
+        return keys
+
+    def put(self, key, data, content_type = None, content_encoding = None, if_match = None, if_none_match = False):
+        """
+        Write an object (bytes or a binary file object) and return its etag.
+        if_match: only if the object is still at this etag; if_none_match: only if the object does not exist
+        """
+
+        args = dict(self.acl)
+        if content_type is not None:
+            args["ContentType"] = content_type
+        if content_encoding is not None:
+            args["ContentEncoding"] = content_encoding
+        if if_match is not None:
+            args["IfMatch"] = if_match
+        if if_none_match:
+            args["IfNoneMatch"] = "*"
+
+        try:
+            response = self.client.put_object(Body = data, Bucket = self.bucket, Key = key, **args)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise PreconditionFailed(key)
+            raise
+        return response['ETag']
+
+    def open_writer(self, key, content_type = None, content_encoding = None, part_size = 8 * 1024 ** 2):
+        """
+        Writable stream into a multipart upload (see S3MultipartWriter)
+        """
+
+        args = dict(self.acl)
+        if content_type is not None:
+            args["ContentType"] = content_type
+        if content_encoding is not None:
+            args["ContentEncoding"] = content_encoding
+        return S3MultipartWriter(self.client, self.bucket, key, part_size, **args)
+
+    def public_url(self, key):
+        return f"https://{self.bucket}.s3.amazonaws.com/{key}"
+
+
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Writable stream into an S3 multipart upload: the written bytes are sent in parts of part_size bytes,
+    so an object of any size is uploaded with at most one part in memory.
+    The object is completed when the stream is closed, and the upload is aborted if the with block fails.
+    """
+
+    def __init__(self, client, bucket, key, part_size = 8 * 1024 ** 2, **object_args):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, 5 * 1024 ** 2)
+        self.buffer = bytearray()
+        self.parts = []
+        self.upload_id = client.create_multipart_upload(Bucket = bucket, Key = key, **object_args)['UploadId']
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, data):
+        response = self.client.upload_part(Bucket = self.bucket, Key = self.key, UploadId = self.upload_id,
+                                           PartNumber = len(self.parts) + 1, Body = data)
+        self.parts.append({"PartNumber": len(self.parts) + 1, "ETag": response['ETag']})
+
+    def close(self):
+        if not self.closed:
+            # The last part may be smaller than 5 MB
+            if len(self.buffer) > 0 or len(self.parts) == 0:
+                self._upload_part(bytes(self.buffer))
+                self.buffer = bytearray()
+            self.client.complete_multipart_upload(Bucket = self.bucket, Key = self.key, UploadId = self.upload_id,
+                                                  MultipartUpload = {"Parts": self.parts})
+        super().close()
+
+    def abort(self):
+        if not self.closed:
+            self.client.abort_multipart_upload(Bucket = self.bucket, Key = self.key, UploadId = self.upload_id)
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+
+
+class LocalStorage:
+    """
+    Storage in a local directory: <root>/<key>, with the content type/encoding in <root>/<key>.meta.json.
+    Objects are read through memory-mapping; etags are the MD5 of the content, like single-part S3 uploads.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok = True)
+
+    def _path(self, key):
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Key outside of the storage directory: {key}")
+        return path
+
+    def _meta(self, key):
+        try:
+            with open(self._path(key) + ".meta.json", "r") as f:
+                return json.load(f)
+        except OSError:
+            return {}
+
+    def _read(self, key, start = 0, length = None):
+        try:
+            with open(self._path(key), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return b""
+                with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mapped:
+                    end = size if length is None else min(size, start + length)
+                    return mapped[start:end]
+        except FileNotFoundError:
+            raise NotFound(key)
+
+    def get_with_etag(self, key):
+        content = self._read(key)
+        etag = '"' + hashlib.md5(content).hexdigest() + '"'
+        if self._meta(key).get("content_encoding") == "gzip":
+            content = gzip.decompress(content)
+        return content, etag
+
+    def get(self, key):
+        return self.get_with_etag(key)[0]
+
+    def get_range(self, key, start, length):
+        return self._read(key, start, length)
+
+    def head(self, key):
+        try:
+            content = self._read(key)
+        except NotFound:
+            return None
+        return {"etag": '"' + hashlib.md5(content).hexdigest() + '"', "size": len(content),
+                "content_encoding": self._meta(key).get("content_encoding")}
+
+    def list(self, prefix = ""):
+        keys = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".meta.json") or name.endswith(".tmp"):
+                    continue
+                key = os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+    def _replace(self, key, tmp_path, content_type, content_encoding):
+        meta_path = self._path(key) + ".meta.json"
+        if content_type is not None or content_encoding is not None:
+            with open(meta_path, "w") as f:
+                json.dump({"content_type": content_type, "content_encoding": content_encoding}, f)
+        elif os.path.exists(meta_path):
+            os.remove(meta_path)
+        os.replace(tmp_path, self._path(key))
+
+    def put(self, key, data, content_type = None, content_encoding = None, if_match = None, if_none_match = False):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(path), suffix = ".tmp")
+        md5 = hashlib.md5()
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                data = io.BytesIO(data)
+            # Bytes or a binary file object, copied in chunks
+            for chunk in iter(lambda: data.read(1024 ** 2), b""):
+                md5.update(chunk)
+                f.write(chunk)
+
+        # Conditional puts are checked and applied under a lock shared by threads and processes
+        with self._lock, open(os.path.join(self.root, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            current = self.head(key)
+            if (if_none_match and current is not None) or (if_match is not None and (current is None or current["etag"] != if_match)):
+                os.remove(tmp_path)
+                raise PreconditionFailed(key)
+            self._replace(key, tmp_path, content_type, content_encoding)
+
+        return '"' + md5.hexdigest() + '"'
+
+    def open_writer(self, key, content_type = None, content_encoding = None, part_size = None):
+        return LocalWriter(self, key, content_type, content_encoding)
+
+    def public_url(self, key):
+        return "file://" + os.path.abspath(self._path(key))
+
+    def local_path(self, key):
+        """
+        Path of an object, to memory-map it
+        """
+
+        if not os.path.exists(self._path(key)):
+            raise NotFound(key)
+        return self._path(key)
+
+
+
+
+class LocalWriter(io.RawIOBase):
+    """
+    Writable stream into a temp file, moved into place when closed (removed if the with block fails)
+    """
+
+    def __init__(self, storage, key, content_type = None, content_encoding = None):
+        self.storage = storage
+        self.key = key
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        path = storage._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        fd, self.tmp_path = tempfile.mkstemp(dir = os.path.dirname(path), suffix = ".tmp")
+        self.file = os.fdopen(fd, "wb")
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+            self.storage._replace(self.key, self.tmp_path, self.content_type, self.content_encoding)
+        super().close()
+
+    def abort(self):
+        if not self.closed:
+            self.file.close()
+            os.remove(self.tmp_path)
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
@@ -0,0 +1,339 @@
+import io
+import gzip
+import json
+import uuid
+import hashlib
+from collections import deque
+import pandas as pd
+import pyarrow.parquet as pq
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import manifest
+import storage
+import text_store
+import embedding_store
+
+
+
+
+# Append-only storage of the dashboard tables: each upload adds immutable Parquet part files, partitioned by
+# district and publish month of the notice, and lists them in the manifest with the row count, max rowID and schema hash:
+#   dashboard-data/parquet/<table>/district=<swg|mvn|saj|sam>/month=<YYYY-MM>/part-<run id>.parquet
+#   manifest["tables"][<table>] = {"rows", "max_rowID", "schema", "parts": [{"key", "rows", "max_rowID", "schema", "district", "month"}, ...]}
+# Nothing is downloaded to append rows or to number them. Parts become visible only when the manifest lists them,
+# and all tables of a run are listed in one manifest update, so a failed upload leaves no table half-updated.
+# The legacy CSVs can be regenerated from the parts with export_csv (gzip-compressed, streamed as a multipart upload).
+# The texts of fulltext_df are written to zstd shards and its parts hold their offsets instead (see text_store.py);
+# the embeddings of embed_final_df are written to .npy matrices and its parts hold their rows (see embedding_store.py);
+# export_csv puts both back, so the CSVs keep their columns.
+
+PREFIX = "dashboard-data/parquet"
+
+
+
+
+def new_run_id():
+    """
+    Unique name of the parts written by one upload
+    """
+
+    return datetime.now().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+
+
+
+def notice_partitions(main_df):
+    """
+    Partition (district, month) of each noticeID of the run, from the notice url and publish date of main_df
+    """
+
+    if main_df is None or len(main_df) == 0:
+        return pd.DataFrame(columns = ["noticeID", "district", "month"])
+
+    partitions = main_df[["noticeID"]].copy()
+    partitions["district"] = main_df["usaceWebUrl"].astype(str).str.extract(r'www\.(.*?)\.usace', expand = False).fillna("unknown")
+    partitions["month"] = pd.to_datetime(main_df["datePublished"], errors = "coerce", utc = True).dt.strftime("%Y-%m").fillna("unknown")
+    return partitions.drop_duplicates(subset = "noticeID")
+
+
+
+
+def _to_storable(tbl):
+    """
+    Store mixed-type columns (dicts, lists, numbers mixed with "unknown") as text, like the CSVs did
+    """
+
+    tbl = tbl.reset_index(drop = True).copy()
+    for column in tbl.columns:
+        if tbl[column].dtype == object:
+            tbl[column] = tbl[column].map(lambda x: x if pd.isnull(x) is True else str(x))
+    return tbl
+
+
+
+
+def schema_hash(tbl):
+    """
+    Short hash of the column names and types of a table
+    """
+
+    schema = [[str(column), str(dtype)] for column, dtype in tbl.dtypes.items()]
+    return hashlib.sha1(json.dumps(schema).encode("utf-8")).hexdigest()[:16]
+
+
+
+
+def _max_row_id(tbl):
+    if "rowID" not in tbl.columns or tbl["rowID"].notna().sum() == 0:
+        return None
+    return int(tbl["rowID"].max())
+
+
+
+
+def _put_parquet(bucket, key, tbl):
+    """
+    Write one part and return its manifest entry (without the partition)
+    """
+
+    tbl = _to_storable(tbl)
+    buffer = io.BytesIO()
+    tbl.to_parquet(buffer, index = False)
+    bucket.put(key, buffer.getvalue())
+    return {"key": key, "rows": len(tbl), "max_rowID": _max_row_id(tbl), "schema": schema_hash(tbl)}
+
+
+
+
+def _legacy_parts(bucket, tbl_name):
+    """
+    Move the rows of the legacy CSV of a table into one Parquet part; done once, the first time the table is appended to
+    """
+
+    try:
+        content = bucket.get(f"dashboard-data/{tbl_name}.csv")
+    except storage.NotFound:
+        return []
+
+    legacy_df = pd.read_csv(io.BytesIO(content))
+    if tbl_name == text_store.TABLE:
+        legacy_df = text_store.write_shard(bucket, legacy_df, "legacy")
+    if tbl_name == embedding_store.TABLE:
+        legacy_df = embedding_store.write_matrix(bucket, legacy_df, "legacy")
+    key = f"{PREFIX}/{tbl_name}/legacy/part-legacy.parquet"
+    part = _put_parquet(bucket, key, legacy_df)
+    print(f"{tbl_name}: {len(legacy_df)} rows of the legacy CSV moved to {key}")
+    return [dict(part, district = "legacy", month = "legacy")]
+
+
+
+
+def write_parts(bucket, tbl_name, tbl, partitions, run_id):
+    """
+    Write the new rows of a table as Parquet parts, one per (district, month); return the part entries for the manifest
+    """
+
+    if len(tbl) == 0:
+        return []
+
+    if tbl_name == text_store.TABLE:
+        tbl = text_store.write_shard(bucket, tbl, run_id)
+    if tbl_name == embedding_store.TABLE:
+        tbl = embedding_store.write_matrix(bucket, tbl, run_id)
+
+    if "noticeID" in tbl.columns:
+        tbl = tbl.merge(partitions, on = "noticeID", how = "left")
+    else:
+        tbl = tbl.assign(district = None, month = None)
+    tbl[["district", "month"]] = tbl[["district", "month"]].fillna("unknown")
+
+    parts = []
+    for (district, month), part in tbl.groupby(["district", "month"], sort = True):
+        key = f"{PREFIX}/{tbl_name}/district={district}/month={month}/part-{run_id}.parquet"
+        parts.append(dict(_put_parquet(bucket, key, part.drop(columns = ["district", "month"])), district = district, month = month))
+
+    return parts
+
+
+
+
+def stage(bucket, tbl_dict, partitions, run_id, max_workers = 8):
+    """
+    Write the parts of the new rows of each table, tables in parallel (not yet visible: see commit); return {table: [part entries]}
+    """
+
+    content, _ = manifest.read(bucket)
+
+    def stage_table(tbl_name):
+        parts = []
+        if tbl_name not in content.get("tables", {}):
+            parts += _legacy_parts(bucket, tbl_name)
+        parts += write_parts(bucket, tbl_name, tbl_dict[tbl_name], partitions, run_id)
+        return parts
+
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+        return dict(zip(tbl_dict.keys(), pool.map(stage_table, tbl_dict.keys())))
+
+
+
+
+def commit(bucket, staged, row_offsets = None):
+    """
+    List the staged parts of all tables in the manifest in one atomic update, with the new row counts, max rowIDs and schemas.
+    row_offsets: the max rowIDs the new rows were numbered from (see row_offsets); the commit is refused if another run
+    has added rows to one of these tables since.
+    """
+
+    if row_offsets is None:
+        row_offsets = {}
+
+    def change(content):
+        tables = content.setdefault("tables", {})
+        for tbl_name, new_parts in staged.items():
+            table = tables.setdefault(tbl_name, {"parts": []})
+
+            if tbl_name in row_offsets and "max_rowID" in table and (table["max_rowID"] or 0) != row_offsets[tbl_name]:
+                raise manifest.ManifestConflict(f"{tbl_name} changed since its rowIDs were generated (max rowID {table['max_rowID']}, expected {row_offsets[tbl_name]})")
+
+            listed = set(part["key"] for part in table["parts"])
+            added = [part for part in new_parts if part["key"] not in listed]
+            table["parts"] += added
+
+            row_ids = [part["max_rowID"] for part in table["parts"] if part.get("max_rowID") is not None]
+            table["rows"] = sum(part["rows"] for part in table["parts"])
+            table["max_rowID"] = max(row_ids) if len(row_ids) > 0 else None
+            if len(added) > 0:
+                table["schema"] = added[-1]["schema"]
+
+    manifest.update(bucket, change)
+
+
+
+
+def row_offsets(bucket, tbl_names):
+    """
+    Max rowID of each table, from one read of the manifest: new rows are numbered from max rowID + 1.
+    A table not in the manifest yet is counted once from its legacy CSV.
+    """
+
+    content, _ = manifest.read(bucket)
+    tables = content.get("tables", {})
+
+    offsets = {}
+    for tbl_name in tbl_names:
+        if tbl_name in tables:
+            offsets[tbl_name] = tables[tbl_name].get("max_rowID") or 0
+            continue
+        try:
+            content = bucket.get(f"dashboard-data/{tbl_name}.csv")
+            legacy_df = pd.read_csv(io.BytesIO(content), usecols = lambda column: column == "rowID")
+            offsets[tbl_name] = _max_row_id(legacy_df) or 0
+        except storage.NotFound:
+            offsets[tbl_name] = 0
+    return offsets
+
+
+
+
+def list_parts(bucket, tbl_name, district = None, month = None):
+    """
+    Parts of a table in the manifest, optionally only one district and/or month
+    """
+
+    content, _ = manifest.read(bucket)
+    parts = content.get("tables", {}).get(tbl_name, {}).get("parts", [])
+    return [part for part in parts
+            if (district is None or part["district"] in (district, "legacy"))
+            and (month is None or part["month"] in (month, "legacy"))]
+
+
+
+
+def read_table(bucket, tbl_name, columns = None, district = None, month = None):
+    """
+    Read a table (or some of its columns / partitions) from its Parquet parts
+    """
+
+    frames = []
+    for part in list_parts(bucket, tbl_name, district, month):
+        frame = pd.read_parquet(io.BytesIO(bucket.get(part["key"])))
+        if columns is not None:
+            frame = frame[[column for column in columns if column in frame.columns]]
+        frames.append(frame)
+
+    if len(frames) == 0:
+        return pd.DataFrame(columns = columns)
+    return pd.concat(frames, ignore_index = True)
+
+
+
+
+def part_columns(bucket, key):
+    """
+    Column names of a part, from its Parquet footer only (two range requests)
+    """
+
+    size = bucket.head(key)["size"]
+    footer_length = int.from_bytes(bucket.get_range(key, size - 8, 4), "little")
+    footer = bucket.get_range(key, size - 8 - footer_length, footer_length + 8)
+    return pq.read_schema(io.BytesIO(footer)).names
+
+
+
+
+def prefetch(pool, fetch, items, window):
+    """
+    Results of fetch(item) in the order of items, with at most window fetches running or waiting to be consumed
+    """
+
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fetch, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while len(pending) > 0:
+        yield pending.popleft().result()
+
+
+
+
+def export_csv(bucket, tbl_name, max_workers = 8, window = 4):
+    """
+    Regenerate the legacy CSV of a table (dashboard-data/<table>.csv) from its Parquet parts.
+    The CSV is written part by part through gzip into a streaming writer (a multipart upload on S3; Content-Encoding: gzip).
+    The parts are downloaded in order, at most window of them ahead of the one being written,
+    so only those compressed parts and one decoded part are in memory at a time.
+    """
+
+    parts = list_parts(bucket, tbl_name)
+
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+        # Columns of all parts, in order of appearance (the schema can grow over time)
+        columns = []
+        for names in pool.map(lambda part: part_columns(bucket, part["key"]), parts):
+            for column in names:
+                if column not in columns:
+                    columns.append(column)
+
+    def decode(content):
+        frame = pd.read_parquet(io.BytesIO(content))
+        if tbl_name == text_store.TABLE:
+            frame = text_store.attach_texts(bucket, frame)
+        if tbl_name == embedding_store.TABLE:
+            frame = embedding_store.attach_vectors(bucket, frame)
+        return frame
+
+    if tbl_name == text_store.TABLE:
+        columns = list(text_store.attach_texts(bucket, pd.DataFrame(columns = columns)).columns)
+    if tbl_name == embedding_store.TABLE:
+        columns = list(embedding_store.attach_vectors(bucket, pd.DataFrame(columns = columns)).columns)
+
+    with ThreadPoolExecutor(max_workers = window) as pool, \
+         bucket.open_writer(f"dashboard-data/{tbl_name}.csv", content_type = "text/csv", content_encoding = "gzip") as raw, \
+         gzip.GzipFile(fileobj = raw, mode = "wb") as compressed, \
+         io.TextIOWrapper(compressed, encoding = "utf-8", newline = "") as text:
+        pd.DataFrame(columns = columns).to_csv(text, index = False)
+        for content in prefetch(pool, lambda part: bucket.get(part["key"]), parts, window):
+            decode(content).reindex(columns = columns).to_csv(text, index = False, header = False)
+
+    print(f"{tbl_name}.csv regenerated from {len(parts)} parts")
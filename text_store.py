@@ -0,0 +1,130 @@
+import json
+import zstandard
+import pandas as pd
+
+
+
+
+# Full texts of the notices (pdf_full_text and pdf_trimmed of fulltext_df), kept out of the table in zstd-compressed shards:
+#   dashboard-data/fulltext/shard-<run id>.zst      one shard per upload (shard-legacy.zst for the legacy CSV)
+# Each notice is an independent zstd frame holding {"pdf_full_text", "pdf_trimmed"} as JSON, so it decompresses on its own.
+# The fulltext_df parts keep noticeID and rowID and, instead of the texts, the index (shard, offset, length) of the frame:
+#   one notice  = one range request:  text_store.fetch(bucket, index, "Notice_NO_123")
+#   the corpus  = one download per shard, frame by frame:  for notice_id, texts in text_store.scan(bucket, index): ...
+# where index = fulltext_df read with INDEX_COLUMNS only (snapshot.table or table_store.read_table).
+
+TABLE = "fulltext_df"
+PREFIX = "dashboard-data/fulltext"
+TEXT_COLUMNS = ["pdf_full_text", "pdf_trimmed"]
+INDEX_COLUMNS = ["noticeID", "shard", "offset", "length"]
+
+
+
+
+def _encode(texts):
+    return json.dumps(texts, ensure_ascii = False).encode("utf-8")
+
+
+
+
+def _decode(frame):
+    return json.loads(zstandard.ZstdDecompressor().decompress(frame))
+
+
+
+
+def write_shard(bucket, tbl, shard_name, level = 10):
+    """
+    Write the texts of a fulltext_df table into one shard, streamed; return the table with the texts replaced by
+    the index columns (shard, offset, length)
+    """
+
+    key = f"{PREFIX}/shard-{shard_name}.zst"
+    compressor = zstandard.ZstdCompressor(level = level)
+    texts = tbl.reindex(columns = TEXT_COLUMNS).astype(object).where(lambda x: x.notna(), None)
+
+    offsets, lengths = [], []
+    offset = 0
+    with bucket.open_writer(key, content_type = "application/zstd") as writer:
+        for row in texts.itertuples(index = False):
+            frame = compressor.compress(_encode(dict(zip(TEXT_COLUMNS, row))))
+            writer.write(frame)
+            offsets.append(offset)
+            lengths.append(len(frame))
+            offset += len(frame)
+
+    index = tbl.drop(columns = [column for column in TEXT_COLUMNS if column in tbl.columns])
+    position = list(index.columns).index("noticeID") + 1 if "noticeID" in index.columns else 0
+    index.insert(position, "shard", key)
+    index.insert(position + 1, "offset", pd.array(offsets, dtype = "int64"))
+    index.insert(position + 2, "length", pd.array(lengths, dtype = "int64"))
+    print(f"{TABLE}: {len(index)} texts written to {key} ({offset} bytes)")
+    return index
+
+
+
+
+def fetch(bucket, index, notice_id):
+    """
+    {"pdf_full_text", "pdf_trimmed"} of one notice, with one range request; None if the notice is not in the index
+    """
+
+    rows = index[index["noticeID"] == notice_id]
+    if len(rows) == 0:
+        return None
+    row = rows.iloc[-1]
+    if "shard" not in row or pd.isnull(row["shard"]):
+        # Part written before the shards: the texts are inline (if they were read)
+        return {column: row.get(column) for column in TEXT_COLUMNS}
+    return _decode(bucket.get_range(row["shard"], int(row["offset"]), int(row["length"])))
+
+
+
+
+def scan(bucket, index):
+    """
+    Iterate over (noticeID, {"pdf_full_text", "pdf_trimmed"}) of the notices of the index, shard by shard:
+    one range request per shard, and only one shard is in memory at a time
+    """
+
+    for _, notice_id, texts in _scan_rows(bucket, index):
+        yield notice_id, texts
+
+
+
+
+def _scan_rows(bucket, index):
+    """
+    Iterate over (row position, noticeID, texts) of the index, shard by shard:
+    one range request per shard, covering the frames of the index in it
+    """
+
+    decompressor = zstandard.ZstdDecompressor()
+    for shard, entries in index.groupby("shard", sort = False):
+        start = int(entries["offset"].min())
+        content = bucket.get_range(shard, start, int((entries["offset"] + entries["length"]).max()) - start)
+        for position, notice_id, offset, length in zip(entries.index, entries["noticeID"], entries["offset"], entries["length"]):
+            offset = int(offset) - start
+            yield position, notice_id, json.loads(decompressor.decompress(content[offset:offset + int(length)]))
+
+
+
+
+def attach_texts(bucket, index):
+    """
+    The fulltext_df table as it was before the shards: the index columns replaced by the texts (for the legacy CSV).
+    Rows of parts written before the shards keep their inline texts.
+    """
+
+    index = index.reset_index(drop = True)
+    values = {column: list(index[column]) if column in index.columns else [None] * len(index) for column in TEXT_COLUMNS}
+    if "shard" in index.columns:
+        for position, _, texts in _scan_rows(bucket, index.dropna(subset = ["shard"])):
+            for column in TEXT_COLUMNS:
+                values[column][position] = texts.get(column)
+
+    tbl = index.drop(columns = ["shard", "offset", "length"] + TEXT_COLUMNS, errors = "ignore")
+    position = list(tbl.columns).index("noticeID") + 1 if "noticeID" in tbl.columns else 0
+    for i, column in enumerate(TEXT_COLUMNS):
+        tbl.insert(position + i, column, pd.Series(values[column], dtype = object))
+    return tbl